@@ -1,10 +1,11 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 import os
 import pytz
 
+from smartagri import figures, fleet, forecast_summary, metrics, resampling, sensors, stations, store
+
 # Set page configuration to wide mode
 st.set_page_config(page_title="Smart Agriculture Dashboard", layout="wide")
 
@@ -16,38 +17,28 @@ css_file_path = os.path.join(os.path.dirname(__file__), "styles.css")
 with open(css_file_path) as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-# Get the absolute path to the current directory
-current_dir = os.path.dirname(os.path.abspath(__file__))
-
-# Function to construct the file path
-def get_file_path(filename):
-    return os.path.join(current_dir, filename)
-
-# Cache the data loading function
-@st.cache_data
-def load_data(file_path):
-    data = pd.read_csv(file_path)
-    data['timestamp'] = pd.to_datetime(data['timestamp'])
-    return data
+# Station selector entry covering the whole fleet
+ALL_STATIONS = "*"
 
-
-# Cache the function to calculate average values
-@st.cache_data
-def calculate_averages(data):
+# Average values of one station (or of all of them), merged from the statistics of their monthly partitions
+@metrics.timed("Home", "aggregate")
+def calculate_averages(station_id):
+    summary = fleet.summary() if station_id == ALL_STATIONS else stations.summary(station_id)
     avg_values = {
-        "TC": data["TC"].mean(),
-        "HUM": data["HUM"].mean(),
-        "PRES": data["PRES"].mean(),
-        "US": data["US"].mean(),
-        "SOIL1": data["SOIL1"].mean()
+        "TC": summary.loc["TC", "mean"],
+        "HUM": summary.loc["HUM", "mean"],
+        "PRES": summary.loc["PRES", "mean"],
+        "US": summary.loc["US", "mean"],
+        "SOIL1": summary.loc["SOIL1", "mean"]
     }
     return avg_values
 
+# Station shown on the home page; the last option covers the whole fleet
+station_list = {station.id: station for station in stations.list_stations()}
+station_list[ALL_STATIONS] = stations.Station(ALL_STATIONS, "All stations", "", None, None)
+station = station_list[st.sidebar.selectbox("Station", list(station_list), format_func=lambda s: station_list[s].name)]
 
-
-# Load the data
-data = load_data(get_file_path('cleaned_data.csv'))
-avg_values = calculate_averages(data)
+avg_values = calculate_averages(station.id)
 
 # Page title
 st.title("Welcome to the Smart Agriculture")
@@ -62,21 +53,21 @@ st.markdown(f"""
             <div class="card" onclick="navigateTo('pages/Temperature.py')">
                 <div class="icon">☀️</div>
                 <h2>Temperature</h2>
-                <p>Average: {avg_values["TC"]:.2f}°C</p>
+                <p>Average: {avg_values["TC"]:.2f}{sensors.get("TC").unit}</p>
             </div>
         </div>
         <div class="card-column">
             <div class="card" onclick="navigateTo('/Humidity')">
                 <div class="icon">💧</div>
                 <h2>Humidity</h2>
-                <p>Average: {avg_values["HUM"]:.2f}%</p>
+                <p>Average: {avg_values["HUM"]:.2f}{sensors.get("HUM").unit}</p>
             </div>
         </div>
         <div class="card-column">
             <div class="card" onclick="navigateTo('/Air_Pressure')">
                 <div class="icon">🌬️</div>
                 <h2>Air Pressure</h2>
-                <p>Average: {avg_values["PRES"]:.2f} hPa</p>
+                <p>Average: {avg_values["PRES"]:.2f} {sensors.get("PRES").unit}</p>
             </div>
         </div>
     </div>
@@ -85,14 +76,14 @@ st.markdown(f"""
             <div class="card" onclick="navigateTo('/Ultrasound')">
                 <div class="icon">📡</div>
                 <h2>Ultrasound</h2>
-                <p>Average: {avg_values["US"]:.2f}</p>
+                <p>Average: {avg_values["US"]:.2f} {sensors.get("US").unit}</p>
             </div>
         </div>
         <div class="card-column">
             <div class="card" onclick="navigateTo('/Soil_Moisture')">
                 <div class="icon">🌱</div>
                 <h2>Soil Moisture</h2>
-                <p>Average: {avg_values["SOIL1"]:.2f}%</p>
+                <p>Average: {avg_values["SOIL1"]:.2f} {sensors.get("SOIL1").unit}</p>
             </div>
         </div>
     </div>
@@ -104,28 +95,13 @@ css_file_path = os.path.join(os.path.dirname(__file__), "styles.css")
 with open(css_file_path) as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-# Function to construct the file path
-def get_file_path(filename):
-    """
-    Constructs the absolute path to the data file.
-
-    Args:
-        filename (str): The name of the data file (e.g., "predicted_data_2024.csv").
+# Load the station's predictions from the shared sensor store, indexed by time
+if station.forecast:
+    with metrics.stage("Home", "load"):
+        forecast_index = store.load_index(station.forecast)
 
-    Returns:
-        str: The absolute path to the data file.
-    """
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    return os.path.join(current_dir, filename)
-
-# Define the filename
-data_file = "predicted_data_2024.csv"
-
-# Load dataset
-df = pd.read_csv(get_file_path(data_file))
-
-# Convert the timestamp column to datetime
-df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # One row per forecast day, so the forecast cards are direct lookups
+        daily_forecast = forecast_summary.load_summary(station.forecast)
 
 # Set timezone to GMT+1
 tz = pytz.timezone('Europe/Belgrade')  # Prizren is in the same timezone as Belgrade
@@ -135,55 +111,37 @@ def get_current_time_gmt_plus_1():
     return datetime.now(tz)
 
 # Filter data for the current date
-def get_today_data(df, current_datetime):
-    return df[df['timestamp'].dt.date == current_datetime.date()]
+@metrics.timed("Home", "filter")
+def get_today_data(index, current_datetime):
+    return index.slice_day(current_datetime)
 
 # Function to calculate forecast for the actual day
-def calculate_actual_day_forecast(df_today):
-    if not df_today.empty:
-        forecast_data = {
-            'TC_predicted': df_today.iloc[-1]['TC_predicted'],
-            'HUM_predicted': df_today.iloc[-1]['HUM_predicted'],
-            'PRES_predicted': df_today.iloc[-1]['PRES_predicted'],
-            'US_predicted': df_today.iloc[-1]['US_predicted'],
-            'SOIL1_predicted': df_today.iloc[-1]['SOIL1_predicted']
-        }
-    else:
-        forecast_data = {}
-    return forecast_data
+@metrics.timed("Home", "aggregate")
+def calculate_actual_day_forecast(summary, current_datetime):
+    return forecast_summary.day_values(summary, current_datetime)
 
 # Function to calculate forecast for the next 3 days
-def calculate_3_day_forecast(df, current_datetime):
-    forecast_data = {
-        'TC_predicted': [],
-        'HUM_predicted': [],
-        'PRES_predicted': [],
-        'US_predicted': [],
-        'SOIL1_predicted': []
-    }
+@metrics.timed("Home", "aggregate")
+def calculate_3_day_forecast(summary, current_datetime):
+    forecast_data = {column: [] for column in forecast_summary.PREDICTED_COLUMNS}
     for i in range(3):
         next_date = current_datetime + timedelta(days=i+1)
-        df_next_day = df[df['timestamp'].dt.date == next_date.date()]
-        if not df_next_day.empty:
-            forecast_data['TC_predicted'].append(df_next_day.iloc[-1]['TC_predicted'])
-            forecast_data['HUM_predicted'].append(df_next_day.iloc[-1]['HUM_predicted'])
-            forecast_data['PRES_predicted'].append(df_next_day.iloc[-1]['PRES_predicted'])
-            forecast_data['US_predicted'].append(df_next_day.iloc[-1]['US_predicted'])
-            forecast_data['SOIL1_predicted'].append(df_next_day.iloc[-1]['SOIL1_predicted'])
-        else:
-            forecast_data['TC_predicted'].append(None)
-            forecast_data['HUM_predicted'].append(None)
-            forecast_data['PRES_predicted'].append(None)
-            forecast_data['US_predicted'].append(None)
-            forecast_data['SOIL1_predicted'].append(None)
+        day_forecast = forecast_summary.day_values(summary, next_date)
+        for column in forecast_data:
+            forecast_data[column].append(day_forecast.get(column))
     return forecast_data
 
 def main():
+    # Forecasts are only computed for some stations
+    if not station.forecast:
+        st.info(f"No forecast is available for {station.name}.")
+        return
+
     # Get current datetime in GMT+1
     current_datetime = get_current_time_gmt_plus_1()
 
     # Filter data for the current date
-    df_today = get_today_data(df, current_datetime)
+    df_today = get_today_data(forecast_index, current_datetime)
 
     # Extract the latest data point for current conditions
     if not df_today.empty:
@@ -193,7 +151,7 @@ def main():
         return
 
     # Current Location
-    current_location = 'Prizren, Kosovë'
+    current_location = station.location or station.name
     st.subheader(f'Current Location: {current_location}')
 
     # Weather icon and temperature
@@ -208,7 +166,7 @@ def main():
 
 
     # Today's Forecast
-    forecast_data_actual_day = calculate_actual_day_forecast(df_today)
+    forecast_data_actual_day = calculate_actual_day_forecast(daily_forecast, current_datetime)
 
     if forecast_data_actual_day:
         st.markdown(
@@ -245,7 +203,7 @@ def main():
         st.error("No data available for the forecast.")
 
     # Calculate the 3-day forecast
-    forecast_data_3_days = calculate_3_day_forecast(df, current_datetime)
+    forecast_data_3_days = calculate_3_day_forecast(daily_forecast, current_datetime)
 
     # Display forecast for the next 3 days
     st.subheader('3 Days Forecast')
@@ -291,42 +249,50 @@ def main():
     # Temperature and Humidity Analytics for Today
     st.subheader('Analytics for Today')
 
-    # Resample the data for visualization
-    df_today_resampled = df_today.set_index('timestamp').resample('3H').mean()
-
-    # Show the plots for temperature, humidity, pressure, US, and Soil vertically
-    fig, ax = plt.subplots(5, 1, figsize=(10, 15))
-
-    # Plot temperature
-    ax[0].plot(df_today_resampled.index.strftime('%I %p'), df_today_resampled['TC_predicted'], marker='o')
-    ax[0].set_ylabel('Temperature (°F)')
-    ax[0].set_title('Temperature')
-
-    # Plot humidity
-    ax[1].plot(df_today_resampled.index.strftime('%I %p'), df_today_resampled['HUM_predicted'], marker='o')
-    ax[1].set_ylabel('Humidity (%)')
-    ax[1].set_title('Humidity')
-
-    # Plot pressure
-    ax[2].plot(df_today_resampled.index.strftime('%I %p'), df_today_resampled['PRES_predicted'], marker='o')
-    ax[2].set_ylabel('Pressure')
-    ax[2].set_title('Pressure')
-
-    # Plot US
-    ax[3].plot(df_today_resampled.index.strftime('%I %p'), df_today_resampled['US_predicted'], marker='o')
-    ax[3].set_ylabel('US')
-    ax[3].set_title('US')
-
-    # Plot Soil
-    ax[4].plot(df_today_resampled.index.strftime('%I %p'), df_today_resampled['SOIL1_predicted'], marker='o')
-    ax[4].set_ylabel('Soil')
-    ax[4].set_title('Soil')
-
-    # Adjust layout
-    plt.tight_layout()
+    # Draw the figure only when it is not in the figure cache yet
+    def draw_today_analytics(fig):
+        # Today's 3-hourly averages, from the series resampled once per forecast file
+        day_start = pd.Timestamp(current_datetime.date())
+        df_today_resampled = resampling.resample_frame(
+            station.forecast, forecast_summary.PREDICTED_COLUMNS, '3h',
+            start=day_start, end=day_start + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+        ).set_index('timestamp')
+
+        # Show the plots for temperature, humidity, pressure, US, and Soil vertically
+        ax = fig.subplots(5, 1)
+
+        # Plot temperature
+        ax[0].plot(df_today_resampled.index.strftime('%I %p'), df_today_resampled['TC_predicted'], marker='o')
+        ax[0].set_ylabel('Temperature (°F)')
+        ax[0].set_title('Temperature')
+
+        # Plot humidity
+        ax[1].plot(df_today_resampled.index.strftime('%I %p'), df_today_resampled['HUM_predicted'], marker='o')
+        ax[1].set_ylabel('Humidity (%)')
+        ax[1].set_title('Humidity')
+
+        # Plot pressure
+        ax[2].plot(df_today_resampled.index.strftime('%I %p'), df_today_resampled['PRES_predicted'], marker='o')
+        ax[2].set_ylabel('Pressure')
+        ax[2].set_title('Pressure')
+
+        # Plot US
+        ax[3].plot(df_today_resampled.index.strftime('%I %p'), df_today_resampled['US_predicted'], marker='o')
+        ax[3].set_ylabel('US')
+        ax[3].set_title('US')
+
+        # Plot Soil
+        ax[4].plot(df_today_resampled.index.strftime('%I %p'), df_today_resampled['SOIL1_predicted'], marker='o')
+        ax[4].set_ylabel('Soil')
+        ax[4].set_title('Soil')
+
+        # Adjust layout
+        fig.tight_layout()
 
     # Show the plots vertically
-    st.pyplot(fig)
+    version = (store.data_version(station.forecast), current_datetime.date())
+    with metrics.stage("Home", "render"):
+        st.image(figures.render('today_analytics', station.id, version, draw_today_analytics, figsize=(10, 15)), use_column_width=True)
 
 
 
@@ -338,3 +304,4 @@ if __name__ == '__main__':
 
 # Footer
 st.markdown("<footer>Smart Agriculture Dashboard ©️ 2024</footer>", unsafe_allow_html=True)
+metrics.timing_panel("Home")
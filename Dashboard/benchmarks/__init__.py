@@ -0,0 +1,3 @@
+"""
+Benchmarks of the dashboard data paths on synthetic data (see run.py).
+"""
@@ -0,0 +1,160 @@
+"""
+Headless render benchmark of every dashboard page.
+
+Each page script is driven through Streamlit's ``AppTest`` harness, once
+on its own and once per button it shows (chart types, "Show All",
+"Calculate Correlation", ...).  Every interaction runs in a fresh
+interpreter, so caches start cold and the peak RSS belongs to that
+interaction alone:
+
+    python benchmarks/render.py
+    python benchmarks/render.py pages/Correlation.py --json render.json
+
+For each interaction the report lists the wall time of the rerun it
+triggers, the peak RSS of the process and the payload sent to the browser:
+the serialized elements plus the media files (chart images) they refer to.
+The slowest interactions are listed first.
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+# Directory of app.py, the root of the page scripts
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds a single script run may take
+TIMEOUT = 300
+
+
+def _payload_bytes(node):
+    """
+    Sums the serialized size of an element tree.
+
+    Args:
+        node: A node of ``AppTest``'s element tree.
+
+    Returns:
+        int: The protobuf size of the node and its children in bytes.
+    """
+    proto = getattr(node, "proto", None)
+    size = proto.ByteSize() if hasattr(proto, "ByteSize") else 0
+    return size + sum(_payload_bytes(child) for child in getattr(node, "children", {}).values())
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_interaction(page, button=None):
+    """
+    Renders a page and optionally clicks one of its buttons.
+
+    Args:
+        page (str): The page script, relative to the Dashboard directory.
+        button (int): The position of the button to click, or None to
+            only render the page.
+
+    Returns:
+        dict: The interaction, its wall time in seconds, the peak RSS in
+        MB, the payload in bytes, the labels of the page's buttons and the
+        exceptions the page raised.
+    """
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import AppTest
+
+    # Media files are dropped after every run, so count them as they are added
+    media = []
+    load_and_get_id = MemoryMediaFileStorage.load_and_get_id
+
+    def counting_load_and_get_id(self, path_or_data, *args, **kwargs):
+        if isinstance(path_or_data, bytes):
+            media.append(len(path_or_data))
+        return load_and_get_id(self, path_or_data, *args, **kwargs)
+    MemoryMediaFileStorage.load_and_get_id = counting_load_and_get_id
+
+    app = AppTest.from_file(page, default_timeout=TIMEOUT)
+    started = time.perf_counter()
+    app.run()
+    elapsed = time.perf_counter() - started
+    labels = [widget.label for widget in app.button]
+    interaction = "render"
+    if button is not None:
+        interaction = labels[button]
+        media.clear()
+        started = time.perf_counter()
+        app.button[button].click().run()
+        elapsed = time.perf_counter() - started
+
+    return {
+        "page": page,
+        "interaction": interaction,
+        "seconds": elapsed,
+        "peak_rss_mb": _peak_rss_mb(),
+        "payload_bytes": _payload_bytes(app._tree) + sum(media),
+        "buttons": labels,
+        "errors": [str(exception.value) for exception in app.exception],
+    }
+
+
+def measure(page, button=None):
+    """
+    Runs one interaction in a fresh interpreter.
+
+    Args:
+        page (str): The page script, relative to the Dashboard directory.
+        button (int): The position of the button to click, or None.
+
+    Returns:
+        dict: The result of ``run_interaction``.
+    """
+    command = [sys.executable, os.path.abspath(__file__), "--worker", page]
+    if button is not None:
+        command += ["--button", str(button)]
+    env = dict(os.environ, PYTHONPATH=DASHBOARD_DIR, STREAMLIT_LOG_LEVEL="error")
+    result = subprocess.run(command, cwd=DASHBOARD_DIR, env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"{page} failed:\n{result.stderr}")
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rendering every dashboard page headlessly.")
+    parser.add_argument("pages", nargs="*", help="page scripts (default: app.py and pages/*.py)")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--button", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        sys.path.insert(0, DASHBOARD_DIR)
+        print(json.dumps(run_interaction(args.worker, args.button)))
+        return 0
+
+    pages = args.pages or ["app.py"] + sorted(glob.glob("pages/*.py", root_dir=DASHBOARD_DIR))
+    results = []
+    for page in pages:
+        first = measure(page)
+        results.append(first)
+        results += [measure(page, button) for button in range(len(first["buttons"]))]
+
+    print(f"{'page':<32} {'interaction':<28} {'seconds':>8} {'peak RSS':>10} {'payload':>10}")
+    for result in sorted(results, key=lambda result: -result["seconds"]):
+        print(f"{result['page']:<32} {result['interaction']:<28} {result['seconds']:8.3f}"
+              f" {result['peak_rss_mb']:7.0f} MB {result['payload_bytes'] / 1024:7.0f} KB"
+              + (f"  errors: {len(result['errors'])}" if result["errors"] else ""))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=1)
+    return 1 if any(result["errors"] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Runs the data path benchmarks and records them in a JSON history.
+
+Synthetic datasets are generated on first use under ``.store/benchmarks``
+and converted into a separate sensor store there, so the shipped data and
+its caches are never touched.  Each result is compared with the latest
+earlier run of the same benchmark and size in the history:
+
+    python benchmarks/run.py
+    python benchmarks/run.py --sizes 33k,1m --filter correlation --repeat 10
+
+The 10m size needs about 3 GB of memory and several minutes the first
+time, while its CSV files are written and converted.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Directory of app.py, the root of the smartagri package
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Directory holding the generated datasets, their store and the history
+BENCH_DIR = os.path.join(DASHBOARD_DIR, ".store", "benchmarks")
+
+# Shortest time one sample of a benchmark runs for, in seconds
+MIN_SAMPLE_SECONDS = 0.05
+
+# Slowdown, relative to the previous run, reported as a regression
+REGRESSION_RATIO = 1.2
+
+
+def measure(call, repeat):
+    """
+    Times a call, repeating it until each sample is long enough to measure.
+
+    Args:
+        call (callable): The call to time.
+        repeat (int): The number of samples.
+
+    Returns:
+        dict: The number of calls per sample and the minimum and median
+        seconds per call.
+    """
+    # The first call warms up caches and sets the calls per sample
+    started = time.perf_counter()
+    call()
+    elapsed = time.perf_counter() - started
+    number = max(1, int(MIN_SAMPLE_SECONDS / elapsed)) if elapsed > 0 else 1000
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            call()
+        samples.append((time.perf_counter() - started) / number)
+    return {"number": number, "min": min(samples), "median": statistics.median(samples)}
+
+
+def git_commit():
+    """
+    Returns the commit the benchmarks ran against.
+
+    Returns:
+        str: The short commit hash, or None outside of a git checkout.
+    """
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DASHBOARD_DIR,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def load_history(path):
+    """
+    Reads the recorded benchmark runs.
+
+    Args:
+        path (str): The JSON history file.
+
+    Returns:
+        list: The earlier runs, oldest first.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def previous_results(history):
+    """
+    Returns the latest recorded result of every benchmark and size.
+
+    Args:
+        history (list): The earlier runs, oldest first.
+
+    Returns:
+        dict: The result of each ``(benchmark, size)`` pair.
+    """
+    previous = {}
+    for run in history:
+        for result in run["results"]:
+            previous[(result["name"], result["size"])] = result
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard data paths.")
+    parser.add_argument("--sizes", default="33k,1m,10m",
+                        help="comma-separated dataset sizes, named or in rows (default: %(default)s)")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="samples per benchmark (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic data (default: %(default)s)")
+    parser.add_argument("--history", default=os.path.join(BENCH_DIR, "history.json"),
+                        help="JSON file the results are appended to (default: %(default)s)")
+    parser.add_argument("--no-record", action="store_true", help="do not append the results to the history")
+    args = parser.parse_args()
+
+    # The store location is read on import, so set it before loading the suite
+    os.environ.setdefault("SENSOR_STORE_DIR", os.path.join(BENCH_DIR, "store"))
+    sys.path.insert(0, DASHBOARD_DIR)
+    from benchmarks import suite, synthetic
+
+    history = load_history(args.history)
+    previous = previous_results(history)
+    results = []
+    regressions = 0
+    for size in args.sizes.split(","):
+        sensors, forecast = synthetic.ensure_datasets(os.path.join(BENCH_DIR, "data"), size, args.seed)
+        dataset = suite.Dataset(size, synthetic.parse_size(size), sensors, forecast)
+        print(f"{size} ({dataset.rows} rows)")
+        for name, bench in suite.benchmarks().items():
+            if args.filter not in name:
+                continue
+            call = bench(dataset)
+            if call is None:
+                continue
+            result = dict(name=name, size=size, rows=dataset.rows, repeat=args.repeat, **measure(call, args.repeat))
+            results.append(result)
+
+            line = f"  {name:<32} {result['median'] * 1000:10.3f} ms  (min {result['min'] * 1000:.3f} ms)"
+            before = previous.get((name, size))
+            if before:
+                ratio = result["median"] / before["median"]
+                line += f"  {ratio - 1:+.0%} vs {before.get('commit') or 'previous'}"
+                if ratio > REGRESSION_RATIO:
+                    line += "  REGRESSION"
+                    regressions += 1
+            print(line)
+
+    if not args.no_record and results:
+        commit = git_commit()
+        for result in results:
+            result["commit"] = commit
+        history.append({
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        })
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, "w") as f:
+            json.dump(history, f, indent=1)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Benchmarks of the dashboard's data paths.
+
+Every ``bench_*`` function does its setup against one synthetic dataset
+and returns the call to time, or None when the benchmark does not apply to
+that size.  Each call mirrors the work a page does, through the same
+``smartagri`` functions:
+
+* ``load_data``: the frame every sensor page loads, with the frame cache
+  cleared so the Arrow file is converted to pandas again.
+* ``calculate_averages``: the home page averages, cold (bucket statistics
+  built from the rows) and warm (merged from the buckets).
+* ``get_today_data`` and ``calculate_3_day_forecast``: the home page
+  forecast lookups.
+* ``date_range_filter``: the slice and min/max of Parameters Details.
+* ``pie_binning``: the ``pd.cut`` binning of the pie charts.
+* ``correlation_matrix``: the Correlation page, for each method.
+"""
+from collections import namedtuple
+
+import pandas as pd
+
+from smartagri import cache, correlation, forecast_summary, stats, store
+
+Dataset = namedtuple("Dataset", ["size", "rows", "sensors", "forecast"])
+
+# Largest dataset each rank-based correlation method is timed on
+MAX_RANK_ROWS = {"spearman": 1_000_000, "kendall": 100_000}
+
+
+def _middle_day(filename):
+    index = store.load_index(filename)
+    return (index.first + (index.last - index.first) / 2).date()
+
+
+def bench_load_data(dataset):
+    path = store.get_file_path(dataset.sensors)
+    store.open_table(dataset.sensors)
+
+    def run():
+        cache.frames.invalidate(path)
+        return store.load_frame(dataset.sensors)
+    return run
+
+
+def bench_load_data_cached(dataset):
+    store.load_frame(dataset.sensors)
+    return lambda: store.load_frame(dataset.sensors)
+
+
+def bench_calculate_averages_cold(dataset):
+    frame = store.load_frame(dataset.sensors, store.SENSORS)
+    return lambda: stats.BucketStats.from_frame(frame, store.SENSORS).total().summary()
+
+
+def bench_calculate_averages(dataset):
+    stats.get_buckets(dataset.sensors)
+    return lambda: stats.summary(dataset.sensors)
+
+
+def bench_get_today_data(dataset):
+    index = store.load_index(dataset.forecast)
+    day = _middle_day(dataset.forecast)
+    return lambda: index.slice_day(day)
+
+
+def bench_calculate_3_day_forecast_cold(dataset):
+    frame = store.load_frame(dataset.forecast)
+    return lambda: forecast_summary.summarize_days(frame)
+
+
+def bench_calculate_3_day_forecast(dataset):
+    summary = forecast_summary.load_summary(dataset.forecast)
+    day = pd.Timestamp(_middle_day(dataset.forecast))
+
+    def run():
+        return [forecast_summary.day_values(summary, day + pd.Timedelta(days=i)) for i in range(1, 4)]
+    return run
+
+
+def bench_date_range_filter(dataset):
+    index = store.load_index(dataset.sensors)
+    stats.get_buckets(dataset.sensors)
+    # The middle half of the data, with edges inside partial buckets
+    start = index.first + (index.last - index.first) / 4 + pd.Timedelta(minutes=7)
+    end = index.last - (index.last - index.first) / 4 + pd.Timedelta(minutes=7)
+
+    def run():
+        filtered = index.slice_range(start, end)
+        return filtered, stats.summary(dataset.sensors, start, end)
+    return run
+
+
+def bench_pie_binning(dataset):
+    data = store.load_frame(dataset.sensors, ["TC"])
+    return lambda: pd.cut(data["TC"], bins=5).value_counts()
+
+
+def _correlation(method, cold):
+    def bench(dataset):
+        if dataset.rows > MAX_RANK_ROWS.get(method, dataset.rows):
+            return None
+        path = store.get_file_path(dataset.sensors)
+        correlation.correlation_matrix(dataset.sensors, method)
+
+        def run():
+            if cold:
+                cache.frames.invalidate(path)
+            return correlation.correlation_matrix(dataset.sensors, method)
+        return run
+    return bench
+
+
+bench_correlation_pearson = _correlation("pearson", cold=False)
+bench_correlation_spearman = _correlation("spearman", cold=True)
+bench_correlation_kendall = _correlation("kendall", cold=True)
+
+
+def benchmarks():
+    """
+    Returns every benchmark of the suite.
+
+    Returns:
+        dict: The setup function of each benchmark, by name.
+    """
+    return {name[len("bench_"):]: bench for name, bench in globals().items() if name.startswith("bench_")}
@@ -0,0 +1,130 @@
+"""
+Synthetic sensor and forecast datasets for the benchmarks.
+
+The generated CSV files have the columns of ``cleaned_data.csv`` and
+``predicted_data_2024.csv``, with readings that follow a daily cycle, a
+few missing values and the irregular spacing of the real sensors, so the
+data paths do the same work they do on the shipped files, only at a
+larger scale.  Files are written once per size and seed and reused.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# Named dataset sizes, in rows
+SIZES = {"33k": 33_843, "1m": 1_000_000, "10m": 10_000_000}
+
+# Rows generated and written per chunk
+CHUNK_ROWS = 1_000_000
+
+# Share of sensor readings left empty
+MISSING_RATE = 0.01
+
+SENSOR_START = pd.Timestamp("2023-01-06 12:31:00")
+FORECAST_START = pd.Timestamp("2024-01-01 00:00:00")
+
+
+def parse_size(size):
+    """
+    Converts a dataset size to a number of rows.
+
+    Args:
+        size (str): A name from ``SIZES`` or a plain number of rows.
+
+    Returns:
+        int: The number of rows.
+    """
+    return SIZES[size] if size in SIZES else int(size)
+
+
+def _readings(rng, seconds):
+    """
+    Generates one chunk of sensor readings.
+
+    Args:
+        rng (numpy.random.Generator): The random generator.
+        seconds (numpy.ndarray): Seconds since the start of the dataset.
+
+    Returns:
+        dict: The reading of every sensor, by column.
+    """
+    day = 2 * np.pi * (seconds % 86400) / 86400
+    year = 2 * np.pi * seconds / (365 * 86400)
+    rows = len(seconds)
+    temperature = 12 - 8 * np.cos(year) - 5 * np.cos(day) + rng.normal(0, 0.5, rows)
+    return {
+        "TC": temperature,
+        "HUM": np.clip(95 - 2 * temperature + rng.normal(0, 3, rows), 10, 100),
+        "PRES": 97900 + 300 * np.sin(year * 20) + rng.normal(0, 20, rows),
+        "US": rng.integers(25, 31, rows).astype(float),
+        "SOIL1": 1000 + 200 * np.cos(year * 12) + rng.normal(0, 5, rows),
+    }
+
+
+def write_sensors(path, rows, seed=0):
+    """
+    Writes a synthetic sensor dataset shaped like ``cleaned_data.csv``.
+
+    Args:
+        path (str): The CSV file to write.
+        rows (int): The number of readings.
+        seed (int): The random seed.
+    """
+    rng = np.random.default_rng(seed)
+    elapsed = 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        for first in range(0, rows, CHUNK_ROWS):
+            count = min(CHUNK_ROWS, rows - first)
+            # Readings arrive every 10 to 110 seconds
+            seconds = elapsed + np.cumsum(rng.integers(10, 111, count))
+            elapsed = int(seconds[-1])
+            chunk = pd.DataFrame(_readings(rng, seconds))
+            chunk = chunk.mask(rng.random(chunk.shape) < MISSING_RATE)
+            chunk.insert(0, "timestamp", SENSOR_START + pd.to_timedelta(seconds, unit="s"))
+            chunk.to_csv(f, header=first == 0, index=False, float_format="%.2f")
+    os.replace(tmp_path, path)
+
+
+def write_forecast(path, rows, seed=0):
+    """
+    Writes a synthetic forecast shaped like ``predicted_data_2024.csv``.
+
+    Args:
+        path (str): The CSV file to write.
+        rows (int): The number of forecast steps, one minute apart.
+        seed (int): The random seed.
+    """
+    rng = np.random.default_rng(seed + 1)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        for first in range(0, rows, CHUNK_ROWS):
+            seconds = 60 * np.arange(first, min(first + CHUNK_ROWS, rows))
+            chunk = pd.DataFrame({f"{column}_predicted": values for column, values in _readings(rng, seconds).items()})
+            chunk.insert(0, "timestamp", FORECAST_START + pd.to_timedelta(seconds, unit="s"))
+            chunk.to_csv(f, header=first == 0, index=False)
+    os.replace(tmp_path, path)
+
+
+def ensure_datasets(data_dir, size, seed=0):
+    """
+    Returns the synthetic datasets of one size, generating them if needed.
+
+    Args:
+        data_dir (str): The directory holding the generated files.
+        size (str): A name from ``SIZES`` or a plain number of rows.
+        seed (int): The random seed.
+
+    Returns:
+        tuple: The absolute paths of the sensor and forecast CSV files.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    rows = parse_size(size)
+    sensors = os.path.join(data_dir, f"sensors-{size}-{seed}.csv")
+    forecast = os.path.join(data_dir, f"forecast-{size}-{seed}.csv")
+    if not os.path.exists(sensors):
+        write_sensors(sensors, rows, seed)
+    if not os.path.exists(forecast):
+        write_forecast(forecast, rows, seed)
+    return sensors, forecast
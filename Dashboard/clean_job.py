@@ -0,0 +1,61 @@
+"""
+Cleans a raw sensor log into the dataset the dashboard reads.
+
+Run it on a logger's raw CSV (``timestamp`` plus the sensor columns):
+
+    python clean_job.py --input raw_log.csv
+    python clean_job.py --input raw_log.csv --outliers iqr --unit PRES=hPa --unit TC=°F
+
+The log is streamed in chunks, so it may be larger than memory.  Without
+--output the result replaces cleaned_data.csv; the dashboard pages pick it
+up on their next rerun.
+"""
+import argparse
+import sys
+
+from smartagri import cleaning, store
+
+
+def parse_unit(text):
+    column, _, unit = text.partition("=")
+    if not unit:
+        raise argparse.ArgumentTypeError(f"expected COLUMN=UNIT, got {text!r}")
+    return column, unit
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean a raw sensor log into a dataset CSV.")
+    parser.add_argument("--input", required=True, help="raw CSV log to clean")
+    parser.add_argument("--output", default=store.CLEANED_DATA,
+                        help="CSV file to write, next to app.py (default: %(default)s)")
+    parser.add_argument("--outliers", choices=cleaning.OUTLIER_METHODS, default="hampel",
+                        help="outlier filter (default: %(default)s)")
+    parser.add_argument("--unit", type=parse_unit, action="append", default=[], metavar="COLUMN=UNIT",
+                        help="unit a column was logged in, e.g. PRES=hPa; may be repeated")
+    parser.add_argument("--fill-limit", type=int, default=cleaning.FILL_LIMIT,
+                        help="rows a reading may be forward-filled, -1 for no limit (default: %(default)s)")
+    parser.add_argument("--max-gap", default=cleaning.MAX_GAP,
+                        help="longest pause that is not a gap (default: %(default)s)")
+    parser.add_argument("--chunk-rows", type=int, default=cleaning.CHUNK_ROWS,
+                        help="rows read at once (default: %(default)s)")
+    args = parser.parse_args()
+
+    try:
+        report = cleaning.clean_file(args.input, store.get_file_path(args.output), units=dict(args.unit),
+                                     outliers=args.outliers,
+                                     fill_limit=None if args.fill_limit < 0 else args.fill_limit,
+                                     max_gap=args.max_gap, chunk_rows=args.chunk_rows)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    for name in ["rows_read", "duplicates", "out_of_order", "outliers", "filled", "rows_written"]:
+        print(f"{name}: {report[name]}")
+    print(f"gaps: {len(report['gaps'])}")
+    for start, end, duration in report["gaps"]:
+        print(f"  {start} -> {end} ({duration})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Batch job that trains the forecast models and writes an hourly forecast.
+
+Run it from a scheduler or by hand:
+
+    python forecast_job.py --workers 4
+    python forecast_job.py --start 2025-01-01 --days 730 --output predicted_data_2025.csv
+
+Without options it forecasts 2024 into predicted_data_2024.csv, the file
+the dashboard reads.
+
+Only one job runs at a time; a second invocation exits immediately while
+the first one holds the lock.
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+from smartagri import forecasting, store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the sensor forecasts.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of training processes (default: FORECAST_WORKERS or CPU count)")
+    parser.add_argument("--start", default=forecasting.FORECAST_START,
+                        help="first forecast hour (default: %(default)s)")
+    parser.add_argument("--end", default=None,
+                        help=f"last forecast hour (default: {forecasting.FORECAST_END})")
+    parser.add_argument("--days", type=int, default=None,
+                        help="forecast this many days from --start instead of up to --end")
+    parser.add_argument("--output", default=store.PREDICTED_DATA,
+                        help="CSV file to write, next to app.py (default: %(default)s)")
+    args = parser.parse_args()
+
+    end = args.end or forecasting.FORECAST_END
+    if args.days is not None:
+        end = pd.Timestamp(args.start) + pd.Timedelta(days=args.days) - pd.Timedelta(hours=1)
+
+    def show_progress(done, total, sensor):
+        print(f"Trained {sensor} ({done}/{total})", flush=True)
+
+    if not forecasting.run_job(args.workers, show_progress, start=args.start, end=end, filename=args.output):
+        print("A forecast job is already running.")
+        return 1
+    print(f"Predictions complete. The result is saved in {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Reports the import cost and cold-start time of the dashboard pages.
+
+Each page runs once in a fresh interpreter with ``python -X importtime``,
+outside of a Streamlit server, so every import is paid again.  The report
+lists the total import time, the time to run the whole page and the
+packages that took longest to import:
+
+    python import_report.py
+    python import_report.py pages/Temperature.py --top 20
+
+Run it from the Dashboard directory after changing page imports to check
+that heavy libraries (matplotlib, seaborn, prophet) stay off the default
+code path.
+"""
+import argparse
+import glob
+import os
+import re
+import subprocess
+import sys
+import time
+
+# Directory of app.py, the root of the page scripts
+DASHBOARD_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Packages that should only be imported on the code path that needs them
+HEAVY_PACKAGES = ["matplotlib", "seaborn", "prophet", "cmdstanpy", "scipy"]
+
+# Runs one page script as __main__, the way Streamlit does
+RUNNER = "import runpy, sys; runpy.run_path(sys.argv[1], run_name='__main__')"
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| \s*(\S+)")
+
+
+def parse_importtime(output):
+    """
+    Parses the ``-X importtime`` log of an interpreter.
+
+    Args:
+        output (str): The interpreter's stderr.
+
+    Returns:
+        dict: The time in seconds spent importing each top-level package,
+        including all of its submodules, by package name.
+    """
+    imports = {}
+    for line in output.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            package = match.group(3).split(".")[0]
+            imports[package] = imports.get(package, 0) + int(match.group(1)) / 1e6
+    return imports
+
+
+def measure(page):
+    """
+    Runs a page in a fresh interpreter and measures its imports.
+
+    Args:
+        page (str): The page script, relative to the Dashboard directory.
+
+    Returns:
+        tuple: The wall time in seconds, the import time per package and
+        the set of every module imported.
+    """
+    env = dict(os.environ, PYTHONPATH=DASHBOARD_DIR, STREAMLIT_LOG_LEVEL="error")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUNNER, page],
+        cwd=DASHBOARD_DIR, env=env, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - started
+    modules = {match.group(3) for match in map(_IMPORT_LINE.match, result.stderr.splitlines()) if match}
+    return elapsed, parse_importtime(result.stderr), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the import cost of every dashboard page.")
+    parser.add_argument("pages", nargs="*", help="page scripts (default: app.py and pages/*.py)")
+    parser.add_argument("--top", type=int, default=8, help="packages listed per page (default: %(default)s)")
+    args = parser.parse_args()
+
+    pages = args.pages or ["app.py"] + sorted(glob.glob("pages/*.py", root_dir=DASHBOARD_DIR))
+    for page in pages:
+        elapsed, imports, modules = measure(page)
+        heavy = [name for name in HEAVY_PACKAGES if name in modules]
+        print(f"{page}: {elapsed:.2f}s to run, {sum(imports.values()):.2f}s importing")
+        print(f"  heavy imports: {', '.join(heavy) or 'none'}")
+        for name, seconds in sorted(imports.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {seconds:7.3f}s  {name}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Streams new sensor readings into the dashboard's sensor store.
+
+Run it next to the dashboard with one source:
+
+    python ingest_job.py --tail /var/log/sensors.csv
+    python ingest_job.py --udp 5005
+    python ingest_job.py --http 8502
+    python ingest_job.py --replay serial.log --speed 60
+
+The readings are appended to cleaned_data.csv's store as new segments, and
+the dashboard pages pick them up on their next rerun.  Readings of another
+field station go to that station's monthly partitions:
+
+    python ingest_job.py --udp 5006 --station rahovec
+"""
+import argparse
+import sys
+
+from smartagri import ingest, store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append new sensor readings to the sensor store.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--tail", metavar="FILE", help="follow a CSV file that a logger appends to")
+    source.add_argument("--udp", metavar="PORT", type=int, help="receive lines as UDP datagrams")
+    source.add_argument("--http", metavar="PORT", type=int, help="receive lines as HTTP POST bodies")
+    source.add_argument("--replay", metavar="FILE", help="replay a recorded serial log")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed-up, 0 for as fast as possible (default: %(default)s)")
+    parser.add_argument("--from-start", action="store_true",
+                        help="with --tail, also ingest the lines already in the file")
+    parser.add_argument("--dataset", default=store.CLEANED_DATA,
+                        help="dataset to append to (default: %(default)s)")
+    parser.add_argument("--station",
+                        help="write to the partitions of this station instead of the dataset")
+    parser.add_argument("--batch-size", type=int, default=ingest.BATCH_SIZE,
+                        help="maximum rows per segment (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.tail:
+        lines = ingest.tail_file(args.tail, from_start=args.from_start)
+    elif args.udp:
+        lines = ingest.udp_source(port=args.udp)
+    elif args.http:
+        lines = ingest.http_source(port=args.http)
+    else:
+        lines = ingest.replay_log(args.replay, args.speed)
+
+    def show_progress(appended, total):
+        print(f"Appended {appended} rows ({total} in total)", flush=True)
+
+    try:
+        ingest.run(lines, args.dataset, args.batch_size, show_progress, args.station)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 import os
 
+from smartagri import correlation, figures, fleet, metrics, store
+from smartagri.downsample import downsample
+
 # Set page configuration to wide mode
 st.set_page_config(page_title="Smart Agriculture Dashboard", layout="wide")
 
@@ -13,48 +14,6 @@ with open(css_file_path) as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
 
-# Get the absolute path to the current directory
-current_dir = os.path.dirname(os.path.abspath(__file__))
-
-# Function to construct the file path
-def get_file_path(filename):
-    """
-    Constructs the absolute path to the data file.
-
-    Args:
-        filename (str): The name of the data file (e.g., "cleaned_data.csv").
-
-    Returns:
-        str: The absolute path to the data file.
-    """
-    return os.path.join(current_dir, filename)
-
-# Define the filename
-data_file = "cleaned_data.csv"
-
-# Function to load the data
-@st.cache_data
-def load_data(file_path):
-    """
-    Loads the data from the specified file path.
-
-    Args:
-        file_path (str): The absolute path to the data file.
-
-    Returns:
-        pandas.DataFrame: The loaded data as a pandas DataFrame.
-    """
-    data = pd.read_csv(file_path)
-    # Add any necessary data processing steps here (e.g., handling missing values)
-    # ...
-    return data
-
-# Load the data using the function
-data = load_data(get_file_path(data_file))
-
-# Data processing (assuming the 'timestamp' column exists)
-data['timestamp'] = pd.to_datetime(data['timestamp'])
-
 # Function to explain correlation strength
 def explain_correlation(corr_value):
     """
@@ -72,18 +31,20 @@ def explain_correlation(corr_value):
         return "Very strong correlation."
     
 
-# Calculate the correlation matrix
-corr_matrix = data[["TC", "HUM", "PRES", "US", "SOIL1"]].corr()
-
 # Function to display the full correlation matrix heatmap
 def show_full_heatmap():
     """
     Displays the heatmap for the entire correlation matrix.
     """
-    fig, ax = plt.subplots()
-    sns.heatmap(corr_matrix, annot=True, cmap="coolwarm", fmt=".2f", ax=ax, linewidths=0.5)
-    ax.set_title("Correlation Matrix (All Factors)")
-    st.pyplot(fig)
+    def draw(fig):
+        import seaborn as sns
+
+        ax = fig.subplots()
+        sns.heatmap(corr_matrix, annot=True, cmap="coolwarm", fmt=".2f", ax=ax, linewidths=0.5)
+        ax.set_title(f"{method_names[method]} Correlation Matrix (All Factors)")
+
+    with metrics.stage("Correlation", "render"):
+        st.image(figures.render(f"{scope} {method} heatmap", "all", version, draw), use_column_width=True)
 
 # Page title
 st.title("Correlation Analyzer for Environmental Factors")
@@ -92,6 +53,29 @@ st.title("Correlation Analyzer for Environmental Factors")
 factor1 = st.selectbox("Select First Factor:", ["TC", "HUM", "PRES", "US", "SOIL1"])
 factor2 = st.selectbox("Select Second Factor:", ["TC", "HUM", "PRES", "US", "SOIL1"])
 
+# Correlation method; Spearman and Kendall suit the stepped US and SOIL1 sensors better
+method_names = {
+    "pearson": "Pearson",
+    "spearman": "Spearman",
+    "kendall": "Kendall",
+    "partial": "Partial"
+}
+
+# Rows the matrix is computed over: the sensor dataset or every station's partitions
+scope_names = {"dataset": "This dataset", "fleet": "All stations"}
+scope = st.selectbox("Data:", list(scope_names), format_func=lambda s: scope_names[s])
+methods = correlation.METHODS if scope == "dataset" else correlation.FLEET_METHODS
+method = st.selectbox("Correlation Method:", methods, format_func=lambda m: method_names[m])
+
+# Calculate the correlation matrix, cached until new rows arrive
+with metrics.stage("Correlation", "aggregate"):
+    if scope == "dataset":
+        corr_matrix = correlation.correlation_matrix(store.CLEANED_DATA, method, ["TC", "HUM", "PRES", "US", "SOIL1"])
+        version = store.data_version(store.CLEANED_DATA)
+    else:
+        corr_matrix = correlation.fleet_matrix(method, ["TC", "HUM", "PRES", "US", "SOIL1"])
+        version = fleet.data_version()
+
 # Buttons for correlation analysis and full matrix display
 if st.button("Calculate Correlation"):
     # Check if user selected factors
@@ -100,10 +84,15 @@ if st.button("Calculate Correlation"):
         corr_value = corr_matrix.loc[factor1, factor2]
 
         # Display correlation heatmap (reduced size for better layout)
-        fig, ax = plt.subplots(figsize=(5, 5))
-        sns.heatmap(corr_matrix[[factor1, factor2]][[factor1, factor2]], annot=True, cmap="coolwarm", fmt=".2f", ax=ax)
-        ax.set_title("Correlation Heatmap (Selected Factors)")
-        st.pyplot(fig)
+        def draw(fig):
+            import seaborn as sns
+
+            ax = fig.subplots()
+            sns.heatmap(corr_matrix[[factor1, factor2]][[factor1, factor2]], annot=True, cmap="coolwarm", fmt=".2f", ax=ax)
+            ax.set_title("Correlation Heatmap (Selected Factors)")
+
+        with metrics.stage("Correlation", "render"):
+            st.image(figures.render(f"{scope} {method} heatmap", (factor1, factor2), version, draw, figsize=(5, 5)), use_column_width=True)
 
         # Display correlation value and explanation
         st.write(f"*Correlation between {factor1} and {factor2}:* {corr_value:.2f}")
@@ -114,5 +103,32 @@ if st.button("Calculate Correlation"):
 if st.button("Show All"):
     show_full_heatmap()
 
+# Correlation of the selected factors over time
+st.markdown("<div class='card1'><h3>Rolling Correlation</h3></div>", unsafe_allow_html=True)
+window = st.selectbox("Rolling Window:", ["1D", "7D", "30D"], format_func=lambda w: {"1D": "1 day", "7D": "7 days", "30D": "30 days"}[w])
+
+if st.button("Show Rolling Correlation"):
+    if factor1 != factor2:
+        with metrics.stage("Correlation", "aggregate"):
+            rolling_corr = correlation.rolling_correlation(store.CLEANED_DATA, factor1, factor2, window)
+        st.line_chart(downsample(rolling_corr, "correlation"))
+    else:
+        st.warning("Please select two different factors to calculate correlation.")
+
+# Correlation of the first factor with the second one shifted in time
+st.markdown("<div class='card1'><h3>Lagged Correlation</h3></div>", unsafe_allow_html=True)
+max_lag = st.slider("Maximum Lag (hours):", min_value=1, max_value=72, value=24)
+
+if st.button("Show Lagged Correlation"):
+    with metrics.stage("Correlation", "aggregate"):
+        lagged_corr = correlation.lagged_correlation(store.CLEANED_DATA, factor1, factor2, f"{max_lag}h")
+    st.line_chart(lagged_corr)
+    if lagged_corr["correlation"].notna().any():
+        best_lag = lagged_corr["correlation"].abs().idxmax()
+        best_value = lagged_corr.loc[best_lag, "correlation"]
+        st.write(f"*Strongest correlation:* {best_value:.2f} when {factor2} is shifted by {best_lag:+.2f} hours")
+        st.write(f"A positive lag means changes in {factor1} are followed by changes in {factor2}.")
+
 # Footer
 st.markdown("<footer>Smart Agriculture Dashboard ©️ 2024</footer>", unsafe_allow_html=True)
+metrics.timing_panel("Correlation")
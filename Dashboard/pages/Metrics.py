@@ -0,0 +1,53 @@
+import streamlit as st
+import pandas as pd
+import json
+import os
+
+from smartagri import metrics
+
+# Set page configuration to wide mode
+st.set_page_config(page_title="Smart Agriculture Dashboard", layout="wide")
+
+# Load custom CSS
+css_file_path = os.path.join(os.path.dirname(__file__), "styles.css")
+with open(css_file_path) as f:
+    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+
+# Page title
+st.title("Page Timings")
+
+# Timings are only collected when the dashboard runs with DASHBOARD_METRICS=1
+if not metrics.ENABLED:
+    st.info("Instrumentation is disabled. Start the dashboard with DASHBOARD_METRICS=1 to collect page timings.")
+    st.markdown("<footer>Smart Agriculture Dashboard © 2024</footer>", unsafe_allow_html=True)
+    st.stop()
+
+rows = metrics.snapshot()
+if not rows:
+    st.info("No page has been timed yet. Open a few pages and come back.")
+else:
+    # One row per page and stage, slowest p95 first
+    table = pd.DataFrame(rows).drop(columns="buckets")
+    table["mean"] = table["sum"] / table["count"]
+    for column in ["mean", "p50", "p95", "p99"]:
+        table[column] = table[column] * 1000
+    table = table.rename(columns={column: f"{column} (ms)" for column in ["mean", "p50", "p95", "p99"]})
+    table = table[["page", "stage", "count", "mean (ms)", "p50 (ms)", "p95 (ms)", "p99 (ms)"]]
+    st.dataframe(table.sort_values("p95 (ms)", ascending=False), hide_index=True, use_container_width=True)
+
+    # Latency distribution of one stage
+    labels = [f"{row['page']} / {row['stage']}" for row in rows]
+    selected = rows[labels.index(st.selectbox("Stage:", labels))]
+    cumulative = pd.Series(selected["buckets"])
+    counts = cumulative.diff().fillna(cumulative.iloc[0]).astype(int)
+    st.dataframe(counts.rename("runs").rename_axis("up to (s)").reset_index(), hide_index=True)
+
+# Exports for monitoring
+col1, col2 = st.columns(2)
+col1.download_button("Download Prometheus text", metrics.to_prometheus(rows), file_name="metrics.prom")
+col2.download_button("Download JSON", json.dumps(rows, indent=1), file_name="metrics.json")
+if st.button("Write Dump Files"):
+    metrics.dump()
+    st.success(f"Written to {metrics.DUMP_PATH}.prom and {metrics.DUMP_PATH}.json")
+
+st.markdown("<footer>Smart Agriculture Dashboard © 2024</footer>", unsafe_allow_html=True)
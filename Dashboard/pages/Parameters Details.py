@@ -2,80 +2,57 @@ import streamlit as st
 import pandas as pd
 import os
 
+from smartagri import metrics, sensors, stats, store
+from smartagri.downsample import downsample
+
 # Set page configuration to wide mode
 st.set_page_config(page_title="Smart Agriculture Dashboard", layout="wide")
 
 
-def get_file_path(filename):
-    """
-    Constructs the absolute path to the data file.
-
-    Args:
-        filename (str): The name of the data file (e.g., "cleaned_data.csv").
-
-    Returns:
-        str: The absolute path to the data file.
-    """
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    return os.path.join(current_dir, filename)
-
 # Load custom CSS (assuming your CSS file is named "styles.css")
 css_file_path = os.path.join(os.path.dirname(__file__), "styles.css")
 with open(css_file_path) as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-# Get the data path (assuming the file is within the app)
-data_path = get_file_path("cleaned_data.csv")
-
-# Load the data
-data = pd.read_csv(data_path)
-
-# Convert timestamp column to datetime (assuming consistent format)
-data['timestamp'] = pd.to_datetime(data['timestamp'])
+# Load the data from the shared sensor store, indexed by time
+with metrics.stage("Parameters Details", "load"):
+    index = store.load_index(store.CLEANED_DATA)
 
 # Sidebar for date/time selection
 st.sidebar.header("Filter Data")
-start_date = st.sidebar.date_input("Start Date", data['timestamp'].min())
-end_date = st.sidebar.date_input("End Date", data['timestamp'].max())
+start_date = st.sidebar.date_input("Start Date", index.first)
+end_date = st.sidebar.date_input("End Date", index.last)
 
 # Check if the start and end dates are the same
 if start_date == end_date:
     st.sidebar.write("Select hours for the same day:")
-    start_time = st.sidebar.time_input("Start Time", pd.to_datetime(data['timestamp']).min().time())
-    end_time = st.sidebar.time_input("End Time", pd.to_datetime(data['timestamp']).max().time())
+    start_time = st.sidebar.time_input("Start Time", index.first.time())
+    end_time = st.sidebar.time_input("End Time", index.last.time())
 else:
-    start_time = pd.to_datetime(data['timestamp']).min().time()
-    end_time = pd.to_datetime(data['timestamp']).max().time()
+    start_time = index.first.time()
+    end_time = index.last.time()
 
 # Sidebar for parameter selection
-parameter_dict = {
-    "TC": "Temperature",
-    "HUM": "Humidity",
-    "PRES": "Air Pressure",
-    "US": "Ultrasound",
-    "SOIL1": "Soil Moisture"
-}
+parameter_dict = sensors.labels()
 parameter = st.sidebar.selectbox("Parameter", list(parameter_dict.keys()), format_func=lambda x: parameter_dict[x])
 
 # Filter data based on date and time selection
-if start_date == end_date:
-    filtered_data = data[
-        (data['timestamp'] >= pd.to_datetime(f"{start_date} {start_time}")) &
-        (data['timestamp'] <= pd.to_datetime(f"{end_date} {end_time}"))
-    ]
-else:
-    filtered_data = data[
-        (data['timestamp'] >= pd.to_datetime(f"{start_date} {start_time}")) &
-        (data['timestamp'] <= pd.to_datetime(f"{end_date} {end_time}"))
-    ]
+start = pd.to_datetime(f"{start_date} {start_time}")
+end = pd.to_datetime(f"{end_date} {end_time}")
+with metrics.stage("Parameters Details", "filter"):
+    filtered_data = index.slice_range(start, end)
 
 # Display filtered data
 st.markdown(f"<div class='main'><h2>{parameter_dict[parameter]} Data from {start_date} to {end_date}</h2></div>", unsafe_allow_html=True)
-st.line_chart(filtered_data.set_index('timestamp')[parameter])
-
-# Display min and max values
-min_value = filtered_data[parameter].min()
-max_value = filtered_data[parameter].max()
+with metrics.stage("Parameters Details", "render"):
+    st.line_chart(downsample(filtered_data, parameter))
+
+# Display min and max values, merged from the per-hour statistics
+with metrics.stage("Parameters Details", "aggregate"):
+    range_summary = stats.summary(store.CLEANED_DATA, start, end)
+    min_value = range_summary.loc[parameter, "min"]
+    max_value = range_summary.loc[parameter, "max"]
 st.markdown(f"<div class='card1'><p>Min {parameter_dict[parameter]}: {min_value}</p><p>Max {parameter_dict[parameter]}: {max_value}</p></div>", unsafe_allow_html=True)
 
 st.markdown("<footer>Smart Agriculture Dashboard ©️ 2024</footer>", unsafe_allow_html=True)
+metrics.timing_panel("Parameters Details")
@@ -0,0 +1,6 @@
+"""
+Shared data layer for the Smart Agriculture Dashboard.
+
+The Streamlit pages import from this package instead of each parsing the
+sensor CSV files on their own.
+"""
@@ -0,0 +1,114 @@
+"""
+Process-wide cache for DataFrames served by the sensor store.
+
+Streamlit runs every session in the same process, so a module-level cache
+is shared by all of them.  Unlike ``st.cache_data`` it does not pickle or
+copy the frame on each hit: every caller gets a shallow copy that shares
+the cached column arrays, which for frames from the sensor store are
+read-only memory maps.  Entries are keyed by file path, data version and a
+variant (such as a column projection), so rewriting or appending to a dataset invalidates its
+entries on the next lookup, and the least recently used entries are
+evicted once the total size goes over the memory budget.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+# Memory budget for cached frames, in megabytes
+DEFAULT_BUDGET_MB = 512
+
+
+def frame_nbytes(frame):
+    """
+    Returns the number of bytes held by a DataFrame's columns and index.
+
+    Args:
+        frame (pandas.DataFrame): The frame to measure.
+
+    Returns:
+        int: The size in bytes.
+    """
+    return int(frame.memory_usage(index=True, deep=False).sum())
+
+
+class DatasetCache:
+    """
+    LRU cache of DataFrames with a memory budget.
+
+    Args:
+        max_bytes (int): The total size the cached frames may occupy.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, path, version, variant, loader):
+        """
+        Returns the cached frame for a key, loading it on a miss.
+
+        Args:
+            path (str): The source file of the frame.
+            version (hashable): The version of the source data, e.g. the
+                value of ``store.data_version``.
+            variant (hashable): Distinguishes frames built from the same
+                file, e.g. a column projection.
+            loader (callable): Called without arguments to build the frame.
+
+        Returns:
+            pandas.DataFrame: A shallow copy of the cached frame.
+        """
+        key = (path, version, variant)
+        with self._lock:
+            frame = self._entries.get(key)
+            if frame is not None:
+                self._entries.move_to_end(key)
+                return frame.copy(deep=False)
+
+        frame = loader()
+
+        with self._lock:
+            # Drop entries for older versions of the same file
+            for stale in [k for k in self._entries if k[0] == path and k[1] != version]:
+                self._discard(stale)
+            if key not in self._entries:
+                self._entries[key] = frame
+                self._nbytes += frame_nbytes(frame)
+            self._evict()
+            return self._entries.get(key, frame).copy(deep=False)
+
+    def invalidate(self, path=None):
+        """
+        Drops the cached frames of one file, or of every file.
+
+        Args:
+            path (str): The source file to invalidate, or None for all.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if path is None or k[0] == path]:
+                self._discard(key)
+
+    def stats(self):
+        """
+        Returns the number of cached frames and their total size.
+
+        Returns:
+            dict: The entry count, used bytes and budget.
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._nbytes, "max_bytes": self.max_bytes}
+
+    def _discard(self, key):
+        frame = self._entries.pop(key)
+        self._nbytes -= frame_nbytes(frame)
+
+    def _evict(self):
+        # Keep at least the most recent entry even if it alone is over budget
+        while self._nbytes > self.max_bytes and len(self._entries) > 1:
+            self._discard(next(iter(self._entries)))
+
+
+# Cache shared by every page and session in this process
+frames = DatasetCache(int(float(os.environ.get("SENSOR_CACHE_MB", DEFAULT_BUDGET_MB)) * 1024 * 1024))
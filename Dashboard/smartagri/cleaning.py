@@ -0,0 +1,457 @@
+"""
+Cleaning of raw sensor logs into the dataset the dashboard reads.
+
+A raw log (``timestamp`` plus the sensor columns) goes through these
+stages, each vectorized over all sensors at once:
+
+1. Unit normalization: readings logged in other units (e.g. pressure in
+   hPa, temperature in °F) are converted to the units of
+   ``cleaned_data.csv``.
+2. Deduplication: rows are sorted by timestamp and a repeated timestamp
+   keeps its last reading.
+3. Outlier filtering: readings outside the IQR fences (``Q1 - k*IQR``,
+   ``Q3 + k*IQR``) or flagged by a Hampel filter (distance from the rolling
+   median above a number of rolling MADs) become missing.
+4. Gap detection: a pause between readings longer than ``MAX_GAP`` starts
+   a new segment and is reported.
+5. Forward fill: a missing reading takes the last valid one, at most
+   ``FILL_LIMIT`` rows on and never across a gap.
+
+``clean_file`` streams a log of any size through the stages in chunks.
+The Hampel window and the fill limit only look a few rows back and ahead,
+so each chunk is processed with a little context from its neighbours and
+the result does not depend on the chunk size.  IQR fences are global, so
+with IQR filtering they are computed first from a uniform sample of the
+log.  Rows older than the last row already read are dropped: a log is
+expected to be in time order, give or take repeated timestamps.  The last
+row of a chunk is held back until the next chunk is read, so a repeated
+timestamp keeps its last reading even across chunks.
+
+The forecasting job reuses ``forward_fill`` and ``mask_outliers`` on the
+hourly data instead of filtering each sensor on its own.
+"""
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from smartagri import store
+
+# Rows read from a raw log at once
+CHUNK_ROWS = 100000
+
+# Longest pause between two readings that is not a gap
+MAX_GAP = "30min"
+
+# Rows a missing reading may be forward-filled from
+FILL_LIMIT = 3
+
+# IQR fence multiplier
+IQR_K = 1.5
+
+# Readings in the Hampel window, centred on the reading tested
+HAMPEL_WINDOW = 7
+
+# Rolling MADs a reading may be from the rolling median
+HAMPEL_THRESHOLD = 3.0
+
+# Rows sampled from a log to compute the IQR fences
+SAMPLE_ROWS = 1000000
+
+# Outlier filters accepted by clean_file
+OUTLIER_METHODS = ["iqr", "hampel", "none"]
+
+# Scale and offset converting a unit into the unit of cleaned_data.csv
+UNIT_CONVERSIONS = {
+    "TC": {"°C": (1.0, 0.0), "°F": (5 / 9, -32 * 5 / 9), "K": (1.0, -273.15)},
+    "HUM": {"%": (1.0, 0.0), "fraction": (100.0, 0.0)},
+    "PRES": {"Pa": (1.0, 0.0), "hPa": (100.0, 0.0), "kPa": (1000.0, 0.0)},
+}
+
+# Scale of the MAD that estimates the standard deviation of normal data
+_MAD_SCALE = 1.4826
+
+# Scale of the mean absolute deviation that does the same, used when MAD is 0
+_MEAN_AD_SCALE = 1.2533
+
+
+def normalize_units(frame, units):
+    """
+    Converts readings to the units of the cleaned dataset.
+
+    Args:
+        frame (pandas.DataFrame): The readings; converted in place.
+        units (dict): The unit each column was logged in, e.g.
+            ``{"PRES": "hPa"}``; columns not listed are left as they are.
+
+    Returns:
+        pandas.DataFrame: The frame.
+    """
+    for column, unit in (units or {}).items():
+        try:
+            scale, offset = UNIT_CONVERSIONS[column][unit]
+        except KeyError:
+            raise ValueError(f"Unknown unit for {column}: {unit}") from None
+        if (scale, offset) != (1.0, 0.0):
+            frame[column] = frame[column] * scale + offset
+    return frame
+
+
+def drop_duplicates(frame):
+    """
+    Sorts readings by timestamp and keeps the last reading of each timestamp.
+
+    Args:
+        frame (pandas.DataFrame): The readings.
+
+    Returns:
+        tuple: The deduplicated frame and the number of rows dropped.
+    """
+    frame = frame.sort_values("timestamp", kind="stable")
+    deduplicated = frame.drop_duplicates("timestamp", keep="last")
+    return deduplicated, len(frame) - len(deduplicated)
+
+
+def find_gaps(timestamps, max_gap=MAX_GAP):
+    """
+    Finds the pauses between readings longer than a maximum.
+
+    Args:
+        timestamps (pandas.Series): Sorted timestamps.
+        max_gap: The longest pause that is not a gap.
+
+    Returns:
+        pandas.DataFrame: One row per gap with its ``start`` (last reading
+        before), ``end`` (first reading after) and ``duration``.
+    """
+    values = timestamps.to_numpy(dtype="datetime64[ns]")
+    steps = np.diff(values)
+    after = np.flatnonzero(steps > pd.Timedelta(max_gap).to_timedelta64()) + 1
+    return pd.DataFrame({"start": values[after - 1], "end": values[after], "duration": steps[after - 1]})
+
+
+def _segments(timestamps, max_gap):
+    # Segment number of every row, increasing after each gap
+    if max_gap is None or not len(timestamps):
+        return np.zeros(len(timestamps), dtype=np.int64)
+    steps = np.diff(timestamps.to_numpy(dtype="datetime64[ns]"))
+    return np.concatenate([[0], np.cumsum(steps > pd.Timedelta(max_gap).to_timedelta64())])
+
+
+def forward_fill(frame, columns, limit=FILL_LIMIT, max_gap=MAX_GAP):
+    """
+    Fills missing readings with the last valid reading before them.
+
+    Args:
+        frame (pandas.DataFrame): Readings sorted by timestamp.
+        columns (list): The columns to fill.
+        limit (int): The most consecutive rows filled from one reading, 0 to
+            fill nothing, or None for no limit.
+        max_gap: Readings are not carried across a pause longer than this;
+            None to fill across any pause.
+
+    Returns:
+        pandas.DataFrame: A copy of the frame with the columns filled.
+    """
+    frame = frame.copy()
+    if limit == 0:
+        return frame
+    if max_gap is None:
+        frame[columns] = frame[columns].ffill(limit=limit)
+    else:
+        frame[columns] = frame[columns].groupby(_segments(frame["timestamp"], max_gap)).ffill(limit=limit)
+    return frame
+
+
+def iqr_bounds(frame, columns, k=IQR_K):
+    """
+    Computes the IQR fences of each column.
+
+    Args:
+        frame (pandas.DataFrame): The readings, or a sample of them.
+        columns (list): The columns.
+        k (float): The fence multiplier.
+
+    Returns:
+        pandas.DataFrame: ``lower`` and ``upper`` fence per column.
+    """
+    quartiles = frame[columns].quantile([0.25, 0.75])
+    spread = quartiles.loc[0.75] - quartiles.loc[0.25]
+    return pd.DataFrame({"lower": quartiles.loc[0.25] - k * spread, "upper": quartiles.loc[0.75] + k * spread})
+
+
+def mask_outliers(frame, columns, bounds):
+    """
+    Replaces readings outside the given fences with NaN.
+
+    Args:
+        frame (pandas.DataFrame): The readings.
+        columns (list): The columns to filter.
+        bounds (pandas.DataFrame): ``lower`` and ``upper`` per column, as
+            returned by ``iqr_bounds``.
+
+    Returns:
+        tuple: A copy of the frame with outliers masked and the number of
+        readings masked.
+    """
+    values = frame[columns]
+    outside = (values < bounds["lower"]) | (values > bounds["upper"])
+    frame = frame.copy()
+    frame[columns] = values.mask(outside)
+    return frame, int(outside.to_numpy().sum())
+
+
+def hampel_outliers(values, window=HAMPEL_WINDOW, threshold=HAMPEL_THRESHOLD):
+    """
+    Flags readings far from the median of their neighbours.
+
+    A reading is an outlier when it is more than ``threshold`` scaled MADs
+    from the median of the ``window`` readings centred on it.  Where the
+    MAD is 0 (stepped sensors that rarely change) the scaled mean absolute
+    deviation is used instead, so a lone spike is still caught.
+
+    Args:
+        values (numpy.ndarray): Readings, one column per sensor.
+        window (int): The odd number of readings in the window.
+        threshold (float): The number of scaled deviations allowed.
+
+    Returns:
+        numpy.ndarray: True where a reading is an outlier.
+    """
+    half = window // 2
+    padded = np.pad(values.astype(np.float64), ((half, half), (0, 0)), constant_values=np.nan)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=0)
+    with warnings.catch_warnings():
+        # Windows with no reading at all yield NaN, which flags nothing
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(windows, axis=-1)
+        deviations = np.abs(windows - median[..., None])
+        scale = _MAD_SCALE * np.nanmedian(deviations, axis=-1)
+        scale = np.where(scale > 0, scale, _MEAN_AD_SCALE * np.nanmean(deviations, axis=-1))
+    with np.errstate(invalid="ignore"):
+        return np.abs(values - median) > threshold * scale
+
+
+class Cleaner:
+    """
+    Streaming cleaner: feed chunks of a raw log, get cleaned rows back.
+
+    Every call to ``feed`` returns the rows that are final; the last few
+    rows wait for the next chunk (the Hampel filter looks ahead), and
+    ``finish`` returns them.  ``report`` counts what each stage did.
+
+    Args:
+        columns (list): The sensor columns.
+        units (dict): The unit each column was logged in (see
+            ``normalize_units``).
+        outliers (str): One of ``OUTLIER_METHODS``.
+        bounds (pandas.DataFrame): The IQR fences, required for "iqr".
+        fill_limit (int): See ``forward_fill``.
+        max_gap: See ``find_gaps``.
+        window (int): The Hampel window.
+        threshold (float): The Hampel threshold.
+    """
+
+    def __init__(self, columns=None, units=None, outliers="hampel", bounds=None, fill_limit=FILL_LIMIT,
+                 max_gap=MAX_GAP, window=HAMPEL_WINDOW, threshold=HAMPEL_THRESHOLD):
+        if outliers not in OUTLIER_METHODS:
+            raise ValueError(f"Unknown outlier method: {outliers}")
+        if outliers == "iqr" and bounds is None:
+            raise ValueError("IQR filtering needs the fences, see iqr_bounds")
+        self.columns = list(columns or store.SENSORS)
+        self.units = units
+        self.outliers = outliers
+        self.bounds = bounds
+        self.fill_limit = fill_limit
+        self.max_gap = max_gap
+        self.window = window
+        self.threshold = threshold
+        self.report = {"rows_read": 0, "duplicates": 0, "out_of_order": 0, "outliers": 0, "filled": 0,
+                       "rows_written": 0, "gaps": []}
+
+        # Rows already returned, kept as context: raw for the Hampel window,
+        # outlier-masked for the forward fill
+        self._raw = None
+        self._history = None
+        # Rows read but not returned yet
+        self._pending = None
+        self._last = None
+
+    def feed(self, chunk):
+        """
+        Cleans the next chunk of the log.
+
+        Args:
+            chunk (pandas.DataFrame): Raw readings with a ``timestamp`` column.
+
+        Returns:
+            pandas.DataFrame: The cleaned rows that are final so far.
+        """
+        self.report["rows_read"] += len(chunk)
+        chunk = chunk[["timestamp"] + self.columns].copy()
+        chunk["timestamp"] = pd.to_datetime(chunk["timestamp"], errors="coerce")
+        chunk = normalize_units(chunk.dropna(subset=["timestamp"]), self.units)
+        chunk, duplicates = drop_duplicates(chunk)
+        self.report["duplicates"] += duplicates
+
+        if self._last is not None:
+            late = chunk["timestamp"].to_numpy() < self._last
+            self.report["out_of_order"] += int(late.sum())
+            chunk = chunk[~late]
+            if len(chunk) and chunk["timestamp"].iloc[0] == self._last:
+                # A repeat of the held-back last row replaces it, so the last reading wins
+                self.report["duplicates"] += 1
+                self._pending = self._pending.iloc[:-1]
+        if len(chunk):
+            self._last = chunk["timestamp"].to_numpy()[-1]
+
+        pending = chunk if self._pending is None else pd.concat([self._pending, chunk])
+        pending = pending.reset_index(drop=True)
+        # The last row may still be replaced by a repeat in the next chunk, so
+        # it is held back and kept out of the Hampel window of earlier rows
+        held, pending = pending.iloc[-1:], pending.iloc[:-1]
+        # The Hampel window of the last rows is not complete yet
+        lookahead = self.window // 2 if self.outliers == "hampel" else 0
+        out = self._process(pending, max(len(pending) - lookahead, 0))
+        self._pending = pd.concat([self._pending, held], ignore_index=True)
+        return out
+
+    def finish(self):
+        """
+        Cleans the rows still waiting for more of the log.
+
+        Returns:
+            pandas.DataFrame: The last cleaned rows.
+        """
+        if self._pending is None:
+            return pd.DataFrame(columns=["timestamp"] + self.columns)
+        return self._process(self._pending, len(self._pending))
+
+    def _process(self, pending, ready):
+        # Clean the first `ready` pending rows
+        if not ready:
+            self._pending = pending
+            return pending.iloc[:0]
+        new = pending.iloc[:ready]
+        if self.outliers == "iqr":
+            new, count = mask_outliers(new, self.columns, self.bounds)
+        elif self.outliers == "hampel":
+            raw = pending if self._raw is None else pd.concat([self._raw, pending], ignore_index=True)
+            offset = len(raw) - len(pending)
+            flags = hampel_outliers(raw[self.columns].to_numpy(), self.window, self.threshold)[offset:offset + ready]
+            new = new.copy()
+            new[self.columns] = new[self.columns].mask(flags)
+            count = int(flags.sum())
+        else:
+            count = 0
+        self.report["outliers"] += count
+
+        history = self._history
+        frame = new if history is None else pd.concat([history, new], ignore_index=True)
+        context = len(frame) - len(new)
+        if self.max_gap is not None:
+            # Include the last row already returned so a gap before the chunk counts once
+            gaps = find_gaps(frame["timestamp"].iloc[max(context - 1, 0):], self.max_gap)
+            self.report["gaps"].extend(gaps.itertuples(index=False, name=None))
+
+        filled = forward_fill(frame, self.columns, self.fill_limit, self.max_gap)
+        out = filled.iloc[context:].reset_index(drop=True)
+        self.report["filled"] += int(new[self.columns].isna().to_numpy().sum() - out[self.columns].isna().to_numpy().sum())
+        self.report["rows_written"] += len(out)
+
+        # Context for the next rows: enough to fill from, and the Hampel window
+        if len(frame):
+            if self.fill_limit is None:
+                self._history = filled.iloc[-1:].reset_index(drop=True)
+            else:
+                self._history = frame.iloc[-max(self.fill_limit, 1):].reset_index(drop=True)
+        if self.outliers == "hampel" and ready:
+            raw = pending.iloc[:ready] if self._raw is None else pd.concat([self._raw, pending.iloc[:ready]])
+            self._raw = raw.iloc[max(len(raw) - self.window // 2, 0):].reset_index(drop=True)
+        self._pending = pending.iloc[ready:].reset_index(drop=True)
+        return out
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS):
+    """
+    Reads a raw CSV log in chunks.
+
+    Args:
+        path (str): The log file.
+        chunk_rows (int): The rows per chunk.
+
+    Yields:
+        pandas.DataFrame: The next chunk of rows.
+    """
+    yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def sample_rows(chunks, size=SAMPLE_ROWS, seed=0):
+    """
+    Draws a uniform sample of rows from a stream of chunks.
+
+    Every row gets a random key and the rows with the smallest keys are
+    kept, so the sample is uniform however many rows the stream has.
+
+    Args:
+        chunks (iterable): Frames of rows.
+        size (int): The number of rows to keep.
+        seed (int): The random seed.
+
+    Returns:
+        pandas.DataFrame: The sampled rows.
+    """
+    rng = np.random.default_rng(seed)
+    sample, keys = None, np.empty(0)
+    for chunk in chunks:
+        chunk = chunk.reset_index(drop=True)
+        keys = np.concatenate([keys, rng.random(len(chunk))])
+        sample = chunk if sample is None else pd.concat([sample, chunk], ignore_index=True)
+        if len(sample) > size:
+            keep = np.argpartition(keys, size)[:size]
+            sample, keys = sample.iloc[keep].reset_index(drop=True), keys[keep]
+    return sample
+
+
+def clean_file(src, dst, columns=None, units=None, outliers="hampel", fill_limit=FILL_LIMIT,
+               max_gap=MAX_GAP, chunk_rows=CHUNK_ROWS):
+    """
+    Cleans a raw log into a dataset CSV, streaming it in chunks.
+
+    Args:
+        src (str): The raw CSV log.
+        dst (str): The cleaned CSV to write; replaced in one step.
+        columns (list): The sensor columns, or None for all sensors.
+        units (dict): The unit each column was logged in.
+        outliers (str): One of ``OUTLIER_METHODS``.
+        fill_limit (int): See ``forward_fill``.
+        max_gap: See ``find_gaps``.
+        chunk_rows (int): The rows read at once.
+
+    Returns:
+        dict: The counts of every stage and the list of gaps found.
+    """
+    columns = list(columns or store.SENSORS)
+    bounds = None
+    if outliers == "iqr":
+        # The fences are global, so take them from a first pass over the log
+        sample = sample_rows(normalize_units(chunk, units) for chunk in read_chunks(src, chunk_rows))
+        bounds = iqr_bounds(sample, columns)
+    cleaner = Cleaner(columns, units, outliers, bounds, fill_limit, max_gap)
+
+    tmp_path = f"{dst}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", newline="") as f:
+            # An explicit format, so a chunk of midnight timestamps is not written as dates
+            header = True
+            for chunk in read_chunks(src, chunk_rows):
+                cleaner.feed(chunk).to_csv(f, index=False, header=header, date_format=store.DATE_FORMAT)
+                header = False
+            cleaner.finish().to_csv(f, index=False, header=header, date_format=store.DATE_FORMAT)
+        os.replace(tmp_path, dst)
+    finally:
+        # Leave nothing behind if cleaning failed
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return cleaner.report
@@ -0,0 +1,346 @@
+"""
+Rolling and lagged correlation between sensors.
+
+The readings are irregularly spaced, so both analyses run on a regular
+5-minute grid built from the 5-minute rollups, with NaN where a slot has
+no reading.  Pairs with a missing value are left out, like
+``DataFrame.corr`` does.
+
+* ``rolling``: the correlation over a sliding window, from cumulative sums
+  of the pair counts, sums, squares and products, so every window costs
+  the same regardless of its length.
+* ``lagged``: the correlation of one sensor with another shifted by every
+  lag up to a maximum.  The per-lag sums are cross-correlations, computed
+  for all lags at once with FFTs.
+
+``correlation_matrix`` offers methods besides Pearson for the stepped,
+non-linear sensors: Spearman, Kendall's tau-b (Knight's O(n log n)
+algorithm) and partial correlation controlling for the other sensors.
+Each matrix is computed once per data version and cached.
+
+``fleet_matrix`` computes the moment-based methods (Pearson and partial)
+over the rows of every station, from the per-partition partials of
+``smartagri.fleet``.  Rank-based methods need all rows in one place and
+are only offered for a single dataset.
+"""
+import numpy as np
+import pandas as pd
+
+from smartagri import cache, fleet, rollups, stats, store
+
+# Spacing of the analysis grid; must be one of the rollup resolutions
+GRID_FREQ = "5min"
+
+# Methods offered by correlation_matrix
+METHODS = ["pearson", "spearman", "kendall", "partial"]
+
+# Methods offered by fleet_matrix
+FLEET_METHODS = ["pearson", "partial"]
+
+
+def sensor_grid(filename=store.CLEANED_DATA, columns=None):
+    """
+    Returns the mean of each sensor on a regular 5-minute grid.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        columns (list): The sensor columns, or None for all sensors.
+
+    Returns:
+        pandas.DataFrame: One row per grid slot, NaN where a slot is empty.
+    """
+    columns = list(columns or store.SENSORS)
+    rollup = rollups.get_engine(filename).rollups.get(GRID_FREQ)
+    if rollup is None or rollup.empty:
+        return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name="timestamp"))
+    grid = pd.DataFrame({
+        column: rollup[f"{column}_sum"] / rollup[f"{column}_count"].where(rollup[f"{column}_count"] > 0)
+        for column in columns
+    })
+    full = pd.date_range(grid.index[0], grid.index[-1], freq=GRID_FREQ, name="timestamp")
+    return grid.reindex(full)
+
+
+def _centered(x, y):
+    # Zero out incomplete pairs and center the rest on their means
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if not valid.any():
+        return valid.astype(np.float64), np.zeros_like(x), np.zeros_like(y)
+    x = np.where(valid, x - x[valid].mean(), 0.0)
+    y = np.where(valid, y - y[valid].mean(), 0.0)
+    return valid.astype(np.float64), x, y
+
+
+def _pearson(n, sx, sy, sxx, syy, sxy, min_periods):
+    # Pearson correlation from pair sums, NaN where undefined
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        corr = cov / np.sqrt(var_x * var_y)
+    corr[(n < max(min_periods, 2)) | ~(var_x > 1e-12 * sxx) | ~(var_y > 1e-12 * syy)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def rolling(x, y, window, min_periods=None):
+    """
+    Computes the correlation of two series over a sliding window.
+
+    Args:
+        x (numpy.ndarray): The first series, NaN where missing.
+        y (numpy.ndarray): The second series, NaN where missing.
+        window (int): The window length in samples.
+        min_periods (int): The fewest complete pairs a window needs, or
+            None for half the window.
+
+    Returns:
+        numpy.ndarray: The correlation of the window ending at every
+        sample, NaN for the first ``window - 1`` samples.
+    """
+    min_periods = window // 2 if min_periods is None else min_periods
+    result = np.full(len(x), np.nan)
+    if window > len(x):
+        return result
+
+    valid, x, y = _centered(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+    sums = []
+    for values in (valid, x, y, x * x, y * y, x * y):
+        total = np.concatenate([[0.0], np.cumsum(values)])
+        sums.append(total[window:] - total[:-window])
+    result[window - 1:] = _pearson(*sums, min_periods)
+    return result
+
+
+def _xcorr(a, b, max_lag, size):
+    # sum_t a[t] * b[t + lag] for every lag in [-max_lag, max_lag]
+    full = np.fft.irfft(np.conj(np.fft.rfft(a, size)) * np.fft.rfft(b, size), size)
+    return np.concatenate([full[size - max_lag:], full[:max_lag + 1]])
+
+
+def lagged(x, y, max_lag, min_periods=2):
+    """
+    Computes the correlation of ``x`` with ``y`` shifted by every lag.
+
+    A positive lag pairs ``x`` at time ``t`` with ``y`` at ``t + lag``, so a
+    peak at a positive lag means ``y`` follows ``x`` with that delay.
+
+    Args:
+        x (numpy.ndarray): The first series, NaN where missing.
+        y (numpy.ndarray): The second series, NaN where missing.
+        max_lag (int): The largest lag in samples, in both directions.
+        min_periods (int): The fewest complete pairs a lag needs.
+
+    Returns:
+        tuple: The lags (``-max_lag`` to ``max_lag``) and their correlations.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    max_lag = min(max_lag, len(x) - 1)
+    valid_x, valid_y = ~np.isnan(x), ~np.isnan(y)
+
+    # Center on the means so the sums below do not lose precision
+    x = np.where(valid_x, x - (x[valid_x].mean() if valid_x.any() else 0.0), 0.0)
+    y = np.where(valid_y, y - (y[valid_y].mean() if valid_y.any() else 0.0), 0.0)
+    mask_x, mask_y = valid_x.astype(np.float64), valid_y.astype(np.float64)
+
+    size = 1 << int(np.ceil(np.log2(max(2, len(x) + max_lag))))
+    n = np.round(_xcorr(mask_x, mask_y, max_lag, size))
+    sums = [
+        _xcorr(x, mask_y, max_lag, size),
+        _xcorr(mask_x, y, max_lag, size),
+        _xcorr(x * x, mask_y, max_lag, size),
+        _xcorr(mask_x, y * y, max_lag, size),
+        _xcorr(x, y, max_lag, size),
+    ]
+    return np.arange(-max_lag, max_lag + 1), _pearson(n, *sums, min_periods)
+
+
+def rolling_correlation(filename, first, second, window):
+    """
+    Returns the cached rolling correlation of two sensors.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        first (str): The first sensor column.
+        second (str): The second sensor column.
+        window (str): The window length, e.g. "1D" or "7D".
+
+    Returns:
+        pandas.DataFrame: A ``timestamp`` column and the correlation.
+    """
+    def load():
+        grid = sensor_grid(filename, [first, second])
+        steps = int(pd.Timedelta(window) / pd.Timedelta(GRID_FREQ))
+        values = rolling(grid[first].to_numpy(), grid[second].to_numpy(), steps)
+        return pd.DataFrame({"timestamp": grid.index, "correlation": values})
+
+    return cache.frames.get(store.get_file_path(filename), store.data_version(filename),
+                            ("rolling_correlation", first, second, window), load)
+
+
+def lagged_correlation(filename, first, second, max_lag):
+    """
+    Returns the cached correlation of two sensors at every lag.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        first (str): The sensor that leads at positive lags.
+        second (str): The sensor that follows at positive lags.
+        max_lag (str): The largest lag, e.g. "24h".
+
+    Returns:
+        pandas.DataFrame: The correlation, indexed by the lag in hours.
+    """
+    def load():
+        grid = sensor_grid(filename, [first, second])
+        steps = int(pd.Timedelta(max_lag) / pd.Timedelta(GRID_FREQ))
+        lags, values = lagged(grid[first].to_numpy(), grid[second].to_numpy(), steps)
+        hours = lags * pd.Timedelta(GRID_FREQ) / pd.Timedelta("1h")
+        return pd.DataFrame({"correlation": values}, index=pd.Index(hours, name="lag (hours)"))
+
+    return cache.frames.get(store.get_file_path(filename), store.data_version(filename),
+                            ("lagged_correlation", first, second, max_lag), load)
+
+
+def _tie_pairs(sorted_values):
+    # Number of pairs of equal values in a sorted array
+    _, counts = np.unique(sorted_values, return_counts=True)
+    return int((counts * (counts - 1) // 2).sum())
+
+
+def _inversions(values):
+    # Number of pairs i < j with values[i] > values[j], by a bottom-up merge
+    # sort whose merges are vectorized over all blocks of a level
+    values = np.unique(values, return_inverse=True)[1].astype(np.int64)
+    n = len(values)
+    span = int(values.max()) + 1 if n else 1
+    position = np.arange(n)
+    count = 0
+    width = 1
+    while width < n:
+        block = position // width
+        pair = block // 2
+        right = block % 2 == 1
+        left_keys = pair[~right] * span + values[~right]
+        right_keys = pair[right] * span + values[right]
+        pair_ends = np.searchsorted(left_keys, (pair[right] + 1) * span, side="left")
+        count += int((pair_ends - np.searchsorted(left_keys, right_keys, side="right")).sum())
+        values = np.sort(pair * span + values) - pair * span
+        width *= 2
+    return count
+
+
+def kendall_tau(x, y):
+    """
+    Computes Kendall's tau-b in O(n log n) (Knight's algorithm).
+
+    Args:
+        x (numpy.ndarray): The first series, without NaN.
+        y (numpy.ndarray): The second series, without NaN.
+
+    Returns:
+        float: The tau-b coefficient, NaN if either series is constant.
+    """
+    n = len(x)
+    order = np.lexsort((y, x))
+    x, y = x[order], y[order]
+    pairs = n * (n - 1) // 2
+    x_ties = _tie_pairs(x)
+    y_ties = _tie_pairs(np.sort(y))
+
+    # Pairs tied in both x and y
+    joint = np.flatnonzero(np.r_[True, (x[1:] != x[:-1]) | (y[1:] != y[:-1]), True])
+    run = np.diff(joint)
+    both_ties = int((run * (run - 1) // 2).sum())
+
+    # Ties in x are sorted by y, so every inversion in y is a discordant pair
+    discordant = _inversions(y)
+    score = pairs - x_ties - y_ties + both_ties - 2 * discordant
+    denominator = np.sqrt(float(pairs - x_ties) * float(pairs - y_ties))
+    return score / denominator if denominator > 0 else np.nan
+
+
+def kendall_matrix(frame, columns):
+    """
+    Computes the Kendall tau-b matrix over pairwise complete rows.
+
+    Args:
+        frame (pandas.DataFrame): The rows.
+        columns (list): The columns to correlate.
+
+    Returns:
+        pandas.DataFrame: The correlation matrix.
+    """
+    matrix = pd.DataFrame(np.eye(len(columns)), index=columns, columns=columns)
+    for i, first in enumerate(columns):
+        for second in columns[i + 1:]:
+            pairs = frame[[first, second]].dropna()
+            tau = kendall_tau(pairs[first].to_numpy(), pairs[second].to_numpy()) if len(pairs) > 1 else np.nan
+            matrix.loc[first, second] = matrix.loc[second, first] = tau
+    return matrix
+
+
+def partial_matrix(corr):
+    """
+    Computes partial correlations controlling for all other columns.
+
+    Args:
+        corr (pandas.DataFrame): The Pearson correlation matrix.
+
+    Returns:
+        pandas.DataFrame: The partial correlation matrix.
+    """
+    precision = np.linalg.pinv(corr.to_numpy())
+    scale = np.sqrt(np.abs(np.diag(precision)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        partial = -precision / np.outer(scale, scale)
+    np.fill_diagonal(partial, 1.0)
+    return pd.DataFrame(np.clip(partial, -1.0, 1.0), index=corr.index, columns=corr.columns)
+
+
+def correlation_matrix(filename=store.CLEANED_DATA, method="pearson", columns=None):
+    """
+    Returns the cached correlation matrix of a dataset's sensors.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        method (str): One of ``METHODS``.
+        columns (list): The sensor columns, or None for all sensors.
+
+    Returns:
+        pandas.DataFrame: The correlation matrix.
+    """
+    columns = list(columns or store.SENSORS)
+    if method == "pearson":
+        return stats.correlation(filename, columns)
+
+    def load():
+        if method == "partial":
+            return partial_matrix(stats.correlation(filename, columns))
+        frame = store.load_frame(filename, columns)
+        if method == "spearman":
+            return frame[columns].corr(method="spearman")
+        if method == "kendall":
+            return kendall_matrix(frame, columns)
+        raise ValueError(f"Unknown correlation method: {method}")
+
+    return cache.frames.get(store.get_file_path(filename), store.data_version(filename),
+                            ("correlation_matrix", method, tuple(columns)), load)
+
+
+def fleet_matrix(method="pearson", columns=None, station_ids=None):
+    """
+    Returns the correlation matrix of the sensors over every station's rows.
+
+    Args:
+        method (str): One of ``FLEET_METHODS``.
+        columns (list): The sensor columns, or None for all sensors.
+        station_ids (list): The stations, or None for every station.
+
+    Returns:
+        pandas.DataFrame: The correlation matrix.
+    """
+    if method not in FLEET_METHODS:
+        raise ValueError(f"Unsupported fleet correlation method: {method}")
+    corr = fleet.correlation(station_ids, columns)
+    return corr if method == "pearson" else partial_matrix(corr)
@@ -0,0 +1,129 @@
+"""
+Downsampling of time series before they are sent to a line chart.
+
+Two modes are available:
+
+* ``lttb``: Largest-Triangle-Three-Buckets, which keeps the point of each
+  bucket that forms the largest triangle with its neighbours and so
+  preserves the visual shape of the series, including spikes.
+* ``minmax``: keeps the minimum and maximum of every bucket, an envelope
+  that never hides an extreme value.
+
+The number of points and the default mode can be set with the
+``CHART_MAX_POINTS`` and ``CHART_DOWNSAMPLE`` environment variables.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# Default number of points sent to a line chart
+MAX_POINTS = int(os.environ.get("CHART_MAX_POINTS", 2000))
+
+# Default downsampling mode: "lttb", "minmax" or "none"
+MODE = os.environ.get("CHART_DOWNSAMPLE", "lttb")
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Selects the points kept by Largest-Triangle-Three-Buckets.
+
+    Each bucket depends on the point selected in the previous one, so the
+    buckets are visited in order; the work inside a bucket is vectorized.
+
+    Args:
+        x (numpy.ndarray): The x values as floats, sorted ascending.
+        y (numpy.ndarray): The y values, without NaN.
+        n_out (int): The number of points to keep (at least 3).
+
+    Returns:
+        numpy.ndarray: The sorted indices of the kept points.
+    """
+    n = len(x)
+    if n <= n_out:
+        return np.arange(n)
+
+    # The first and last points are always kept; the rest is split evenly
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, stops = edges[:-1], edges[1:]
+
+    # Average point of every bucket, used as the third triangle vertex
+    sums_x = np.add.reduceat(x[1:n - 1], starts - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], starts - 1)
+    counts = stops - starts
+    avg_x = np.append(sums_x / counts, x[-1])
+    avg_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        bx, by = x[starts[i]:stops[i]], y[starts[i]:stops[i]]
+        area = np.abs((x[a] - avg_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[i + 1] - y[a]))
+        a = starts[i] + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, n_out):
+    """
+    Selects the minimum and maximum point of evenly sized buckets.
+
+    Args:
+        y (numpy.ndarray): The y values, without NaN.
+        n_out (int): The number of points to keep (at least 2).
+
+    Returns:
+        numpy.ndarray: The sorted, unique indices of the kept points.
+    """
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+
+    # Pad to a whole number of buckets so the argmin/argmax run on a 2-D view
+    n_buckets = n_out // 2
+    size = -(-n // n_buckets)
+    padded_min = np.full(n_buckets * size, np.inf)
+    padded_max = np.full(n_buckets * size, -np.inf)
+    padded_min[:n] = y
+    padded_max[:n] = y
+
+    offsets = np.arange(n_buckets) * size
+    lows = offsets + padded_min.reshape(n_buckets, size).argmin(axis=1)
+    highs = offsets + padded_max.reshape(n_buckets, size).argmax(axis=1)
+    indices = np.unique(np.concatenate([lows, highs]))
+    return indices[indices < n]
+
+
+def downsample(frame, column, max_points=None, mode=None):
+    """
+    Returns a column as a timestamp-indexed Series of at most ``max_points``.
+
+    Rows where the column is NaN are dropped before downsampling.
+
+    Args:
+        frame (pandas.DataFrame): Timestamp-sorted rows with a ``timestamp`` column.
+        column (str): The column to downsample.
+        max_points (int): The maximum number of points, or None for ``MAX_POINTS``.
+        mode (str): "lttb", "minmax" or "none", or None for ``MODE``.
+
+    Returns:
+        pandas.Series: The kept values, indexed by timestamp.
+    """
+    max_points = MAX_POINTS if max_points is None else max_points
+    mode = MODE if mode is None else mode
+
+    timestamps = frame["timestamp"].to_numpy(dtype="datetime64[ns]")
+    values = frame[column].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    if not valid.all():
+        timestamps, values = timestamps[valid], values[valid]
+
+    if mode == "lttb" and max_points >= 3:
+        keep = lttb_indices(timestamps.view(np.int64).astype(np.float64), values, max_points)
+    elif mode == "minmax" and max_points >= 2:
+        keep = minmax_indices(values, max_points)
+    else:
+        keep = slice(None)
+
+    return pd.Series(values[keep], index=pd.DatetimeIndex(timestamps[keep], name="timestamp"), name=column)
@@ -0,0 +1,104 @@
+"""
+Render cache for the matplotlib/seaborn charts.
+
+Streamlit reruns a page script on every interaction, and each rerun used
+to build a new pyplot figure that was never closed.  Here a chart is drawn
+once into a standalone ``matplotlib.figure.Figure`` (which pyplot does not
+track, so nothing leaks), saved as PNG bytes and cached by chart type,
+sensor, data version and size.  Pages show the bytes with ``st.image``.
+matplotlib is only imported when a chart is actually drawn.  The cache
+size can be set with the ``FIGURE_CACHE_MB`` environment variable.
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+
+# Memory budget for rendered figures, in megabytes
+DEFAULT_BUDGET_MB = 64
+
+# Resolution of the rendered PNGs, the same as st.pyplot uses
+DPI = 200
+
+
+class FigureCache:
+    """
+    LRU cache of rendered figure images with a memory budget.
+
+    Args:
+        max_bytes (int): The total size the cached images may occupy.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def render(self, chart, sensor, version, draw, figsize=None):
+        """
+        Returns the PNG of a chart, drawing it only on a cache miss.
+
+        Args:
+            chart (str): The chart type, e.g. "pie".
+            sensor (str): The sensor (or sensors) the chart shows.
+            version (hashable): The version of the data behind the chart.
+            draw (callable): Called with a fresh ``Figure`` to draw the chart.
+            figsize (tuple): The figure size in inches, or None for the default.
+
+        Returns:
+            bytes: The rendered PNG image.
+        """
+        key = (chart, sensor, version, figsize)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                return image
+
+        # Imported here so pages that never draw a chart do not load matplotlib
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=figsize)
+        draw(fig)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=DPI, bbox_inches="tight")
+        image = buffer.getvalue()
+
+        with self._lock:
+            if key not in self._images:
+                self._images[key] = image
+                self._nbytes += len(image)
+            while self._nbytes > self.max_bytes and len(self._images) > 1:
+                _, old = self._images.popitem(last=False)
+                self._nbytes -= len(old)
+        return image
+
+    def clear(self):
+        """
+        Drops every cached image.
+        """
+        with self._lock:
+            self._images.clear()
+            self._nbytes = 0
+
+
+# Cache shared by every page and session in this process
+images = FigureCache(int(float(os.environ.get("FIGURE_CACHE_MB", DEFAULT_BUDGET_MB)) * 1024 * 1024))
+
+
+def render(chart, sensor, version, draw, figsize=None):
+    """
+    Returns the PNG of a chart from the shared figure cache.
+
+    Args:
+        chart (str): The chart type, e.g. "pie".
+        sensor (str): The sensor (or sensors) the chart shows.
+        version (hashable): The version of the data behind the chart.
+        draw (callable): Called with a fresh ``Figure`` to draw the chart.
+        figsize (tuple): The figure size in inches, or None for the default.
+
+    Returns:
+        bytes: The rendered PNG image.
+    """
+    return images.render(chart, sensor, version, draw, figsize)
@@ -0,0 +1,183 @@
+"""
+Fleet-wide statistics across the partitions of every station.
+
+Averages and correlations of all stations together are reduced from
+per-partition partial aggregates (count, mean, M2 and co-moments, min and
+max; see ``stats.CoMoments``) instead of concatenating every station's
+rows in one process.  Each partition is summarized on its own in a pool of
+worker processes, so the work spreads over the available cores, and the
+partials are merged exactly in the parent.  Partials of whole partitions
+are cached until the partition is rewritten, so later calls only
+summarize new or changed months.
+
+The pool uses the ``spawn`` start method, which is safe from within the
+multi-threaded Streamlit server.  Its size can be set with the
+``FLEET_WORKERS`` environment variable; with a single worker, or a single
+partition to summarize, the work runs in the calling process.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from smartagri import stations, stats, store
+
+# Worker processes summarizing partitions
+WORKERS = int(os.environ.get("FLEET_WORKERS", os.cpu_count() or 1))
+
+_lock = threading.Lock()
+_executor = None
+
+
+def partition_partial(path, columns, start=None, end=None):
+    """
+    Computes the partial aggregate of one partition, optionally cut to a range.
+
+    Runs in a worker process, so it reads the partition itself instead of
+    going through the parent's caches.
+
+    Args:
+        path (str): The partition file.
+        columns (list): The sensor columns.
+        start: The first timestamp, or None for the beginning.
+        end: The last timestamp (inclusive), or None for the end.
+
+    Returns:
+        stats.CoMoments: The statistics of the partition's rows in the range.
+    """
+    frame = feather.read_table(path, columns=["timestamp"] + columns, memory_map=True).to_pandas()
+    timestamps = frame["timestamp"].to_numpy()
+    first = 0 if start is None else int(np.searchsorted(timestamps, pd.Timestamp(start).to_datetime64(), side="left"))
+    stop = len(frame) if end is None else int(np.searchsorted(timestamps, pd.Timestamp(end).to_datetime64(), side="right"))
+    return stats.CoMoments.from_frame(frame.iloc[first:stop], columns)
+
+
+def get_executor():
+    """
+    Returns the process pool shared by all sessions, starting it on first use.
+
+    Returns:
+        concurrent.futures.ProcessPoolExecutor: The pool.
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _tasks(station_ids, start, end):
+    # One task per partition overlapping the range: (path, start, end, whole)
+    lower = None if start is None else pd.Timestamp(start).to_datetime64()
+    upper = None if end is None else pd.Timestamp(end).to_datetime64()
+    tasks = []
+    for station_id in station_ids:
+        stations.sync(stations.get(station_id))
+        for month, path in stations.prune(station_id, start, end):
+            first, stop = stations.month_bounds(month)
+            whole = (lower is None or lower <= first) and (upper is None or upper >= stop)
+            tasks.append((path, None if whole else start, None if whole else end, whole))
+    return tasks
+
+
+def data_version(station_ids=None):
+    """
+    Returns a value that changes whenever a partition is written.
+
+    Args:
+        station_ids (list): The stations, or None for every station.
+
+    Returns:
+        tuple: The path and mtime of every partition of the stations.
+    """
+    if station_ids is None:
+        station_ids = [station.id for station in stations.list_stations()]
+    version = []
+    for station_id in station_ids:
+        stations.sync(stations.get(station_id))
+        version.extend((path, os.stat(path).st_mtime_ns) for _, path in stations.list_partitions(station_id))
+    return tuple(version)
+
+
+def aggregate(station_ids=None, start=None, end=None, columns=None, workers=None):
+    """
+    Returns the statistics of several stations' readings taken together.
+
+    Args:
+        station_ids (list): The stations, or None for every station.
+        start: The first timestamp, or None for the beginning.
+        end: The last timestamp (inclusive), or None for the end.
+        columns (list): The sensor columns, or None for all sensors.
+        workers (int): The worker processes to use, or None for ``WORKERS``.
+
+    Returns:
+        stats.CoMoments: The statistics of all the rows.
+    """
+    columns = list(columns or store.SENSORS)
+    if station_ids is None:
+        station_ids = [station.id for station in stations.list_stations()]
+    workers = WORKERS if workers is None else workers
+
+    partials = []
+    pending = []
+    for path, task_start, task_end, whole in _tasks(station_ids, start, end):
+        cached = stations.cached_moments(path, columns) if whole else None
+        if cached is not None:
+            partials.append(cached)
+        else:
+            pending.append((path, task_start, task_end, whole))
+
+    # Map the partitions without a cached partial over the pool
+    if workers > 1 and len(pending) > 1:
+        executor = get_executor()
+        futures = [executor.submit(partition_partial, path, columns, task_start, task_end)
+                   for path, task_start, task_end, _ in pending]
+        results = [future.result() for future in futures]
+    else:
+        results = [partition_partial(path, columns, task_start, task_end) for path, task_start, task_end, _ in pending]
+
+    for (path, _, _, whole), moments in zip(pending, results):
+        if whole:
+            stations.remember_moments(path, columns, moments)
+        partials.append(moments)
+
+    # Reduce; merging is exact, so the order does not matter
+    total = stats.CoMoments(columns)
+    for moments in partials:
+        total = total.merge(moments)
+    return total
+
+
+def summary(station_ids=None, start=None, end=None, columns=None):
+    """
+    Returns the fleet-wide count, mean, std, min and max of each sensor.
+
+    Args:
+        station_ids (list): The stations, or None for every station.
+        start: The first timestamp, or None for the beginning.
+        end: The last timestamp (inclusive), or None for the end.
+        columns (list): The sensor columns, or None for all sensors.
+
+    Returns:
+        pandas.DataFrame: One row per sensor.
+    """
+    return aggregate(station_ids, start, end, columns).summary()
+
+
+def correlation(station_ids=None, columns=None):
+    """
+    Returns the fleet-wide Pearson correlation matrix of the sensors.
+
+    Args:
+        station_ids (list): The stations, or None for every station.
+        columns (list): The sensor columns, or None for all sensors.
+
+    Returns:
+        pandas.DataFrame: The correlation matrix, like ``DataFrame.corr``
+        over the rows of all stations.
+    """
+    return aggregate(station_ids, columns=columns).corr()
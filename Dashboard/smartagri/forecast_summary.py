@@ -0,0 +1,80 @@
+"""
+Per-day summary of the forecast for the home page.
+
+The home page shows, for today and the next three days, the last forecast
+value of each sensor.  Instead of scanning the whole forecast once per day
+and column, the summary holds one row per day with the last, min, max and
+mean of every ``*_predicted`` column.  It is built with a single groupby
+and cached until the forecast file changes, so each card is a lookup.
+"""
+import numpy as np
+import pandas as pd
+
+from smartagri import cache, store
+
+# Forecast columns summarized per day
+PREDICTED_COLUMNS = [f"{sensor}_predicted" for sensor in store.SENSORS]
+
+# Statistics kept per column and day
+STATS = ["last", "min", "max", "mean"]
+
+
+def summarize_days(frame, columns=PREDICTED_COLUMNS):
+    """
+    Builds the per-day summary of a timestamp-sorted frame.
+
+    Args:
+        frame (pandas.DataFrame): Rows with a ``timestamp`` column.
+        columns (list): The columns to summarize.
+
+    Returns:
+        pandas.DataFrame: One row per day, indexed by midnight, with
+        ``<column>_<stat>`` columns.
+    """
+    days = frame["timestamp"].dt.floor("D").to_numpy()
+    grouped = frame[columns].groupby(days)
+    parts = {"min": grouped.min(), "max": grouped.max(), "mean": grouped.mean()}
+
+    # The last row of every day, as iloc[-1] would pick it (NaN included)
+    ends = np.append(np.flatnonzero(days[1:] != days[:-1]), len(days) - 1) if len(days) else []
+    parts["last"] = frame[columns].iloc[ends].set_axis(parts["min"].index)
+
+    summary = pd.DataFrame({
+        f"{column}_{stat}": parts[stat][column] for column in columns for stat in STATS
+    })
+    summary.index = pd.DatetimeIndex(summary.index, name="timestamp")
+    return summary
+
+
+def load_summary(filename=store.PREDICTED_DATA):
+    """
+    Returns the cached per-day summary of a forecast dataset.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+
+    Returns:
+        pandas.DataFrame: The per-day summary.
+    """
+    csv_path = store.get_file_path(filename)
+    return cache.frames.get(csv_path, store.data_version(filename), "daily_summary", lambda: summarize_days(store.load_frame(filename)))
+
+
+def day_values(summary, day, stat="last", columns=PREDICTED_COLUMNS):
+    """
+    Looks up one statistic of every column for a day.
+
+    Args:
+        summary (pandas.DataFrame): The per-day summary.
+        day (datetime.date or datetime.datetime): The day to look up.
+        stat (str): One of ``STATS``.
+        columns (list): The summarized columns to return.
+
+    Returns:
+        dict: The value of each column, or an empty dict if the day is missing.
+    """
+    key = pd.Timestamp(day.year, day.month, day.day)
+    if key not in summary.index:
+        return {}
+    row = summary.loc[key]
+    return {column: row[f"{column}_{stat}"] for column in columns}
@@ -0,0 +1,380 @@
+"""
+Prophet forecasting pipeline for the sensor data.
+
+One Prophet model is fitted per sensor.  The fits are independent, so they
+run in a process pool and a full retrain takes roughly as long as the
+slowest sensor.  The number of workers can be set with the
+``FORECAST_WORKERS`` environment variable.
+
+Training runs outside of Streamlit, in ``forecast_job.py``.  A lock file
+makes sure only one job runs at a time, and the dashboard only reads the
+CSV the job writes.  Prophet is only imported when a model is trained,
+so the dashboard can import this module without loading it.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from smartagri import cleaning, model_registry, resampling, store
+
+# Sensors that get a forecast
+SENSORS = store.SENSORS
+
+# Default forecast horizon, matching predicted_data_2024.csv
+FORECAST_START = '2024-01-01 00:00:00'
+FORECAST_END = '2024-12-31 23:00:00'
+
+# Settings of every Prophet model; part of the model registry key
+MODEL_SETTINGS = {
+    'changepoint_prior_scale': 0.05,
+    'seasonality_prior_scale': 10,
+    'yearly_seasonality': True,
+    'daily_seasonality': True,
+}
+
+# Number of hours predicted and written at once
+CHUNK_HOURS = 24 * 31
+
+# Lock file held while a forecast job runs
+LOCK_PATH = os.path.join(store.STORE_DIR, "forecast.lock")
+
+# Command-line entry point of the forecast job
+JOB_SCRIPT = os.path.join(store.DASHBOARD_DIR, "forecast_job.py")
+
+
+def get_worker_count(workers=None):
+    """
+    Returns the number of training processes to use.
+
+    Args:
+        workers (int): An explicit worker count, or None to use the
+            ``FORECAST_WORKERS`` environment variable or the CPU count.
+
+    Returns:
+        int: The worker count, at most one per sensor.
+    """
+    if workers is None:
+        workers = int(os.environ.get("FORECAST_WORKERS", 0)) or os.cpu_count() or 1
+    return max(1, min(workers, len(SENSORS)))
+
+
+def load_hourly_data():
+    """
+    Loads the cleaned sensor data resampled to hourly averages.
+
+    Hourly averages outside the IQR fences of their sensor are masked.
+
+    Returns:
+        pandas.DataFrame: Hourly rows with a ``timestamp`` column.
+    """
+    # Forward-filled hourly averages, resampled incrementally and shared between runs
+    hourly = resampling.resample_frame(store.CLEANED_DATA, SENSORS, 'h', 'mean', fill='ffill')
+
+    # Mask outliers of all sensors at once using their IQR fences
+    hourly, _ = cleaning.mask_outliers(hourly, SENSORS, cleaning.iqr_bounds(hourly, SENSORS))
+    return hourly
+
+
+def prepare_sensor_data(hourly_data, sensor):
+    """
+    Builds the Prophet training frame of one sensor.
+
+    Args:
+        hourly_data (pandas.DataFrame): The hourly sensor data, with
+            outliers masked (see ``load_hourly_data``).
+        sensor (str): The sensor column.
+
+    Returns:
+        pandas.DataFrame: The ``ds``/``y`` training frame.
+    """
+    sensor_data = pd.DataFrame({'ds': hourly_data['timestamp'], 'y': hourly_data[sensor]})
+
+    # Drop the hours without a reading and the masked outliers
+    return sensor_data.dropna(subset=['y'])
+
+
+def new_model():
+    """
+    Creates an unfitted Prophet model with the dashboard's settings.
+
+    Returns:
+        prophet.Prophet: The model.
+    """
+    from prophet import Prophet
+
+    # Create Prophet model with potential hyperparameter tuning
+    return Prophet(**MODEL_SETTINGS)
+
+
+def get_model(sensor, sensor_data):
+    """
+    Returns a model fitted on the training data, fitting only if needed.
+
+    A model already trained on the same data is loaded from the registry.
+    Otherwise the sensor's previous model, if any, warm-starts the fit.
+
+    Args:
+        sensor (str): The sensor column.
+        sensor_data (pandas.DataFrame): The ``ds``/``y`` training frame.
+
+    Returns:
+        prophet.Prophet: The fitted model.
+    """
+    digest = model_registry.data_hash(sensor_data, MODEL_SETTINGS)
+    model = model_registry.load(sensor, digest)
+    if model is not None:
+        return model
+
+    previous = model_registry.latest(sensor)
+    model = new_model()
+    if previous is None:
+        model.fit(sensor_data)
+    else:
+        try:
+            model.fit(sensor_data, init=model_registry.warm_start_params(previous))
+        except Exception:
+            # Parameter shapes changed (e.g. different seasonalities); fit from scratch
+            model = new_model()
+            model.fit(sensor_data)
+
+    model_registry.save(sensor, digest, model)
+    return model
+
+
+def forecast_horizon(start, end):
+    """
+    Returns the hourly timestamps of a forecast horizon.
+
+    Args:
+        start: The first forecast hour.
+        end: The last forecast hour.
+
+    Returns:
+        pandas.DatetimeIndex: The hourly timestamps.
+    """
+    return pd.date_range(pd.Timestamp(start).floor('h'), pd.Timestamp(end), freq='h')
+
+
+def fit_sensor(sensor, sensor_data, start, end, out_path, chunk_hours=CHUNK_HOURS):
+    """
+    Fits one sensor's model and streams its forecast to a NumPy file.
+
+    Runs in a worker process, so it only takes and returns picklable data.
+    The horizon is predicted in chunks of ``chunk_hours`` hours that are
+    written straight into a memory-mapped ``.npy`` file.
+
+    Args:
+        sensor (str): The sensor column.
+        sensor_data (pandas.DataFrame): The ``ds``/``y`` training frame.
+        start: The first forecast hour.
+        end: The last forecast hour.
+        out_path (str): The ``.npy`` file to write the ``yhat`` values to.
+        chunk_hours (int): The number of hours predicted at once.
+
+    Returns:
+        str: The sensor.
+    """
+    model = get_model(sensor, sensor_data)
+
+    # Only yhat is used, so skip the uncertainty interval simulation
+    model.uncertainty_samples = 0
+
+    horizon = forecast_horizon(start, end)
+    yhat = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float64, shape=(len(horizon),))
+    for first in range(0, len(horizon), chunk_hours):
+        future = pd.DataFrame({'ds': horizon[first:first + chunk_hours]})
+        yhat[first:first + len(future)] = model.predict(future)['yhat'].to_numpy()
+    yhat.flush()
+    del yhat
+    return sensor
+
+
+def train_all(hourly_data, start, end, out_dir, workers=None, progress=None, chunk_hours=CHUNK_HOURS):
+    """
+    Fits every sensor's model and forecasts the horizon in a process pool.
+
+    Args:
+        hourly_data (pandas.DataFrame): The hourly sensor data.
+        start: The first forecast hour.
+        end: The last forecast hour.
+        out_dir (str): The directory for the per-sensor ``.npy`` files.
+        workers (int): The number of processes, or None for the default.
+        progress (callable): Called as ``progress(done, total, sensor)``
+            after each sensor finishes.
+        chunk_hours (int): The number of hours predicted at once.
+
+    Returns:
+        dict: The ``.npy`` file of every sensor.
+    """
+    jobs = {sensor: prepare_sensor_data(hourly_data, sensor) for sensor in SENSORS}
+    paths = {sensor: os.path.join(out_dir, f"{sensor}.npy") for sensor in SENSORS}
+    workers = get_worker_count(workers)
+    done = 0
+
+    if workers == 1:
+        for sensor, sensor_data in jobs.items():
+            fit_sensor(sensor, sensor_data, start, end, paths[sensor], chunk_hours)
+            done += 1
+            if progress is not None:
+                progress(done, len(jobs), sensor)
+        return paths
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(fit_sensor, sensor, sensor_data, start, end, paths[sensor], chunk_hours)
+            for sensor, sensor_data in jobs.items()
+        ]
+        for future in as_completed(futures):
+            sensor = future.result()
+            done += 1
+            if progress is not None:
+                progress(done, len(jobs), sensor)
+    return paths
+
+
+def generate_predictions(workers=None, progress=None, start=FORECAST_START, end=FORECAST_END,
+                         filename=store.PREDICTED_DATA, chunk_hours=CHUNK_HOURS):
+    """
+    Trains the sensor models and writes the hourly forecast of a horizon.
+
+    The CSV is written chunk by chunk from the per-sensor forecast files,
+    so the whole horizon is never held in memory at once.
+
+    Args:
+        workers (int): The number of training processes, or None for the default.
+        progress (callable): Called as ``progress(done, total, sensor)``
+            after each sensor finishes.
+        start: The first forecast hour.
+        end: The last forecast hour.
+        filename (str): The name of the CSV dataset to write.
+        chunk_hours (int): The number of hours predicted and written at once.
+    """
+    os.makedirs(store.STORE_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=store.STORE_DIR) as out_dir:
+        paths = train_all(load_hourly_data(), start, end, out_dir, workers, progress, chunk_hours)
+        yhat = {sensor: np.load(path, mmap_mode='r') for sensor, path in paths.items()}
+
+        # Stream the forecast to CSV, replacing the old file in one step
+        horizon = forecast_horizon(start, end)
+        data_path = store.get_file_path(filename)
+        tmp_path = f"{data_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', newline='') as f:
+            for first in range(0, len(horizon), chunk_hours):
+                chunk = pd.DataFrame({'timestamp': horizon[first:first + chunk_hours]})
+                for sensor in SENSORS:
+                    chunk[sensor + '_predicted'] = yhat[sensor][first:first + len(chunk)]
+                chunk.to_csv(f, index=False, header=first == 0, date_format=store.DATE_FORMAT)
+        os.replace(tmp_path, data_path)
+        del yhat
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def acquire_lock():
+    """
+    Takes the forecast job lock, clearing it first if its owner has died.
+
+    The pid is written to a temporary file that is then linked into place,
+    so the lock file never exists without its owner's pid.
+
+    Returns:
+        bool: True if the lock was taken, False if another job holds it.
+    """
+    os.makedirs(os.path.dirname(LOCK_PATH), exist_ok=True)
+    tmp_path = f"{LOCK_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(os.getpid()))
+    try:
+        for _ in range(2):
+            try:
+                # Linking fails if the lock exists, like an exclusive create
+                os.link(tmp_path, LOCK_PATH)
+                return True
+            except FileExistsError:
+                if is_running():
+                    return False
+                # Stale lock left by a job that did not exit cleanly
+                try:
+                    os.remove(LOCK_PATH)
+                except FileNotFoundError:
+                    pass
+        return False
+    finally:
+        os.remove(tmp_path)
+
+
+def release_lock():
+    """
+    Releases the forecast job lock.
+    """
+    try:
+        os.remove(LOCK_PATH)
+    except FileNotFoundError:
+        pass
+
+
+def is_running():
+    """
+    Checks whether a forecast job currently holds the lock.
+
+    Returns:
+        bool: True if a live process owns the lock file.
+    """
+    try:
+        with open(LOCK_PATH) as f:
+            content = f.read().strip()
+    except FileNotFoundError:
+        return False
+    # The lock is linked into place with its pid, so one without a pid is stale
+    return content.isdigit() and _pid_alive(int(content))
+
+
+def run_job(workers=None, progress=None, **options):
+    """
+    Runs the forecast job unless another one is already running.
+
+    Args:
+        workers (int): The number of training processes, or None for the default.
+        progress (callable): Called as ``progress(done, total, sensor)``
+            after each sensor finishes.
+        **options: Passed on to ``generate_predictions`` (horizon, output file).
+
+    Returns:
+        bool: True if predictions were generated, False if the lock was held.
+    """
+    if not acquire_lock():
+        return False
+    try:
+        generate_predictions(workers, progress, **options)
+    finally:
+        release_lock()
+    return True
+
+
+def start_job():
+    """
+    Starts the forecast job in a detached background process.
+
+    Does nothing if a job is already running.
+    """
+    if is_running():
+        return
+    subprocess.Popen(
+        [sys.executable, JOB_SCRIPT],
+        cwd=store.DASHBOARD_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
@@ -0,0 +1,302 @@
+"""
+Incremental ingestion of new sensor readings.
+
+New readings are appended to a dataset as small, immutable Arrow segments
+(see ``store.list_segments``) instead of rewriting the CSV, so an append
+costs as much as the new rows.  Once there are more than
+``store.COMPACT_SEGMENTS`` segments they are folded into one.  After every
+append the rollups and the bucket statistics are brought up to date from
+the new tail only and persisted, so pages see the rows on their next rerun
+without aggregating them again.
+
+Readings come from a source, a generator yielding batches of text lines.
+A line is either a CSV row in the column order of the dataset
+(``timestamp,TC,HUM,PRES,US,SOIL1``) or a JSON object with those keys.
+Three sources are provided:
+
+* ``tail_file``: follows a CSV file that a logger appends to.
+* ``udp_source`` and ``http_source``: receive lines over the network, as
+  a stand-in for the gateway of the field sensors.
+* ``replay_log``: replays a recorded serial log at its original pace, or
+  faster.
+
+Readings of a field station other than the one behind a dataset can be
+written to that station's monthly partitions instead (see
+``smartagri.stations``).
+
+``ingest_job.py`` runs a source from the command line.  Only one ingest
+process should write to a dataset at a time.
+"""
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from smartagri import rollups, stations, stats, store
+
+# Maximum number of rows written to one segment
+BATCH_SIZE = 5000
+
+# Seconds between polls of a source
+POLL_INTERVAL = 1.0
+
+
+def parse_lines(lines, columns):
+    """
+    Parses received lines into a frame of readings.
+
+    Lines that cannot be parsed, such as a repeated CSV header, are skipped.
+
+    Args:
+        lines (list): CSV rows or JSON objects, as text.
+        columns (list): The dataset columns, starting with ``timestamp``.
+
+    Returns:
+        pandas.DataFrame: The readings, with the dataset's columns.
+    """
+    records = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        else:
+            values = [value.strip() for value in line.split(",")]
+            if values[0] == columns[0]:
+                continue
+            records.append(dict(zip(columns, values)))
+
+    frame = pd.DataFrame.from_records(records, columns=columns)
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"], errors="coerce")
+    for column in columns[1:]:
+        frame[column] = pd.to_numeric(frame[column], errors="coerce")
+    return frame.dropna(subset=["timestamp"])
+
+
+def append(filename, rows):
+    """
+    Appends readings to a dataset as a new segment.
+
+    Rows are sorted by timestamp, and rows that are not newer than the
+    dataset's last timestamp (or repeat a timestamp) are dropped, so the
+    dataset stays sorted and replaying a source twice is harmless.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        rows (pandas.DataFrame): The readings, with a ``timestamp`` column.
+
+    Returns:
+        int: The number of rows appended.
+    """
+    schema = store.open_parts(filename)[0].schema
+    rows = rows.sort_values("timestamp", kind="stable").drop_duplicates("timestamp", keep="last")
+    last = store.last_timestamp(filename)
+    timestamps = pd.to_datetime(rows["timestamp"]).dt.tz_localize(None).to_numpy(dtype="datetime64[ns]")
+    if last is not None:
+        keep = timestamps > last
+        rows, timestamps = rows[keep], timestamps[keep]
+    if rows.empty:
+        return 0
+
+    # Same layout as the converted CSV, with NaN kept as a value
+    table = pa.table({
+        name: pa.array(timestamps if name == "timestamp" else rows[name].to_numpy(dtype=np.float64), from_pandas=False)
+        for name in schema.names
+    }).cast(schema)
+
+    segment_dir = store.get_segment_dir(filename)
+    os.makedirs(segment_dir, exist_ok=True)
+    tmp_path = os.path.join(segment_dir, f".{os.getpid()}.tmp")
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    try:
+        # Claim the next segment number; link fails if another writer took it
+        segments = store.list_segments(filename)
+        seq = segments[-1][0] + 1 if segments else 1
+        while True:
+            try:
+                os.link(tmp_path, os.path.join(segment_dir, f"seg-{seq:08d}.arrow"))
+                break
+            except FileExistsError:
+                seq += 1
+    finally:
+        os.remove(tmp_path)
+
+    store.compact_segments(filename)
+    rollups.get_engine(filename)
+    stats.get_buckets(filename)
+    return len(rows)
+
+
+def tail_file(path, poll_interval=POLL_INTERVAL, from_start=False):
+    """
+    Follows a CSV file, yielding the lines appended to it.
+
+    Args:
+        path (str): The file to follow.
+        poll_interval (float): Seconds to wait when there is nothing new.
+        from_start (bool): Also yield the lines already in the file.
+
+    Yields:
+        list: The complete lines read since the last batch.
+    """
+    with open(path) as f:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        partial = ""
+        while True:
+            chunk = f.read()
+            if not chunk:
+                time.sleep(poll_interval)
+                continue
+            lines = (partial + chunk).split("\n")
+            partial = lines.pop()
+            if lines:
+                yield lines
+
+
+def _drain(received, poll_interval):
+    # Wait for the first line, then take whatever else has arrived
+    lines = [received.get()]
+    deadline = time.monotonic() + poll_interval
+    while True:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            return lines
+        try:
+            lines.append(received.get(timeout=timeout))
+        except queue.Empty:
+            return lines
+
+
+def udp_source(host="0.0.0.0", port=5005, poll_interval=POLL_INTERVAL):
+    """
+    Receives lines as UDP datagrams, one or more lines per datagram.
+
+    Args:
+        host (str): The address to listen on.
+        port (int): The port to listen on.
+        poll_interval (float): Seconds to collect lines before yielding them.
+
+    Yields:
+        list: The lines received since the last batch.
+    """
+    received = queue.Queue()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+
+    def receive():
+        while True:
+            data, _ = sock.recvfrom(65535)
+            for line in data.decode("utf-8", "replace").splitlines():
+                received.put(line)
+
+    threading.Thread(target=receive, daemon=True).start()
+    while True:
+        yield _drain(received, poll_interval)
+
+
+def http_source(host="0.0.0.0", port=8502, poll_interval=POLL_INTERVAL):
+    """
+    Receives lines as the bodies of HTTP POST requests.
+
+    Args:
+        host (str): The address to listen on.
+        port (int): The port to listen on.
+        poll_interval (float): Seconds to collect lines before yielding them.
+
+    Yields:
+        list: The lines received since the last batch.
+    """
+    received = queue.Queue()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            for line in body.decode("utf-8", "replace").splitlines():
+                received.put(line)
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    while True:
+        yield _drain(received, poll_interval)
+
+
+def replay_log(path, speed=1.0, poll_interval=POLL_INTERVAL):
+    """
+    Replays a recorded serial log, pacing the lines by their timestamps.
+
+    Args:
+        path (str): The log file, one CSV row per line.
+        speed (float): How many times faster than real time to replay;
+            0 replays as fast as possible.
+        poll_interval (float): Seconds of replayed time per batch.
+
+    Yields:
+        list: The lines due since the last batch.
+    """
+    with open(path) as f:
+        batch = []
+        started = time.monotonic()
+        first = None
+        for line in f:
+            timestamp = pd.to_datetime(line.split(",", 1)[0].strip(), errors="coerce")
+            if speed > 0 and not pd.isna(timestamp):
+                if first is None:
+                    first = timestamp
+                due = started + (timestamp - first).total_seconds() / speed
+                if due > time.monotonic() + poll_interval:
+                    if batch:
+                        yield batch
+                        batch = []
+                    time.sleep(max(0.0, due - time.monotonic()))
+            batch.append(line)
+        if batch:
+            yield batch
+
+
+def run(source, filename=store.CLEANED_DATA, batch_size=BATCH_SIZE, progress=None, station=None):
+    """
+    Appends the readings of a source to a dataset until it is exhausted.
+
+    Args:
+        source (iterable): Yields batches of lines, e.g. from ``tail_file``.
+        filename (str): The name of the CSV dataset.
+        batch_size (int): The maximum number of lines per segment.
+        progress (callable): Called as ``progress(appended, total)`` after
+            each append.
+        station (str): Write to the partitions of this station instead of
+            to the dataset.
+
+    Returns:
+        int: The total number of rows appended.
+    """
+    if station is None:
+        columns = store.open_parts(filename)[0].column_names
+    else:
+        columns = stations.COLUMNS
+    total = 0
+    for lines in source:
+        for first in range(0, len(lines), batch_size):
+            rows = parse_lines(lines[first:first + batch_size], columns)
+            appended = append(filename, rows) if station is None else stations.write(station, rows)
+            total += appended
+            if progress is not None and appended:
+                progress(appended, total)
+    return total
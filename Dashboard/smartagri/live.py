@@ -0,0 +1,110 @@
+"""
+Live mode for the sensor pages.
+
+A page in live mode draws its line chart in a Streamlit fragment that, every
+few seconds, polls the sensor store for rows newer than the last one the
+session has seen.  Only the fragment reruns: the chart is drawn from the
+downsampled series kept in the session, and only the new rows are read
+from the store and appended to it.  Polling is cheap (a ``stat`` of the
+dataset) and backs off while nothing changes: the delay doubles up to
+``MAX_BACKOFF`` times the refresh interval and drops back as soon as new
+rows arrive.
+
+The default interval can be set with the ``LIVE_REFRESH_SECONDS``
+environment variable.
+"""
+import os
+import time
+
+import pandas as pd
+import streamlit as st
+
+from smartagri import store
+from smartagri.downsample import downsample
+
+# Default seconds between polls
+REFRESH_SECONDS = float(os.environ.get("LIVE_REFRESH_SECONDS", 5))
+
+# Maximum factor the refresh interval grows to while nothing changes
+MAX_BACKOFF = 12
+
+
+def controls():
+    """
+    Shows the live mode switch and refresh interval in the sidebar.
+
+    Returns:
+        float: The refresh interval in seconds, or None if live mode is off.
+    """
+    if not st.sidebar.toggle("Live mode", key="live_mode"):
+        return None
+    return float(st.sidebar.number_input(
+        "Refresh every (seconds)", min_value=1.0, value=REFRESH_SECONDS, step=1.0, key="live_interval"
+    ))
+
+
+def next_delay(delay, interval, changed):
+    """
+    Returns the delay before the next poll.
+
+    Args:
+        delay (float): The current delay in seconds.
+        interval (float): The configured refresh interval in seconds.
+        changed (bool): Whether the last poll found new rows.
+
+    Returns:
+        float: The interval if rows arrived, else the doubled delay, capped
+        at ``MAX_BACKOFF`` times the interval.
+    """
+    if changed:
+        return interval
+    return min(delay * 2, interval * MAX_BACKOFF)
+
+
+def follow(series, filename, column, watermark, interval, color=None):
+    """
+    Draws a line chart of a column and appends new rows while the page is open.
+
+    The chart is drawn inside the polling fragment, so each poll redraws it
+    from the series kept in the session plus the rows that arrived since.
+
+    Args:
+        series (pandas.Series): The downsampled readings to start from,
+            indexed by timestamp; its name labels the chart.
+        filename (str): The name of the CSV dataset.
+        column (str): The sensor column shown by the chart.
+        watermark: The timestamp of the last row in ``series``, or None if
+            the dataset was empty.
+        interval (float): The refresh interval in seconds.
+        color (str): The line color.
+    """
+    key = f"live:{filename}:{column}"
+    state = st.session_state.setdefault(key, {"next_poll": 0.0})
+    # A full rerun redraws the chart with every row up to the watermark
+    state["series"] = series
+    state["watermark"] = watermark
+    state["version"] = None
+    state["delay"] = interval
+
+    @st.experimental_fragment(run_every=interval)
+    def poll():
+        now = time.monotonic()
+        if now >= state["next_poll"]:
+            version = store.data_version(filename)
+            rows = None
+            if version != state["version"]:
+                rows = store.load_tail(filename, state["watermark"], [column])
+                state["version"] = version
+            changed = rows is not None and not rows.empty
+            if changed:
+                new = downsample(rows, column).rename(state["series"].name)
+                state["series"] = pd.concat([state["series"], new]) if len(state["series"]) else new
+                state["watermark"] = rows["timestamp"].iloc[-1]
+
+            state["delay"] = next_delay(state["delay"], interval, changed)
+            # The fragment runs every interval; half of one absorbs timer jitter
+            state["next_poll"] = now + state["delay"] - interval / 2
+
+        st.line_chart(state["series"], color=color)
+
+    poll()
@@ -0,0 +1,303 @@
+"""
+Per-stage timing of the dashboard pages.
+
+Pages wrap their load, filter, aggregate and render stages in
+``metrics.stage(page, name)``.  Streamlit runs every session in the same
+process, so the timings of all sessions go into one latency histogram per
+page and stage, which the Metrics page shows and which is written to a
+Prometheus text file and a JSON file every ``DUMP_SECONDS``.
+
+Instrumentation is off unless the ``DASHBOARD_METRICS`` environment
+variable is set to 1.  While it is off, ``stage`` returns a shared no-op
+context manager and ``timed`` returns the function it decorates, so the
+instrumented code runs as if it were not there.  The dump files are
+written to ``.store/metrics.prom`` and ``.store/metrics.json`` unless
+``DASHBOARD_METRICS_FILE`` gives another path (without extension).
+"""
+import atexit
+import bisect
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+from smartagri import store
+
+# Whether stages are timed at all
+ENABLED = os.environ.get("DASHBOARD_METRICS", "0") not in ("", "0")
+
+# Path of the dump files, without the .prom/.json extension
+DUMP_PATH = os.environ.get("DASHBOARD_METRICS_FILE", os.path.join(store.STORE_DIR, "metrics"))
+
+# Seconds between two dumps
+DUMP_SECONDS = 10
+
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf")]
+
+# Stages every page reports, in the order they run
+STAGES = ["load", "filter", "aggregate", "render"]
+
+_NOOP = contextlib.nullcontext()
+
+_lock = threading.Lock()
+_histograms = {}
+_local = threading.local()
+_last_dump = 0.0
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets, like a Prometheus histogram.
+    """
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        """
+        Adds one measurement.
+
+        Args:
+            seconds (float): The measured latency.
+        """
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q):
+        """
+        Estimates a quantile by interpolating within its bucket.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            float: The estimated latency in seconds, or None if empty.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                # The open last bucket has no upper bound to interpolate to
+                if BUCKETS[i] == float("inf"):
+                    return lower
+                return lower + (BUCKETS[i] - lower) * (rank - seen) / count
+            seen += count
+        return BUCKETS[-2]
+
+
+class _Stage:
+    __slots__ = ("page", "name", "started")
+
+    def __init__(self, page, name):
+        self.page = page
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.page, self.name, time.perf_counter() - self.started)
+        return False
+
+
+def stage(page, name):
+    """
+    Times a block of a page as one stage.
+
+    Args:
+        page (str): The page the block belongs to.
+        name (str): The stage, one of ``STAGES``.
+
+    Returns:
+        A context manager; a shared no-op one when metrics are disabled.
+    """
+    if not ENABLED:
+        return _NOOP
+    return _Stage(page, name)
+
+
+def timed(page, name):
+    """
+    Decorator that times every call of a function as one stage.
+
+    Args:
+        page (str): The page the function belongs to.
+        name (str): The stage, one of ``STAGES``.
+
+    Returns:
+        callable: The decorator; it returns the function unchanged when
+        metrics are disabled.
+    """
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Stage(page, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record(page, name, seconds):
+    """
+    Adds a measurement to the histogram of a stage.
+
+    Args:
+        page (str): The page the stage belongs to.
+        name (str): The stage.
+        seconds (float): The measured latency.
+    """
+    global _last_dump
+    with _lock:
+        histogram = _histograms.get((page, name))
+        if histogram is None:
+            histogram = _histograms[(page, name)] = Histogram()
+        histogram.observe(seconds)
+        due = time.monotonic() - _last_dump >= DUMP_SECONDS
+        if due:
+            _last_dump = time.monotonic()
+
+    # The timings of the script run in progress, for the timing panel
+    rerun = getattr(_local, "rerun", None)
+    if rerun is None:
+        rerun = _local.rerun = {}
+    rerun[(page, name)] = rerun.get((page, name), 0.0) + seconds
+
+    if due:
+        dump()
+
+
+def rerun_timings(page):
+    """
+    Returns and resets the stage timings of the current script run.
+
+    Args:
+        page (str): The page to return the timings of.
+
+    Returns:
+        dict: The seconds spent in each stage of the page since the last
+        call, by stage name.
+    """
+    rerun = getattr(_local, "rerun", None) or {}
+    timings = {name: seconds for (stage_page, name), seconds in rerun.items() if stage_page == page}
+    for name in timings:
+        del rerun[(page, name)]
+    return timings
+
+
+def snapshot():
+    """
+    Returns the histograms of every page and stage.
+
+    Returns:
+        list: One dict per page and stage with its count, total seconds,
+        estimated p50/p95/p99 and cumulative bucket counts.
+    """
+    with _lock:
+        items = sorted(_histograms.items())
+        rows = []
+        for (page, name), histogram in items:
+            cumulative, seen = [], 0
+            for count in histogram.counts:
+                seen += count
+                cumulative.append(seen)
+            rows.append({
+                "page": page,
+                "stage": name,
+                "count": histogram.count,
+                "sum": histogram.total,
+                "p50": histogram.quantile(0.5),
+                "p95": histogram.quantile(0.95),
+                "p99": histogram.quantile(0.99),
+                "buckets": dict(zip(map(_bound, BUCKETS), cumulative)),
+            })
+    return rows
+
+
+def _bound(bucket):
+    return "+Inf" if bucket == float("inf") else repr(bucket)
+
+
+def to_prometheus(rows=None):
+    """
+    Formats the histograms in the Prometheus text exposition format.
+
+    Args:
+        rows (list): A ``snapshot``, or None to take one.
+
+    Returns:
+        str: The ``dashboard_stage_seconds`` histogram.
+    """
+    lines = [
+        "# HELP dashboard_stage_seconds Time spent in each stage of a dashboard page.",
+        "# TYPE dashboard_stage_seconds histogram",
+    ]
+    for row in snapshot() if rows is None else rows:
+        labels = f'page="{row["page"]}",stage="{row["stage"]}"'
+        for bound, count in row["buckets"].items():
+            lines.append(f'dashboard_stage_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f"dashboard_stage_seconds_sum{{{labels}}} {row['sum']}")
+        lines.append(f"dashboard_stage_seconds_count{{{labels}}} {row['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(path=None):
+    """
+    Writes the histograms as Prometheus text and JSON files.
+
+    Args:
+        path (str): The file path without extension, or None for
+            ``DUMP_PATH``.
+    """
+    path = path or DUMP_PATH
+    rows = snapshot()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    for extension, text in ((".prom", to_prometheus(rows)), (".json", json.dumps(rows, indent=1))):
+        tmp_path = f"{path}{extension}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path + extension)
+
+
+def reset():
+    """
+    Drops every recorded measurement.
+    """
+    with _lock:
+        _histograms.clear()
+
+
+def timing_panel(page):
+    """
+    Shows the stage timings of the current script run in the sidebar.
+
+    Does nothing while metrics are disabled.
+
+    Args:
+        page (str): The page to show the timings of.
+    """
+    if not ENABLED:
+        return
+    import streamlit as st
+
+    timings = rerun_timings(page)
+    with st.sidebar.expander("Timings"):
+        for name, seconds in timings.items():
+            st.write(f"{name}: {seconds * 1000:.1f} ms")
+        st.write(f"total: {sum(timings.values()) * 1000:.1f} ms")
+
+
+if ENABLED:
+    atexit.register(dump)
@@ -0,0 +1,138 @@
+"""
+Registry of fitted Prophet models.
+
+Models are serialized with Prophet's JSON serializer under
+``.store/models``, keyed by sensor and by a hash of the training data and
+the model settings.  A model trained on exactly the same data with the
+same settings is reused without refitting, and the most recent model of a
+sensor provides the initial parameters when new data has been appended,
+so a refresh converges in far fewer iterations than a cold fit.
+"""
+import glob
+import hashlib
+import os
+
+import numpy as np
+
+from smartagri import store
+
+# Directory holding the serialized models
+MODEL_DIR = os.path.join(store.STORE_DIR, "models")
+
+# Number of models kept per sensor
+KEEP_MODELS = 3
+
+
+def data_hash(sensor_data, config=None):
+    """
+    Returns a short hash of a ``ds``/``y`` training frame and model settings.
+
+    Args:
+        sensor_data (pandas.DataFrame): The training frame.
+        config (dict): The settings the model is created with, so that a
+            model fitted with other settings is not reused.
+
+    Returns:
+        str: A hex digest identifying the training data and settings.
+    """
+    digest = hashlib.sha256()
+    if config:
+        digest.update(repr(sorted(config.items())).encode())
+    digest.update(sensor_data['ds'].to_numpy(dtype='datetime64[ns]').tobytes())
+    digest.update(sensor_data['y'].to_numpy(dtype=np.float64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def model_path(sensor, digest):
+    """
+    Returns the file a sensor's model is stored in.
+
+    Args:
+        sensor (str): The sensor column.
+        digest (str): The training data hash.
+
+    Returns:
+        str: The absolute path of the model file.
+    """
+    return os.path.join(MODEL_DIR, f"{sensor}-{digest}.json")
+
+
+def load(sensor, digest):
+    """
+    Loads the model trained on exactly the given data, if there is one.
+
+    Args:
+        sensor (str): The sensor column.
+        digest (str): The training data hash.
+
+    Returns:
+        prophet.Prophet: The fitted model, or None.
+    """
+    path = model_path(sensor, digest)
+    if not os.path.exists(path):
+        return None
+    return _read(path)
+
+
+def latest(sensor):
+    """
+    Loads the most recently saved model of a sensor.
+
+    Args:
+        sensor (str): The sensor column.
+
+    Returns:
+        prophet.Prophet: The fitted model, or None.
+    """
+    paths = sorted(glob.glob(os.path.join(MODEL_DIR, f"{sensor}-*.json")), key=os.path.getmtime)
+    if not paths:
+        return None
+    return _read(paths[-1])
+
+
+def _read(path):
+    from prophet.serialize import model_from_json
+
+    with open(path) as f:
+        return model_from_json(f.read())
+
+
+def save(sensor, digest, model):
+    """
+    Stores a fitted model and drops the sensor's oldest models.
+
+    Args:
+        sensor (str): The sensor column.
+        digest (str): The training data hash.
+        model (prophet.Prophet): The fitted model.
+    """
+    from prophet.serialize import model_to_json
+
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    path = model_path(sensor, digest)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(model_to_json(model))
+    os.replace(tmp_path, path)
+
+    paths = sorted(glob.glob(os.path.join(MODEL_DIR, f"{sensor}-*.json")), key=os.path.getmtime)
+    for old_path in paths[:-KEEP_MODELS]:
+        os.remove(old_path)
+
+
+def warm_start_params(model):
+    """
+    Extracts a fitted model's parameters for initializing a new fit.
+
+    Args:
+        model (prophet.Prophet): The fitted model.
+
+    Returns:
+        dict: The ``init`` argument for ``Prophet.fit``.
+    """
+    params = {}
+    for name in ['k', 'm', 'sigma_obs']:
+        params[name] = float(np.mean(model.params[name]))
+    for name in ['delta', 'beta']:
+        params[name] = np.mean(model.params[name], axis=0)
+    return params
@@ -0,0 +1,316 @@
+"""
+Gap-aware resampled series of the sensor data, updated incrementally.
+
+A resampled series is one sensor of one dataset aggregated into buckets
+of a fixed frequency ("h", "3h", "15min", ...) with one aggregation
+("mean", "max", ...).  Every bucket also records how many readings it
+aggregated, and a bucket without any reading is flagged as a gap instead
+of silently holding NaN (or 0, for sums).
+
+Series are computed once and kept per dataset, sensor, frequency,
+aggregation and fill, in memory and persisted next to the Arrow store,
+so the forecast job and the home page do not re-resample the whole
+history on every run.  When rows are appended to the dataset only the
+last, possibly incomplete bucket and the new rows are aggregated again;
+any other change to the dataset rebuilds the series.
+
+Buckets are aligned to the epoch rather than to the first reading, so the
+buckets of the appended rows line up with the stored ones.  Only fixed
+frequencies (hours, minutes, days, ...) are supported for that reason.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from smartagri import cleaning, store
+
+# Aggregations a series can be resampled with
+AGGREGATIONS = ["mean", "median", "min", "max", "sum", "first", "last"]
+
+# Ways to fill missing readings before resampling: none, or the last valid reading
+FILLS = [None, "ffill"]
+
+_lock = threading.Lock()
+_series = {}
+
+
+def check_freq(freq):
+    """
+    Validates a resampling frequency.
+
+    Args:
+        freq (str): A pandas frequency string, e.g. "h" or "3h".
+
+    Returns:
+        str: The normalized frequency string.
+    """
+    offset = pd.tseries.frequencies.to_offset(freq)
+    if not isinstance(offset, pd.offsets.Tick):
+        raise ValueError(f"Only fixed frequencies can be resampled incrementally: {freq}")
+    return offset.freqstr
+
+
+def aggregate(rows, sensor, freq, agg="mean"):
+    """
+    Resamples the readings of one sensor into buckets.
+
+    Args:
+        rows (pandas.DataFrame): Timestamp-sorted rows with a ``timestamp``
+            column.
+        sensor (str): The sensor column.
+        freq (str): The bucket frequency.
+        agg (str): One of ``AGGREGATIONS``.
+
+    Returns:
+        pandas.DataFrame: One row per bucket from the first reading's bucket
+        to the last one's, indexed by bucket start, with the aggregated
+        ``value``, the ``count`` of readings and a ``gap`` flag; the value
+        of a gap is NaN.
+    """
+    values = pd.Series(rows[sensor].to_numpy(), index=pd.DatetimeIndex(rows["timestamp"]))
+    buckets = values.resample(freq, origin="epoch")
+    count = buckets.count()
+    gap = count.to_numpy() == 0
+    series = pd.DataFrame({
+        "value": buckets.agg(agg).to_numpy(dtype=np.float64),
+        "count": count.to_numpy(dtype=np.int64),
+        "gap": gap,
+    }, index=count.index)
+    series.loc[gap, "value"] = np.nan
+    series.index.name = "timestamp"
+    return series
+
+
+class ResampledSeries:
+    """
+    Maintains and persists one resampled series of a dataset.
+
+    Args:
+        filename (str): The name of the CSV dataset in the sensor store.
+        sensor (str): The sensor column.
+        freq (str): The bucket frequency.
+        agg (str): One of ``AGGREGATIONS``.
+        fill (str): One of ``FILLS``; "ffill" carries the last valid
+            reading forward before resampling, so only buckets without any
+            row are gaps.
+    """
+
+    def __init__(self, filename, sensor, freq, agg="mean", fill=None):
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation: {agg}")
+        if fill not in FILLS:
+            raise ValueError(f"Unknown fill: {fill}")
+        self.filename = filename
+        self.sensor = sensor
+        self.freq = check_freq(freq)
+        self.agg = agg
+        self.fill = fill
+        self.series = None
+        self.watermark = None
+        self.source_version = None
+        # Last valid reading before the last bucket, to fill the bucket from
+        self.carry = np.nan
+        self._load()
+
+    def series_path(self):
+        """
+        Returns the file the series is persisted to.
+
+        Returns:
+            str: The absolute path of the series file.
+        """
+        name = os.path.splitext(os.path.basename(self.filename))[0]
+        parts = [name, self.sensor, self.freq, self.agg] + ([self.fill] if self.fill else [])
+        return os.path.join(store.STORE_DIR, "resampled", ".".join(parts) + ".arrow")
+
+    def update(self, rows):
+        """
+        Aggregates rows into the series.
+
+        The rows must cover the last bucket of the series entirely, i.e.
+        start at or before its first reading, as ``refresh`` reads them.
+
+        Args:
+            rows (pandas.DataFrame): Timestamp-sorted rows to add.
+        """
+        if rows.empty:
+            return
+        if self.fill == "ffill":
+            rows = cleaning.forward_fill(rows, [self.sensor], limit=None, max_gap=None)
+            rows[self.sensor] = rows[self.sensor].fillna(self.carry)
+
+        update = aggregate(rows, self.sensor, self.freq, self.agg)
+        if self.series is not None:
+            # Buckets from the first updated one on are replaced
+            update = pd.concat([self.series[self.series.index < update.index[0]], update])
+        self.series = update
+
+        # The last bucket is aggregated again with the next rows; remember what fills it
+        before = rows.loc[rows["timestamp"].to_numpy() < self.series.index[-1].to_datetime64(), self.sensor].dropna()
+        if len(before):
+            self.carry = float(before.iloc[-1])
+        self.watermark = pd.Timestamp(rows["timestamp"].iloc[-1])
+
+    def refresh(self):
+        """
+        Brings the series up to date with the sensor store.
+
+        Segments only ever add rows, so when the only change is new
+        segments just the rows from the start of the last bucket on are
+        read.  Any other change (a rewritten CSV, segments removed or the
+        store recreated) rebuilds the series.
+        """
+        version = store.data_version(self.filename)
+        if version == self.source_version:
+            return
+
+        appended = (self.source_version is not None and version[0] == self.source_version[0]
+                    and version[1] > self.source_version[1])
+        if not appended:
+            self.series = None
+            self.watermark = None
+            self.carry = np.nan
+        if self.series is None:
+            rows = store.load_frame(self.filename, [self.sensor])
+        else:
+            # load_tail returns the rows after a timestamp, so step back one nanosecond
+            rows = store.load_tail(self.filename, self.series.index[-1] - pd.Timedelta(1, "ns"), [self.sensor])
+        self.update(rows)
+        self.source_version = version
+        self._save()
+
+    def query(self, start=None, end=None):
+        """
+        Returns the buckets of a time range.
+
+        Args:
+            start: The first timestamp, or None for the beginning.
+            end: The last timestamp (inclusive), or None for the end.
+
+        Returns:
+            pandas.DataFrame: The ``value``, ``count`` and ``gap`` of the
+            buckets starting in the range.
+        """
+        if self.series is None:
+            return pd.DataFrame({"value": pd.Series(dtype=np.float64), "count": pd.Series(dtype=np.int64),
+                                 "gap": pd.Series(dtype=bool)}, index=pd.DatetimeIndex([], name="timestamp"))
+        index = self.series.index
+        first = 0 if start is None else index.searchsorted(pd.Timestamp(start))
+        stop = len(index) if end is None else index.searchsorted(pd.Timestamp(end), side="right")
+        return self.series.iloc[first:stop]
+
+    def _load(self):
+        # Read the persisted series, if any
+        path = self.series_path()
+        if not os.path.exists(path):
+            return
+        table = feather.read_table(path)
+        metadata = table.schema.metadata or {}
+        if b"source_version" not in metadata:
+            return
+        self.series = table.to_pandas().set_index("timestamp")
+        self.source_version = tuple(int(part) for part in metadata[b"source_version"].split(b":"))
+        self.watermark = pd.Timestamp(metadata[b"watermark"].decode())
+        self.carry = float(metadata[b"carry"])
+
+    def _save(self):
+        if self.watermark is None:
+            return
+        path = self.series_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        metadata = {"source_version": ":".join(map(str, self.source_version)),
+                    "watermark": self.watermark.isoformat(), "carry": repr(self.carry)}
+        table = pa.Table.from_pandas(self.series.reset_index(), preserve_index=False)
+        table = table.replace_schema_metadata(metadata)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+
+
+def get_series(filename, sensor, freq, agg="mean", fill=None):
+    """
+    Returns the process-wide resampled series of a sensor, refreshed.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        sensor (str): The sensor column.
+        freq (str): The bucket frequency.
+        agg (str): One of ``AGGREGATIONS``.
+        fill (str): One of ``FILLS``.
+
+    Returns:
+        ResampledSeries: The up-to-date series.
+    """
+    key = (filename, sensor, check_freq(freq), agg, fill)
+    with _lock:
+        series = _series.get(key)
+        if series is None:
+            series = _series[key] = ResampledSeries(filename, sensor, freq, agg, fill)
+        series.refresh()
+    return series
+
+
+def resample(filename, sensor, freq, agg="mean", fill=None, start=None, end=None):
+    """
+    Returns one sensor of a dataset resampled, with its gaps flagged.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        sensor (str): The sensor column.
+        freq (str): The bucket frequency.
+        agg (str): One of ``AGGREGATIONS``.
+        fill (str): One of ``FILLS``.
+        start: The first timestamp, or None for the beginning.
+        end: The last timestamp (inclusive), or None for the end.
+
+    Returns:
+        pandas.DataFrame: The ``value``, ``count`` and ``gap`` of every
+        bucket, indexed by bucket start.
+    """
+    return get_series(filename, sensor, freq, agg, fill).query(start, end)
+
+
+def resample_frame(filename, sensors, freq, agg="mean", fill=None, start=None, end=None):
+    """
+    Returns several sensors of a dataset resampled into one frame.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        sensors (list): The sensor columns.
+        freq (str): The bucket frequency.
+        agg (str): One of ``AGGREGATIONS``.
+        fill (str): One of ``FILLS``.
+        start: The first timestamp, or None for the beginning.
+        end: The last timestamp (inclusive), or None for the end.
+
+    Returns:
+        pandas.DataFrame: A ``timestamp`` column and one column per sensor,
+        NaN in the sensor's gaps.
+    """
+    values = {sensor: resample(filename, sensor, freq, agg, fill, start, end)["value"] for sensor in sensors}
+    return pd.DataFrame(values).rename_axis("timestamp").reset_index()
+
+
+def gaps(series, freq):
+    """
+    Lists the runs of consecutive gap buckets in a resampled series.
+
+    Args:
+        series (pandas.DataFrame): A series returned by ``resample``.
+        freq (str): The bucket frequency of the series.
+
+    Returns:
+        pandas.DataFrame: One row per run with the ``start`` of its first
+        bucket, the ``end`` of its last bucket and the number of ``buckets``.
+    """
+    edges = np.diff(np.concatenate([[0], series["gap"].to_numpy(dtype=np.int8), [0]]))
+    first, stop = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    return pd.DataFrame({
+        "start": series.index[first],
+        "end": series.index[stop - 1] + pd.tseries.frequencies.to_offset(freq),
+        "buckets": stop - first,
+    })
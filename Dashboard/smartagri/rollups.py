@@ -0,0 +1,295 @@
+"""
+Multi-resolution pre-aggregated rollups of the sensor data.
+
+For every sensor the engine keeps min, sum, max and count per bucket at
+several resolutions (5 minutes, hourly, daily and weekly).  The aggregates
+are mergeable, so appending rows only re-aggregates the new rows and the
+last, partially filled bucket, and a refresh after an ingest only reads
+the appended tail of the store.  Rollups are persisted next to the Arrow
+store and a chart asks for the most detailed resolution whose number of
+buckets in the visible range fits its point budget.
+"""
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from smartagri import store
+
+# Resolutions from finest to coarsest, with their pandas floor frequency
+RESOLUTIONS = {
+    "5min": "5min",
+    "hourly": "h",
+    "daily": "D",
+    "weekly": None,
+}
+
+# Statistics kept per sensor and bucket
+STATS = ["min", "sum", "max", "count"]
+
+# Default number of points a chart may receive
+DEFAULT_MAX_POINTS = 3000
+
+_lock = threading.Lock()
+_engines = {}
+
+
+def bucket_starts(timestamps, resolution):
+    """
+    Maps timestamps to the start of their bucket.
+
+    Args:
+        timestamps (pandas.DatetimeIndex): The timestamps to bucket.
+        resolution (str): One of the keys of ``RESOLUTIONS``.
+
+    Returns:
+        pandas.DatetimeIndex: The bucket start of every timestamp.
+    """
+    if resolution == "weekly":
+        # Weeks start on Monday
+        days = timestamps.floor("D")
+        return days - pd.to_timedelta(days.dayofweek, unit="D")
+    return timestamps.floor(RESOLUTIONS[resolution])
+
+
+def aggregate(frame, resolution, sensors):
+    """
+    Aggregates raw rows into buckets of one resolution.
+
+    Args:
+        frame (pandas.DataFrame): Rows with a ``timestamp`` column.
+        resolution (str): One of the keys of ``RESOLUTIONS``.
+        sensors (list): The sensor columns to aggregate.
+
+    Returns:
+        pandas.DataFrame: One row per bucket with ``<sensor>_<stat>`` columns.
+    """
+    buckets = bucket_starts(pd.DatetimeIndex(frame["timestamp"]), resolution)
+    grouped = frame[sensors].groupby(buckets)
+    parts = {
+        "min": grouped.min(),
+        "sum": grouped.sum(),
+        "max": grouped.max(),
+        "count": grouped.count(),
+    }
+    rollup = pd.DataFrame({
+        f"{sensor}_{stat}": parts[stat][sensor] for sensor in sensors for stat in STATS
+    })
+    rollup.index.name = "timestamp"
+    return rollup
+
+
+def merge(rollup, update):
+    """
+    Merges the aggregates of new rows into an existing rollup.
+
+    Only the buckets of ``rollup`` from the first bucket of ``update`` on
+    are re-aggregated.
+
+    Args:
+        rollup (pandas.DataFrame): The existing rollup.
+        update (pandas.DataFrame): The rollup of the new rows.
+
+    Returns:
+        pandas.DataFrame: The combined rollup.
+    """
+    if rollup is None or rollup.empty:
+        return update
+    if update.empty:
+        return rollup
+
+    head = rollup[rollup.index < update.index[0]]
+    tail = pd.concat([rollup[rollup.index >= update.index[0]], update])
+    how = {column: column.rsplit("_", 1)[1] for column in tail.columns}
+    how = {column: "sum" if stat == "count" else stat for column, stat in how.items()}
+    tail = tail.groupby(level=0).agg(how)
+    return pd.concat([head, tail])
+
+
+class RollupEngine:
+    """
+    Maintains and persists the rollups of one dataset.
+
+    Args:
+        filename (str): The name of the CSV dataset in the sensor store.
+        sensors (list): The sensor columns to aggregate.
+    """
+
+    def __init__(self, filename=store.CLEANED_DATA, sensors=None):
+        self.filename = filename
+        self.sensors = list(sensors or store.SENSORS)
+        self.rollups = {}
+        self.watermark = None
+        self.source_version = None
+        self._load()
+
+    def rollup_path(self, resolution):
+        """
+        Returns the file a rollup is persisted to.
+
+        Args:
+            resolution (str): One of the keys of ``RESOLUTIONS``.
+
+        Returns:
+            str: The absolute path of the rollup file.
+        """
+        name = os.path.splitext(os.path.basename(self.filename))[0]
+        return os.path.join(store.STORE_DIR, "rollups", f"{name}.{resolution}.arrow")
+
+    def update(self, rows):
+        """
+        Adds rows newer than the current watermark to every rollup.
+
+        Args:
+            rows (pandas.DataFrame): Timestamp-sorted rows to add.
+        """
+        if self.watermark is not None:
+            rows = rows[rows["timestamp"] > self.watermark]
+        if rows.empty:
+            return
+        for resolution in RESOLUTIONS:
+            self.rollups[resolution] = merge(
+                self.rollups.get(resolution), aggregate(rows, resolution, self.sensors)
+            )
+        self.watermark = rows["timestamp"].iloc[-1]
+
+    def refresh(self):
+        """
+        Brings the rollups up to date with the sensor store.
+
+        Rows appended since the last refresh are merged in; if the CSV was
+        rewritten, or the dataset now ends before the watermark, the
+        rollups are rebuilt.
+        """
+        version = store.data_version(self.filename)
+        if version == self.source_version:
+            return
+
+        last = store.last_timestamp(self.filename)
+        rewritten = self.source_version is not None and version[0] != self.source_version[0]
+        if self.watermark is not None and (rewritten or last is None or last < self.watermark):
+            self.rollups = {}
+            self.watermark = None
+        self.update(store.load_tail(self.filename, self.watermark, self.sensors))
+        self.source_version = version
+        self._save()
+
+    def choose_resolution(self, start=None, end=None, max_points=DEFAULT_MAX_POINTS):
+        """
+        Picks the most detailed resolution that fits a point budget.
+
+        Args:
+            start: The first visible timestamp, or None for the beginning.
+            end: The last visible timestamp, or None for the end.
+            max_points (int): The maximum number of buckets to return.
+
+        Returns:
+            str: The chosen resolution; the coarsest one if none fits.
+        """
+        for resolution in RESOLUTIONS:
+            if len(self._range(resolution, start, end)) <= max_points:
+                return resolution
+        return resolution
+
+    def query(self, sensor, start=None, end=None, max_points=DEFAULT_MAX_POINTS):
+        """
+        Returns the min/mean/max/count series of a sensor for a range.
+
+        Args:
+            sensor (str): The sensor column.
+            start: The first visible timestamp, or None for the beginning.
+            end: The last visible timestamp, or None for the end.
+            max_points (int): The maximum number of buckets to return.
+
+        Returns:
+            tuple: The chosen resolution and a DataFrame indexed by bucket
+            start with ``min``, ``mean``, ``max`` and ``count`` columns.
+        """
+        resolution = self.choose_resolution(start, end, max_points)
+        rollup = self._range(resolution, start, end)
+        result = pd.DataFrame({
+            "min": rollup[f"{sensor}_min"],
+            "mean": rollup[f"{sensor}_sum"] / rollup[f"{sensor}_count"],
+            "max": rollup[f"{sensor}_max"],
+            "count": rollup[f"{sensor}_count"],
+        })
+        return resolution, result
+
+    def _range(self, resolution, start, end):
+        rollup = self.rollups.get(resolution)
+        if rollup is None:
+            return pd.DataFrame(columns=[f"{s}_{stat}" for s in self.sensors for stat in STATS])
+        first = 0 if start is None else rollup.index.searchsorted(bucket_starts(pd.DatetimeIndex([start]), resolution)[0])
+        stop = len(rollup) if end is None else rollup.index.searchsorted(pd.Timestamp(end), side="right")
+        return rollup.iloc[first:stop]
+
+    def _load(self):
+        # Read persisted rollups; they are only used if every resolution is present
+        rollups = {}
+        metadata = None
+        for resolution in RESOLUTIONS:
+            path = self.rollup_path(resolution)
+            if not os.path.exists(path):
+                return
+            table = feather.read_table(path)
+            metadata = table.schema.metadata or {}
+            frame = table.to_pandas().set_index("timestamp")
+            if not set(f"{s}_min" for s in self.sensors) <= set(frame.columns):
+                return
+            rollups[resolution] = frame
+        if b"source_version" not in metadata:
+            return
+        self.rollups = rollups
+        self.source_version = tuple(int(part) for part in metadata[b"source_version"].split(b":"))
+        self.watermark = pd.Timestamp(metadata[b"watermark"].decode())
+
+    def _save(self):
+        if self.watermark is None:
+            return
+        os.makedirs(os.path.dirname(self.rollup_path("daily")), exist_ok=True)
+        metadata = {"source_version": ":".join(map(str, self.source_version)), "watermark": self.watermark.isoformat()}
+        for resolution, rollup in self.rollups.items():
+            table = pa.Table.from_pandas(rollup.reset_index(), preserve_index=False)
+            table = table.replace_schema_metadata(metadata)
+            path = self.rollup_path(resolution)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            feather.write_feather(table, tmp_path, compression="uncompressed")
+            os.replace(tmp_path, path)
+
+
+def get_engine(filename=store.CLEANED_DATA):
+    """
+    Returns the process-wide rollup engine of a dataset, refreshed.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+
+    Returns:
+        RollupEngine: The up-to-date engine.
+    """
+    with _lock:
+        engine = _engines.get(filename)
+        if engine is None:
+            engine = _engines[filename] = RollupEngine(filename)
+        engine.refresh()
+    return engine
+
+
+def query(filename, sensor, start=None, end=None, max_points=DEFAULT_MAX_POINTS):
+    """
+    Returns the rollup series of a sensor that fits a point budget.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        sensor (str): The sensor column.
+        start: The first visible timestamp, or None for the beginning.
+        end: The last visible timestamp, or None for the end.
+        max_points (int): The maximum number of buckets to return.
+
+    Returns:
+        tuple: The chosen resolution and the ``min``/``mean``/``max``/``count``
+        DataFrame.
+    """
+    return get_engine(filename).query(sensor, start, end, max_points)
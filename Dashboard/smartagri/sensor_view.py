@@ -0,0 +1,156 @@
+"""
+The sensor page shared by Temperature, Humidity, Air Pressure, Ultrasound
+and Soil Moisture.
+
+Each page script only calls ``render`` with its sensor column; the labels,
+unit and color come from ``smartagri.sensors``, and the unit is shown on the
+chart axes and headings.  All pages share the data
+handle of the sensor store, the rollups, the figure cache and one copy of
+the stylesheet, and seaborn is only imported when a scatter plot is drawn.
+"""
+import os
+
+import pandas as pd
+import streamlit as st
+
+from smartagri import figures, live, metrics, rollups, sensors, store
+from smartagri.downsample import downsample
+
+# Stylesheet shared by every page
+CSS_PATH = os.path.join(store.DASHBOARD_DIR, "styles.css")
+
+# Chart types, with the button that selects them
+CHARTS = {
+    "line": "Show Line Chart",
+    "bar": "Show Bar Chart",
+    "pie": "Show Pie Chart",
+    "scatter": "Show Scatter Plot",
+}
+
+_css = None
+
+
+def load_css():
+    """
+    Returns the page stylesheet, read from disk only once per process.
+
+    Returns:
+        str: The contents of styles.css.
+    """
+    global _css
+    if _css is None:
+        with open(CSS_PATH) as f:
+            _css = f.read()
+    return _css
+
+
+def draw_pie(fig, data, sensor):
+    """
+    Draws the share of readings in five equal-width value ranges.
+
+    Args:
+        fig (matplotlib.figure.Figure): The figure to draw on.
+        data (pandas.DataFrame): The sensor's readings.
+        sensor (Sensor): The registry entry of the sensor.
+    """
+    bins = pd.cut(data[sensor.column], bins=5)
+    pie_data = bins.value_counts().reset_index()
+    pie_data.columns = ['Range', 'Count']
+    ax = fig.subplots()
+    ax.pie(pie_data['Count'], labels=pie_data['Range'], autopct='%1.1f%%')
+    ax.set_title(f'{sensors.title(sensor.column)} Range')
+
+
+def draw_scatter(fig, chart, sensor):
+    """
+    Draws the rollup means of a sensor as a scatter plot.
+
+    Args:
+        fig (matplotlib.figure.Figure): The figure to draw on.
+        chart (pandas.Series): The rollup means, indexed by timestamp.
+        sensor (Sensor): The registry entry of the sensor.
+    """
+    import seaborn as sns
+
+    ax = fig.subplots()
+    sns.scatterplot(x='timestamp', y=sensor.column, data=chart.reset_index(), ax=ax)
+    ax.set_ylabel(sensors.title(sensor.column))
+
+
+def render(column):
+    """
+    Renders the page of one sensor.
+
+    Args:
+        column (str): The sensor column, e.g. "TC".
+    """
+    sensor = sensors.get(column)
+    # Label with the unit, used for the chart axes and headings
+    title = sensors.title(column)
+
+    # Set page configuration to wide mode
+    st.set_page_config(page_title="Smart Agriculture Dashboard", layout="wide")
+
+    # Load custom CSS
+    st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
+
+    # Check if the data file exists before attempting to load it
+    if not os.path.exists(store.get_file_path(store.CLEANED_DATA)):
+        st.error(f"Data file not found: {store.CLEANED_DATA}")
+        return
+
+    # Load only this sensor's column from the shared sensor store
+    with metrics.stage(sensor.label, "load"):
+        data = store.load_frame(store.CLEANED_DATA, columns=[column])
+
+    # Live mode appends new rows to the line chart
+    live_interval = live.controls()
+
+    # Pre-aggregated series that fits the chart point budget
+    with metrics.stage(sensor.label, "aggregate"):
+        _, rollup = rollups.query(store.CLEANED_DATA, column)
+        chart = rollup['mean'].rename(column)
+
+    # Page title
+    st.title(f"{sensor.label} ({column}) Visualizations")
+    st.markdown("<div class='card1'><h3>Choose a Visualizations</h3></div>", unsafe_allow_html=True)
+
+    # Remember the chart type per sensor across reruns
+    state_key = f"current_chart:{column}"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = 'line'
+
+    # Arrange buttons in a single row
+    for button_col, (chart_type, label) in zip(st.columns(len(CHARTS)), CHARTS.items()):
+        if button_col.button(label):
+            st.session_state[state_key] = chart_type
+
+    # Display the corresponding chart based on the current chart type
+    current_chart = st.session_state[state_key]
+    version = store.data_version(store.CLEANED_DATA)
+    with metrics.stage(sensor.label, "render"):
+        if current_chart == 'line':
+            st.markdown(f"<div class='card1'><h3>{title} Over Time</h3></div>", unsafe_allow_html=True)
+            series = downsample(data, column).rename(title)
+            if live_interval:
+                watermark = data['timestamp'].iloc[-1] if len(data) else None
+                live.follow(series, store.CLEANED_DATA, column, watermark, live_interval, color=sensor.color)
+            else:
+                st.line_chart(series, color=sensor.color)
+
+        elif current_chart == 'bar':
+            st.markdown(f"<div class='card1'><h3>{title} Distribution</h3></div>", unsafe_allow_html=True)
+            st.bar_chart(chart.rename(title), color=sensor.color)
+
+        elif current_chart == 'pie':
+            st.markdown(f"<div class='card1'><h3>{title} Proportions</h3></div>", unsafe_allow_html=True)
+            image = figures.render('pie', column, version, lambda fig: draw_pie(fig, data, sensor))
+            st.image(image, use_column_width=True)
+
+        elif current_chart == 'scatter':
+            st.markdown(f"<div class='card1'><h3>{title} Scatter Plot</h3></div>", unsafe_allow_html=True)
+            image = figures.render('scatter', column, version, lambda fig: draw_scatter(fig, chart, sensor))
+            st.image(image, use_column_width=True)
+
+    st.markdown("<footer>Smart Agriculture Dashboard © 2024</footer>", unsafe_allow_html=True)
+    metrics.timing_panel(sensor.label)
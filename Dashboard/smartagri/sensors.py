@@ -0,0 +1,57 @@
+"""
+Registry of the sensors shown by the dashboard.
+
+Every sensor page, and every other place that needs a sensor's display
+name, unit or chart color, reads it from here instead of hard-coding it.
+"""
+from collections import namedtuple
+
+Sensor = namedtuple("Sensor", ["column", "label", "unit", "color"])
+
+# Sensors in the order they appear on the dashboard, with the units of
+# cleaned_data.csv (the soil and ultrasound readings are raw sensor values)
+REGISTRY = {
+    "TC": Sensor("TC", "Temperature", "°C", "#77b5fe"),
+    "HUM": Sensor("HUM", "Humidity", "%", "#77b5fe"),
+    "PRES": Sensor("PRES", "Air Pressure", "Pa", "#77b5fe"),
+    "US": Sensor("US", "Ultrasound", "", "#77b5fe"),
+    "SOIL1": Sensor("SOIL1", "Soil Moisture", "", "#77b5fe"),
+}
+
+
+def get(column):
+    """
+    Returns the registry entry of a sensor.
+
+    Args:
+        column (str): The sensor column, e.g. "TC".
+
+    Returns:
+        Sensor: The sensor's column, label, unit and chart color.
+    """
+    return REGISTRY[column]
+
+
+def labels():
+    """
+    Returns the display name of every sensor.
+
+    Returns:
+        dict: The label of each sensor column, in dashboard order.
+    """
+    return {column: sensor.label for column, sensor in REGISTRY.items()}
+
+
+def title(column):
+    """
+    Returns the display name of a sensor with its unit, for chart axes and
+    headings.
+
+    Args:
+        column (str): The sensor column, e.g. "TC".
+
+    Returns:
+        str: E.g. "Temperature (°C)", or just the label for unitless sensors.
+    """
+    sensor = get(column)
+    return f"{sensor.label} ({sensor.unit})" if sensor.unit else sensor.label
@@ -0,0 +1,405 @@
+"""
+Sensor data of many field stations, partitioned by station and month.
+
+Every station's readings live under ``.store/stations/<station>/`` as one
+Arrow file per calendar month (``2024-05.arrow``), each sorted by
+timestamp.  A query for one station and a time range only opens the
+partitions of that station whose month overlaps the range, which is known
+from the file names alone, so a week of one station reads one or two
+files however many stations and months are stored.
+
+Stations are described in ``stations.json`` (name, location, and
+optionally the CSV dataset their readings come from and their forecast).
+A station with a source dataset is kept in sync with it: rows appended
+to the dataset are copied into the station's partitions on the next
+query.  Readings of other stations are written with ``write``, e.g. by
+``ingest_job.py --station``.
+"""
+import json
+import os
+import shutil
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from smartagri import cache, stats, store
+
+# Station registry shipped with the dashboard
+STATIONS_FILE = os.environ.get("STATIONS_FILE", os.path.join(store.DASHBOARD_DIR, "stations.json"))
+
+# Directory holding one partition directory per station
+STATIONS_DIR = os.path.join(store.STORE_DIR, "stations")
+
+# Columns of every partition
+COLUMNS = ["timestamp"] + store.SENSORS
+
+Station = namedtuple("Station", ["id", "name", "location", "source", "forecast"])
+
+_lock = threading.RLock()
+_moments = {}
+
+
+def load_registry():
+    """
+    Reads the stations described in ``stations.json``.
+
+    Returns:
+        dict: The ``Station`` of each station id, in file order.
+    """
+    if not os.path.exists(STATIONS_FILE):
+        return {}
+    with open(STATIONS_FILE, encoding="utf-8") as f:
+        entries = json.load(f)
+    return {
+        station_id: Station(station_id, entry.get("name", station_id), entry.get("location", ""),
+                            entry.get("source"), entry.get("forecast"))
+        for station_id, entry in entries.items()
+    }
+
+
+def list_stations():
+    """
+    Lists the registered stations and any other station with stored data.
+
+    Returns:
+        list: ``Station`` tuples, registered stations first.
+    """
+    registry = load_registry()
+    try:
+        stored = sorted(name for name in os.listdir(STATIONS_DIR) if not name.startswith("."))
+    except FileNotFoundError:
+        stored = []
+    unknown = [Station(station_id, station_id, "", None, None) for station_id in stored if station_id not in registry]
+    return list(registry.values()) + unknown
+
+
+def get(station_id):
+    """
+    Returns the description of a station.
+
+    Args:
+        station_id (str): The station id.
+
+    Returns:
+        Station: The registered station, or a bare one for unregistered ids.
+    """
+    return load_registry().get(station_id) or Station(station_id, station_id, "", None, None)
+
+
+def get_station_dir(station_id):
+    """
+    Returns the directory holding the partitions of a station.
+
+    Args:
+        station_id (str): The station id.
+
+    Returns:
+        str: The absolute path of the station directory.
+    """
+    return os.path.join(STATIONS_DIR, station_id)
+
+
+def month_bounds(month):
+    """
+    Returns the time span of a monthly partition.
+
+    Args:
+        month (str): The partition's month, e.g. "2024-05".
+
+    Returns:
+        tuple: The first instant of the month and of the next month, as
+        ``numpy.datetime64``.
+    """
+    start = np.datetime64(month, "M")
+    return start.astype("datetime64[ns]"), (start + 1).astype("datetime64[ns]")
+
+
+def list_partitions(station_id):
+    """
+    Lists the monthly partitions of a station in order.
+
+    Args:
+        station_id (str): The station id.
+
+    Returns:
+        list: ``(month, path)`` tuples, oldest first.
+    """
+    station_dir = get_station_dir(station_id)
+    try:
+        names = os.listdir(station_dir)
+    except FileNotFoundError:
+        return []
+    return sorted(
+        (name[:-6], os.path.join(station_dir, name))
+        for name in names
+        if name.endswith(".arrow") and not name.startswith(".")
+    )
+
+
+def prune(station_id, start=None, end=None):
+    """
+    Returns the partitions of a station that overlap a time range.
+
+    Args:
+        station_id (str): The station id.
+        start: The first timestamp, or None for the beginning.
+        end: The last timestamp (inclusive), or None for the end.
+
+    Returns:
+        list: ``(month, path)`` tuples, oldest first.
+    """
+    lower = None if start is None else pd.Timestamp(start).to_datetime64()
+    upper = None if end is None else pd.Timestamp(end).to_datetime64()
+    selected = []
+    for month, path in list_partitions(station_id):
+        first, stop = month_bounds(month)
+        if (lower is None or stop > lower) and (upper is None or first <= upper):
+            selected.append((month, path))
+    return selected
+
+
+def _write_partition(path, frame):
+    table = pa.table({
+        column: pa.array(frame[column].to_numpy(dtype="datetime64[ns]" if column == "timestamp" else np.float64),
+                         from_pandas=False)
+        for column in COLUMNS
+    })
+    # Write to a temporary file first so readers never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+
+def write(station_id, rows):
+    """
+    Adds readings to a station's partitions.
+
+    Rows may arrive in any order and may overlap stored ones: each
+    affected month is merged, sorted and rewritten, and a repeated
+    timestamp keeps the newest reading.
+
+    Args:
+        station_id (str): The station id.
+        rows (pandas.DataFrame): The readings, with a ``timestamp`` column.
+
+    Returns:
+        int: The number of rows written.
+    """
+    if rows.empty:
+        return 0
+    rows = rows.reindex(columns=COLUMNS)
+    rows["timestamp"] = pd.to_datetime(rows["timestamp"]).dt.tz_localize(None)
+    months = rows["timestamp"].dt.strftime("%Y-%m")
+
+    station_dir = get_station_dir(station_id)
+    os.makedirs(station_dir, exist_ok=True)
+    with _lock:
+        for month, part in rows.groupby(months.to_numpy(), sort=True):
+            path = os.path.join(station_dir, f"{month}.arrow")
+            if os.path.exists(path):
+                part = pd.concat([feather.read_table(path).to_pandas(), part], ignore_index=True)
+            part = part.sort_values("timestamp", kind="stable").drop_duplicates("timestamp", keep="last")
+            _write_partition(path, part)
+    return len(rows)
+
+
+def last_timestamp(station_id):
+    """
+    Returns the newest timestamp stored for a station.
+
+    Args:
+        station_id (str): The station id.
+
+    Returns:
+        numpy.datetime64: The last timestamp, or None if nothing is stored.
+    """
+    for _, path in reversed(list_partitions(station_id)):
+        timestamps = _read_partition(path, ["timestamp"])["timestamp"].to_numpy()
+        if len(timestamps):
+            return timestamps[-1]
+    return None
+
+
+def sync(station):
+    """
+    Copies the rows appended to a station's source dataset into its partitions.
+
+    The source's data version is remembered in the station directory, so
+    this is a ``stat`` when nothing changed.  If the source CSV itself was
+    rewritten, the station's partitions are rebuilt from it.
+
+    Args:
+        station (Station): The station; stations without a source are left
+            as they are.
+    """
+    if not station.source or not os.path.exists(store.get_file_path(station.source)):
+        return
+    station_dir = get_station_dir(station.id)
+    marker = os.path.join(station_dir, ".source_version")
+    source_version = store.data_version(station.source)
+    version = ":".join(map(str, source_version))
+    with _lock:
+        synced = None
+        if os.path.exists(marker):
+            with open(marker) as f:
+                synced = f.read()
+            if synced == version:
+                return
+
+        # Segments only add rows; a rewritten CSV may change any of them
+        last = last_timestamp(station.id)
+        source_last = store.last_timestamp(station.source)
+        rewritten = synced is None or synced.split(":")[0] != str(source_version[0])
+        if last is not None and (rewritten or source_last is None or source_last < last):
+            shutil.rmtree(station_dir)
+            last = None
+        write(station.id, store.load_tail(station.source, last, store.SENSORS))
+
+        os.makedirs(station_dir, exist_ok=True)
+        with open(marker, "w") as f:
+            f.write(version)
+
+
+def _read_partition(path, columns):
+    # Partitions are shared through the frame cache until they are rewritten
+    columns = tuple(["timestamp"] + [c for c in columns if c != "timestamp"])
+
+    def load():
+        return feather.read_table(path, columns=list(columns), memory_map=True).to_pandas(split_blocks=True)
+
+    return cache.frames.get(path, os.stat(path).st_mtime_ns, columns, load)
+
+
+def _bounds(timestamps, start, end):
+    first = 0 if start is None else int(np.searchsorted(timestamps, pd.Timestamp(start).to_datetime64(), side="left"))
+    stop = len(timestamps) if end is None else int(np.searchsorted(timestamps, pd.Timestamp(end).to_datetime64(), side="right"))
+    return first, stop
+
+
+def load_range(station_id, start=None, end=None, columns=None):
+    """
+    Loads the readings of one station in a time range.
+
+    Only the partitions overlapping the range are read.
+
+    Args:
+        station_id (str): The station id.
+        start: The first timestamp, or None for the beginning.
+        end: The last timestamp (inclusive), or None for the end.
+        columns (list): The sensor columns, or None for all sensors.
+
+    Returns:
+        pandas.DataFrame: The ``timestamp`` and sensor columns, oldest first.
+    """
+    columns = list(columns or store.SENSORS)
+    sync(get(station_id))
+    frames = []
+    for _, path in prune(station_id, start, end):
+        frame = _read_partition(path, columns)
+        first, stop = _bounds(frame["timestamp"].to_numpy(), start, end)
+        frames.append(frame.iloc[first:stop])
+    if not frames:
+        return pd.DataFrame({column: pd.Series(dtype="datetime64[ns]" if column == "timestamp" else np.float64)
+                             for column in ["timestamp"] + columns})
+    return pd.concat(frames, ignore_index=True)
+
+
+def partition_moments(path, columns=None):
+    """
+    Returns the statistics of one whole partition.
+
+    Args:
+        path (str): The partition file.
+        columns (list): The sensor columns, or None for all sensors.
+
+    Returns:
+        stats.CoMoments: The statistics of the partition's rows.
+    """
+    columns = list(columns or store.SENSORS)
+    moments = cached_moments(path, columns)
+    if moments is None:
+        moments = stats.CoMoments.from_frame(_read_partition(path, columns), columns)
+        remember_moments(path, columns, moments)
+    return moments
+
+
+def cached_moments(path, columns):
+    """
+    Returns the statistics of a partition if they are cached and current.
+
+    Args:
+        path (str): The partition file.
+        columns (list): The sensor columns.
+
+    Returns:
+        stats.CoMoments: The cached statistics, or None.
+    """
+    return _moments.get((path, os.stat(path).st_mtime_ns, tuple(columns)))
+
+
+def remember_moments(path, columns, moments):
+    """
+    Caches the statistics of a partition until the partition is rewritten.
+
+    Args:
+        path (str): The partition file.
+        columns (list): The sensor columns.
+        moments (stats.CoMoments): The statistics of the whole partition.
+    """
+    key = (path, os.stat(path).st_mtime_ns, tuple(columns))
+    with _lock:
+        for stale in [k for k in _moments if k[0] == path and k != key]:
+            del _moments[stale]
+        _moments[key] = moments
+
+
+def range_moments(station_id, start=None, end=None, columns=None):
+    """
+    Returns the statistics of one station's readings in a time range.
+
+    Partitions inside the range contribute their cached statistics; only
+    the rows of the partitions cut by the range are read.
+
+    Args:
+        station_id (str): The station id.
+        start: The first timestamp, or None for the beginning.
+        end: The last timestamp (inclusive), or None for the end.
+        columns (list): The sensor columns, or None for all sensors.
+
+    Returns:
+        stats.CoMoments: The statistics of the range.
+    """
+    columns = list(columns or store.SENSORS)
+    sync(get(station_id))
+    lower = None if start is None else pd.Timestamp(start).to_datetime64()
+    upper = None if end is None else pd.Timestamp(end).to_datetime64()
+    moments = stats.CoMoments(columns)
+    for month, path in prune(station_id, start, end):
+        first, stop = month_bounds(month)
+        if (lower is None or lower <= first) and (upper is None or upper >= stop):
+            moments = moments.merge(partition_moments(path, columns))
+        else:
+            frame = _read_partition(path, columns)
+            rows = frame.iloc[slice(*_bounds(frame["timestamp"].to_numpy(), start, end))]
+            moments = moments.merge(stats.CoMoments.from_frame(rows, columns))
+    return moments
+
+
+def summary(station_id, start=None, end=None, columns=None):
+    """
+    Returns the count, mean, std, min and max of each sensor of a station.
+
+    Args:
+        station_id (str): The station id.
+        start: The first timestamp, or None for the beginning.
+        end: The last timestamp (inclusive), or None for the end.
+        columns (list): The sensor columns, or None for all sensors.
+
+    Returns:
+        pandas.DataFrame: One row per sensor.
+    """
+    return range_moments(station_id, start, end, columns).summary()
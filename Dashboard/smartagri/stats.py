@@ -0,0 +1,470 @@
+"""
+One-pass, mergeable statistics of the sensor data.
+
+For every pair of sensors the engine keeps the count, means, sums of
+squared deviations (Welford's M2) and co-moment over the rows where both
+are present, which is what ``DataFrame.corr`` uses; the diagonal holds the
+per-sensor count, mean and variance.  Min and max are kept per sensor.
+
+The statistics are kept per hourly bucket.  Summaries of disjoint blocks
+of rows merge exactly (Chan et al.), so the statistics of any range are the
+merge of the buckets it covers plus the raw rows of its two partial edge
+buckets, and appended rows only update the last bucket and add new ones.
+
+The buckets are persisted next to the Arrow store, so the ingest process
+keeps them current as it appends and the dashboard only reads them back.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from smartagri import store
+
+# Width of the buckets statistics are kept for
+BUCKET_FREQ = "h"
+
+# Rows processed at once when building bucket statistics
+CHUNK_ROWS = 50000
+
+# Attributes holding the statistics, shared by CoMoments and BucketStats
+FIELDS = ["n", "mean", "m2", "cxy", "minimum", "maximum"]
+
+_lock = threading.Lock()
+_states = {}
+
+
+class CoMoments:
+    """
+    Running statistics of a set of columns.
+
+    ``n``, ``mean``, ``m2`` and ``cxy`` are square matrices over the
+    columns; entry ``[i, j]`` describes column ``i`` over the rows where
+    both ``i`` and ``j`` are present.  ``minimum`` and ``maximum`` hold one
+    value per column.
+
+    Args:
+        columns (list): The column names.
+    """
+
+    def __init__(self, columns):
+        k = len(columns)
+        self.columns = list(columns)
+        self.n = np.zeros((k, k))
+        self.mean = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+        self.cxy = np.zeros((k, k))
+        self.minimum = np.full(k, np.nan)
+        self.maximum = np.full(k, np.nan)
+
+    @classmethod
+    def from_frame(cls, frame, columns):
+        """
+        Computes the statistics of a block of rows.
+
+        Args:
+            frame (pandas.DataFrame): The rows.
+            columns (list): The columns to use.
+
+        Returns:
+            CoMoments: The statistics of the rows.
+        """
+        values = frame[columns].to_numpy(dtype=np.float64)
+        if not len(values):
+            return cls(columns)
+        return BucketStats.from_values(np.zeros(1, dtype="datetime64[ns]"), [0], values, columns).total()
+
+    def merge(self, other):
+        """
+        Combines the statistics of two disjoint blocks of rows.
+
+        Args:
+            other (CoMoments): The statistics of the other block.
+
+        Returns:
+            CoMoments: The statistics of both blocks.
+        """
+        merged = CoMoments(self.columns)
+        merged.n, merged.mean, merged.m2, merged.cxy = _combine(
+            np.stack([self.n, other.n]), np.stack([self.mean, other.mean]),
+            np.stack([self.m2, other.m2]), np.stack([self.cxy, other.cxy]),
+        )
+        merged.minimum = np.fmin(self.minimum, other.minimum)
+        merged.maximum = np.fmax(self.maximum, other.maximum)
+        return merged
+
+    def summary(self):
+        """
+        Returns the per-column statistics.
+
+        Returns:
+            pandas.DataFrame: ``count``, ``mean``, ``std``, ``min`` and
+            ``max`` per column, like ``DataFrame.describe``.
+        """
+        count = np.diag(self.n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(np.diag(self.m2) / (count - 1))
+        return pd.DataFrame({
+            "count": count.astype(np.int64),
+            "mean": np.where(count > 0, np.diag(self.mean), np.nan),
+            "std": np.where(count > 1, std, np.nan),
+            "min": self.minimum,
+            "max": self.maximum,
+        }, index=self.columns)
+
+    def corr(self):
+        """
+        Returns the Pearson correlation matrix.
+
+        Returns:
+            pandas.DataFrame: The matrix, NaN where a pair has fewer than two
+            rows or no variance.
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self.cxy / np.sqrt(self.m2 * self.m2.T)
+        corr[(self.n < 2) | ~np.isfinite(corr)] = np.nan
+        corr = np.clip(corr, -1.0, 1.0)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+def _combine(n, mean, m2, cxy):
+    # Merge statistics stacked along the first axis (parallel-axis rule)
+    total = n.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        combined = np.where(total > 0, (n * mean).sum(axis=0) / total, 0.0)
+    delta = np.where(n > 0, mean - combined, 0.0)
+    m2 = m2.sum(axis=0) + (n * delta * delta).sum(axis=0)
+    cxy = cxy.sum(axis=0) + (n * delta * delta.swapaxes(1, 2)).sum(axis=0)
+    return total, combined, m2, cxy
+
+
+class BucketStats:
+    """
+    Statistics of a dataset per time bucket.
+
+    Every attribute of ``CoMoments`` is stored with a leading bucket axis.
+
+    Args:
+        columns (list): The column names.
+        starts (numpy.ndarray): The bucket start times, ascending.
+    """
+
+    def __init__(self, columns, starts):
+        b, k = len(starts), len(columns)
+        self.columns = list(columns)
+        self.starts = starts
+        self.n = np.zeros((b, k, k))
+        self.mean = np.zeros((b, k, k))
+        self.m2 = np.zeros((b, k, k))
+        self.cxy = np.zeros((b, k, k))
+        self.minimum = np.full((b, k), np.nan)
+        self.maximum = np.full((b, k), np.nan)
+
+    @classmethod
+    def from_values(cls, starts, offsets, values, columns):
+        """
+        Computes bucket statistics from rows already grouped by bucket.
+
+        Args:
+            starts (numpy.ndarray): The start time of every bucket.
+            offsets (list): The first row of every bucket.
+            values (numpy.ndarray): The rows, one column per sensor.
+            columns (list): The column names.
+
+        Returns:
+            BucketStats: The statistics of every bucket.
+        """
+        buckets = cls(columns, np.asarray(starts, dtype="datetime64[ns]"))
+        offsets = np.asarray(offsets, dtype=np.int64)
+        present = ~np.isnan(values)
+
+        weights = present.astype(np.float64)
+
+        # Center every bucket on its column means so the sums below do not
+        # lose precision
+        counts = np.diff(np.append(offsets, len(values)))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            shift = np.add.reduceat(np.where(present, values, 0.0), offsets) / np.add.reduceat(weights, offsets)
+        shift = np.nan_to_num(shift)
+        centered = np.where(present, values - np.repeat(shift, counts, axis=0), 0.0)
+
+        n = np.add.reduceat(weights[:, :, None] * weights[:, None, :], offsets)
+        sums = np.add.reduceat(centered[:, :, None] * weights[:, None, :], offsets)
+        squares = np.add.reduceat((centered * centered)[:, :, None] * weights[:, None, :], offsets)
+        products = np.add.reduceat(centered[:, :, None] * centered[:, None, :], offsets)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(n > 0, sums / n, 0.0)
+        buckets.n = n
+        buckets.mean = means + shift[:, :, None]
+        buckets.m2 = squares - sums * means
+        buckets.cxy = products - sums * means.swapaxes(1, 2)
+        buckets.minimum = np.fmin.reduceat(values, offsets)
+        buckets.maximum = np.fmax.reduceat(values, offsets)
+        return buckets
+
+    @classmethod
+    def from_frame(cls, frame, columns, freq=BUCKET_FREQ):
+        """
+        Computes the bucket statistics of timestamp-sorted rows.
+
+        The rows are processed in chunks of ``CHUNK_ROWS``.
+
+        Args:
+            frame (pandas.DataFrame): Rows with a ``timestamp`` column.
+            columns (list): The columns to use.
+            freq (str): The bucket width, a pandas frequency.
+
+        Returns:
+            BucketStats: The statistics of every bucket.
+        """
+        buckets = cls(columns, np.empty(0, dtype="datetime64[ns]"))
+        for first in range(0, len(frame), CHUNK_ROWS):
+            chunk = frame.iloc[first:first + CHUNK_ROWS]
+            keys = pd.DatetimeIndex(chunk["timestamp"]).floor(freq).to_numpy()
+            offsets = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            values = chunk[columns].to_numpy(dtype=np.float64)
+            buckets = buckets.append(cls.from_values(keys[offsets], offsets, values, columns))
+        return buckets
+
+    def append(self, other):
+        """
+        Adds the statistics of later rows.
+
+        A bucket present in both (the last one here, the first one in
+        ``other``) is merged.
+
+        Args:
+            other (BucketStats): The statistics of rows not older than the
+                last bucket here.
+
+        Returns:
+            BucketStats: The combined statistics.
+        """
+        if not len(self.starts):
+            return other
+        if not len(other.starts):
+            return self
+
+        shared = self.starts[-1] == other.starts[0]
+        merged = BucketStats(self.columns, np.concatenate([self.starts, other.starts[1:] if shared else other.starts]))
+        for name in FIELDS:
+            ours, theirs = getattr(self, name), getattr(other, name)
+            setattr(merged, name, np.concatenate([ours, theirs[1:] if shared else theirs]))
+        if shared:
+            bucket = self.bucket(-1).merge(other.bucket(0))
+            last = len(self.starts) - 1
+            for name in FIELDS:
+                getattr(merged, name)[last] = getattr(bucket, name)
+        return merged
+
+    def bucket(self, i):
+        """
+        Returns the statistics of one bucket.
+
+        Args:
+            i (int): The bucket position.
+
+        Returns:
+            CoMoments: The statistics of the bucket.
+        """
+        moments = CoMoments(self.columns)
+        for name in FIELDS:
+            setattr(moments, name, getattr(self, name)[i])
+        return moments
+
+    def total(self, first=0, stop=None):
+        """
+        Merges a run of buckets.
+
+        Args:
+            first (int): The first bucket.
+            stop (int): One past the last bucket, or None for all of them.
+
+        Returns:
+            CoMoments: The statistics of the buckets.
+        """
+        moments = CoMoments(self.columns)
+        window = slice(first, stop)
+        if not len(self.starts[window]):
+            return moments
+        moments.n, moments.mean, moments.m2, moments.cxy = _combine(
+            self.n[window], self.mean[window], self.m2[window], self.cxy[window]
+        )
+        moments.minimum = np.fmin.reduce(self.minimum[window], axis=0)
+        moments.maximum = np.fmax.reduce(self.maximum[window], axis=0)
+        return moments
+
+
+class _State:
+    def __init__(self, version, watermark, buckets):
+        self.version = version
+        self.watermark = watermark
+        self.buckets = buckets
+
+
+def stats_path(filename, columns):
+    """
+    Returns the file the bucket statistics of a dataset are persisted to.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        columns (list): The sensor columns.
+
+    Returns:
+        str: The absolute path of the statistics file.
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(store.STORE_DIR, "stats", f"{name}.{'-'.join(columns)}.arrow")
+
+
+def _load(path, columns):
+    # Read persisted bucket statistics, if any
+    if not os.path.exists(path):
+        return None
+    table = feather.read_table(path)
+    metadata = table.schema.metadata or {}
+    if b"source_version" not in metadata:
+        return None
+    k = len(columns)
+    buckets = BucketStats(columns, table.column("timestamp").to_numpy())
+    for name in FIELDS:
+        values = table.column(name).combine_chunks().flatten().to_numpy()
+        setattr(buckets, name, values.reshape((-1, k) if name in ("minimum", "maximum") else (-1, k, k)))
+    version = tuple(int(part) for part in metadata[b"source_version"].split(b":"))
+    watermark = pd.Timestamp(metadata[b"watermark"].decode()).to_datetime64() if metadata[b"watermark"] else None
+    return _State(version, watermark, buckets)
+
+
+def _save(path, state):
+    buckets = state.buckets
+    arrays = {"timestamp": pa.array(buckets.starts)}
+    for name in FIELDS:
+        values = getattr(buckets, name)
+        width = int(np.prod(values.shape[1:]))
+        arrays[name] = pa.FixedSizeListArray.from_arrays(pa.array(values.reshape(-1)), width)
+    metadata = {"source_version": ":".join(map(str, state.version)),
+                "watermark": "" if state.watermark is None else pd.Timestamp(state.watermark).isoformat()}
+    table = pa.table(arrays).replace_schema_metadata(metadata)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+
+def get_buckets(filename=store.CLEANED_DATA, columns=None):
+    """
+    Returns the up-to-date bucket statistics of a dataset.
+
+    The first call reads the persisted statistics, or the whole dataset;
+    later calls only read the rows appended since, unless the CSV itself
+    was rewritten.  Statistics persisted by another process (the ingest
+    job) are picked up when they match the current data version.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        columns (list): The sensor columns, or None for all sensors.
+
+    Returns:
+        BucketStats: The statistics of every hourly bucket.
+    """
+    columns = list(columns or store.SENSORS)
+    key = (filename, tuple(columns))
+    path = stats_path(filename, columns)
+    with _lock:
+        version = store.data_version(filename)
+        state = _states.get(key)
+        if state is None or state.version != version:
+            saved = _load(path, columns)
+            if saved is not None and (state is None or saved.version == version):
+                state = _states[key] = saved
+        if state is not None and state.version == version:
+            return state.buckets
+
+        # Segments only add rows; a rewritten CSV may change any of them
+        last = store.last_timestamp(filename)
+        if (state is None or state.watermark is None or last is None or last < state.watermark
+                or version[0] != state.version[0]):
+            frame = store.load_frame(filename, columns)
+            state = _states[key] = _State(version, last, BucketStats.from_frame(frame, columns))
+        else:
+            tail = store.load_tail(filename, state.watermark, columns)
+            state.buckets = state.buckets.append(BucketStats.from_frame(tail, columns))
+            state.version, state.watermark = version, last
+        _save(path, state)
+        return state.buckets
+
+
+def range_stats(filename=store.CLEANED_DATA, start=None, end=None, columns=None):
+    """
+    Returns the statistics of the rows in a time range.
+
+    Whole buckets are merged from their summaries; only the rows of the
+    partially covered buckets at either end are read.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        start: The first timestamp, or None for the beginning.
+        end: The last timestamp (inclusive), or None for the end.
+        columns (list): The sensor columns, or None for all sensors.
+
+    Returns:
+        CoMoments: The statistics of the range.
+    """
+    columns = list(columns or store.SENSORS)
+    buckets = get_buckets(filename, columns)
+    if (start is None and end is None) or not len(buckets.starts):
+        return buckets.total()
+
+    starts = buckets.starts
+    ends = starts + (pd.Timedelta(pd.tseries.frequencies.to_offset(BUCKET_FREQ)) - pd.Timedelta(1, "ns")).to_timedelta64()
+    lower = starts[0] if start is None else pd.Timestamp(start).to_datetime64()
+    upper = ends[-1] if end is None else pd.Timestamp(end).to_datetime64()
+
+    # Buckets lying entirely inside [lower, upper]
+    first = int(np.searchsorted(starts, lower, side="left"))
+    stop = int(np.searchsorted(ends, upper, side="right"))
+    index = store.load_index(filename, columns)
+    if stop <= first:
+        return CoMoments.from_frame(index.slice_range(lower, upper), columns)
+
+    moments = buckets.total(first, stop)
+    if lower < starts[first]:
+        head = index.frame.iloc[slice(*index.bounds(lower, starts[first], inclusive=False))]
+        moments = moments.merge(CoMoments.from_frame(head, columns))
+    if upper > ends[stop - 1]:
+        tail = index.slice_range(ends[stop - 1] + np.timedelta64(1, "ns"), upper)
+        moments = moments.merge(CoMoments.from_frame(tail, columns))
+    return moments
+
+
+def correlation(filename=store.CLEANED_DATA, columns=None):
+    """
+    Returns the Pearson correlation matrix of a dataset's sensors.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        columns (list): The sensor columns, or None for all sensors.
+
+    Returns:
+        pandas.DataFrame: The correlation matrix, like ``DataFrame.corr``.
+    """
+    return range_stats(filename, columns=columns).corr()
+
+
+def summary(filename=store.CLEANED_DATA, start=None, end=None, columns=None):
+    """
+    Returns the count, mean, std, min and max of each sensor in a range.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        start: The first timestamp, or None for the beginning.
+        end: The last timestamp (inclusive), or None for the end.
+        columns (list): The sensor columns, or None for all sensors.
+
+    Returns:
+        pandas.DataFrame: One row per sensor.
+    """
+    return range_stats(filename, start, end, columns).summary()
@@ -0,0 +1,359 @@
+"""
+Columnar sensor store shared by every dashboard page.
+
+The CSV files shipped with the dashboard are converted once into typed
+Arrow IPC files (with a native datetime64 ``timestamp`` column) under
+``.store/``.  Pages then memory-map those files and project only the
+columns they need, so a page switch no longer re-parses the CSV.
+
+Readings that arrive after the CSV was written are appended as small,
+immutable Arrow segments under ``.store/segments/<dataset>/`` (see
+``smartagri.ingest``).  A dataset is the converted CSV followed by its
+segments, and ``load_tail`` reads only the rows newer than a timestamp.
+Once more than ``COMPACT_SEGMENTS`` segments pile up they are folded into
+one, so listing and mapping a dataset stays cheap however long ingestion
+runs.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from smartagri import cache
+from smartagri.time_index import TimeIndex
+
+# Directory containing app.py and the shipped CSV files
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Directory holding the converted Arrow files
+STORE_DIR = os.environ.get("SENSOR_STORE_DIR", os.path.join(DASHBOARD_DIR, ".store"))
+
+# Dataset names
+CLEANED_DATA = "cleaned_data.csv"
+PREDICTED_DATA = "predicted_data_2024.csv"
+
+# Sensor columns present in the cleaned dataset
+SENSORS = ["TC", "HUM", "PRES", "US", "SOIL1"]
+
+# Timestamp format of the dataset CSV files
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Number of segments of a dataset above which they are folded into one
+COMPACT_SEGMENTS = int(os.environ.get("SENSOR_COMPACT_SEGMENTS", 32))
+
+_lock = threading.Lock()
+_tables = {}
+
+
+def get_file_path(filename):
+    """
+    Constructs the absolute path to a dataset shipped with the dashboard.
+
+    Args:
+        filename (str): The name of the data file (e.g., "cleaned_data.csv").
+
+    Returns:
+        str: The absolute path to the data file.
+    """
+    return os.path.join(DASHBOARD_DIR, filename)
+
+
+def data_version(filename=CLEANED_DATA):
+    """
+    Returns a value that changes whenever a dataset is rewritten or appended to.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+
+    Returns:
+        tuple: The CSV file's mtime in nanoseconds and the number of the
+        last appended segment (0 if there is none).
+    """
+    segments = list_segments(filename)
+    return os.stat(get_file_path(filename)).st_mtime_ns, segments[-1][0] if segments else 0
+
+
+def get_store_path(filename):
+    """
+    Returns the path of the Arrow file that mirrors a CSV dataset.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+
+    Returns:
+        str: The absolute path to the converted Arrow file.
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(STORE_DIR, name + ".arrow")
+
+
+def convert_csv(csv_path, store_path):
+    """
+    Parses a CSV file once and writes it as an uncompressed Arrow file.
+
+    Rows are sorted by timestamp so that range queries can binary-search
+    them.  Float columns keep NaN as a value instead of an Arrow null so
+    that reading them back into pandas does not need a copy.
+
+    Args:
+        csv_path (str): The CSV file to convert.
+        store_path (str): Where to write the Arrow file.
+    """
+    data = pd.read_csv(csv_path)
+    data['timestamp'] = pd.to_datetime(data['timestamp'])
+    data = data.sort_values('timestamp', kind='stable', ignore_index=True)
+
+    table = pa.table({
+        column: pa.array(data[column].to_numpy(), from_pandas=False)
+        for column in data.columns
+    })
+
+    # Write to a temporary file first so readers never see a partial file
+    tmp_path = f"{store_path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, store_path)
+
+
+def get_segment_dir(filename):
+    """
+    Returns the directory holding the appended segments of a dataset.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+
+    Returns:
+        str: The absolute path of the segment directory.
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(STORE_DIR, "segments", name)
+
+
+def list_segments(filename):
+    """
+    Lists the appended segments of a dataset in order.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+
+    Returns:
+        list: ``(number, path)`` tuples, oldest first.
+    """
+    segment_dir = get_segment_dir(filename)
+    try:
+        names = os.listdir(segment_dir)
+    except FileNotFoundError:
+        return []
+    return sorted(
+        (int(name[4:-6]), os.path.join(segment_dir, name))
+        for name in names
+        if name.startswith("seg-") and name.endswith(".arrow")
+    )
+
+
+def _read_mapped(path):
+    # Memory-map an Arrow file, reusing the mapping while the file is unchanged
+    mtime = os.stat(path).st_mtime_ns
+    cached = _tables.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    table = feather.read_table(path, memory_map=True)
+    _tables[path] = (mtime, table)
+    return table
+
+
+def _timestamps(table):
+    return table.column("timestamp").to_numpy()
+
+
+def open_parts(filename=CLEANED_DATA):
+    """
+    Returns the memory-mapped pieces a dataset is made of.
+
+    The CSV is converted on first use and again whenever it is newer than
+    its Arrow copy.  Segment rows that are not newer than the rows before
+    them (e.g. after the CSV was regenerated, or while segments are being
+    compacted) are skipped.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+
+    Returns:
+        list: The ``pyarrow.Table`` of the CSV followed by one per segment.
+    """
+    csv_path = get_file_path(filename)
+    store_path = get_store_path(filename)
+    csv_mtime = os.stat(csv_path).st_mtime_ns
+
+    with _lock:
+        if not os.path.exists(store_path) or os.stat(store_path).st_mtime_ns < csv_mtime:
+            os.makedirs(STORE_DIR, exist_ok=True)
+            convert_csv(csv_path, store_path)
+
+        parts = [_read_mapped(store_path)]
+        last = _timestamps(parts[0])[-1] if parts[0].num_rows else None
+        segments = list_segments(filename)
+        for _, path in segments:
+            try:
+                segment = _read_mapped(path).select(parts[0].column_names)
+            except FileNotFoundError:
+                # Removed by a compaction; its rows are in the newest segment
+                continue
+            if last is not None and segment.num_rows:
+                segment = segment.slice(int(np.searchsorted(_timestamps(segment), last, side="right")))
+            if segment.num_rows:
+                parts.append(segment)
+                last = _timestamps(segment)[-1]
+        _evict(get_segment_dir(filename), {path for _, path in segments})
+    return parts
+
+
+def _evict(segment_dir, live):
+    # Drop the mappings of segments that were compacted away
+    prefix = segment_dir + os.sep
+    for path in [path for path in _tables if path.startswith(prefix) and path not in live]:
+        del _tables[path]
+
+
+def compact_segments(filename=CLEANED_DATA, threshold=COMPACT_SEGMENTS):
+    """
+    Folds the appended segments of a dataset into one once there are too many.
+
+    The merged segment replaces the newest one under its number, so the
+    dataset's rows and ``data_version`` stay the same, and the older
+    segments are removed afterwards.  A reader that still sees an old
+    segment next to the merged one skips the rows it already has.  Only
+    the process appending to the dataset should compact it.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        threshold (int): The number of segments tolerated.
+
+    Returns:
+        bool: Whether the segments were compacted.
+    """
+    segments = list_segments(filename)
+    if len(segments) <= threshold:
+        return False
+    with _lock:
+        table = pa.concat_tables([_read_mapped(path) for _, path in segments])
+        newest = segments[-1][1]
+        tmp_path = f"{newest}.{os.getpid()}.tmp"
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, newest)
+        for _, path in segments[:-1]:
+            os.remove(path)
+        _evict(get_segment_dir(filename), {newest})
+    return True
+
+
+def open_table(filename=CLEANED_DATA):
+    """
+    Returns the memory-mapped Arrow table for a dataset.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+
+    Returns:
+        pyarrow.Table: The full dataset, backed by memory maps.
+    """
+    parts = open_parts(filename)
+    return parts[0] if len(parts) == 1 else pa.concat_tables(parts)
+
+
+def last_timestamp(filename=CLEANED_DATA):
+    """
+    Returns the newest timestamp of a dataset.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+
+    Returns:
+        numpy.datetime64: The last timestamp, or None if the dataset is empty.
+    """
+    for part in reversed(open_parts(filename)):
+        if part.num_rows:
+            return _timestamps(part)[-1]
+    return None
+
+
+def load_frame(filename=CLEANED_DATA, columns=None):
+    """
+    Loads a dataset as a DataFrame, optionally projecting some columns.
+
+    The ``timestamp`` column is always included.  Frames are shared through
+    the process-wide cache, and their columns wrap the memory-mapped
+    buffers without copying, so the returned arrays are read-only.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        columns (list): The value columns to load, or None for all of them.
+
+    Returns:
+        pandas.DataFrame: The requested columns.
+    """
+    if columns is not None:
+        columns = tuple(["timestamp"] + [c for c in columns if c != "timestamp"])
+
+    def load():
+        table = open_table(filename)
+        if columns is not None:
+            table = table.select(list(columns))
+        return table.to_pandas(split_blocks=True)
+
+    return cache.frames.get(get_file_path(filename), data_version(filename), columns, load)
+
+
+def load_tail(filename=CLEANED_DATA, after=None, columns=None):
+    """
+    Loads only the rows newer than a timestamp.
+
+    The pieces of the dataset are walked from the newest one backwards, so
+    the cost grows with the size of the tail, not of the dataset.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        after: Only rows with a later timestamp are returned; None for all rows.
+        columns (list): The value columns to load, or None for all of them.
+
+    Returns:
+        pandas.DataFrame: The new rows, oldest first.
+    """
+    if after is None:
+        return load_frame(filename, columns)
+
+    after = pd.Timestamp(after).to_datetime64()
+    tail = []
+    for part in reversed(open_parts(filename)):
+        timestamps = _timestamps(part)
+        if not len(timestamps) or timestamps[-1] <= after:
+            break
+        first = int(np.searchsorted(timestamps, after, side="right"))
+        tail.append(part.slice(first))
+        if first > 0:
+            break
+
+    if columns is not None:
+        columns = ["timestamp"] + [c for c in columns if c != "timestamp"]
+    if not tail:
+        return load_frame(filename, columns).iloc[:0]
+    table = pa.concat_tables(reversed(tail))
+    if columns is not None:
+        table = table.select(columns)
+    return table.to_pandas(split_blocks=True)
+
+
+def load_index(filename=CLEANED_DATA, columns=None):
+    """
+    Loads a dataset wrapped in a ``TimeIndex`` for range queries.
+
+    Args:
+        filename (str): The name of the CSV dataset.
+        columns (list): The value columns to load, or None for all of them.
+
+    Returns:
+        TimeIndex: The time index over the requested columns.
+    """
+    return TimeIndex(load_frame(filename, columns))
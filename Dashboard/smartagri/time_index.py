@@ -0,0 +1,91 @@
+"""
+Binary-search time index over a timestamp-sorted DataFrame.
+
+The sensor store keeps every dataset sorted by ``timestamp``, so a date or
+time range maps to one contiguous block of rows.  ``TimeIndex`` finds that
+block with ``numpy.searchsorted`` in O(log n) and returns it as a row
+slice, instead of building boolean masks (or per-row ``date`` objects)
+over the whole frame.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+def _to_datetime64(value):
+    # Drop any timezone: the stored timestamps are naive local times
+    return pd.Timestamp(value).tz_localize(None).to_datetime64()
+
+
+class TimeIndex:
+    """
+    Range lookups on a DataFrame sorted by its ``timestamp`` column.
+
+    Args:
+        frame (pandas.DataFrame): The sorted frame to index.
+        column (str): The name of the timestamp column.
+    """
+
+    def __init__(self, frame, column="timestamp"):
+        self.frame = frame
+        self.timestamps = frame[column].to_numpy(dtype="datetime64[ns]")
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def first(self):
+        """pandas.Timestamp: The earliest timestamp, or None if empty."""
+        return pd.Timestamp(self.timestamps[0]) if len(self) else None
+
+    @property
+    def last(self):
+        """pandas.Timestamp: The latest timestamp, or None if empty."""
+        return pd.Timestamp(self.timestamps[-1]) if len(self) else None
+
+    def bounds(self, start, end, inclusive=True):
+        """
+        Returns the row positions covering a time range.
+
+        Args:
+            start: The first timestamp of the range.
+            end: The last timestamp of the range.
+            inclusive (bool): Whether rows at exactly ``end`` are included.
+
+        Returns:
+            tuple: The ``(first, stop)`` row positions.
+        """
+        first = np.searchsorted(self.timestamps, _to_datetime64(start), side="left")
+        stop = np.searchsorted(self.timestamps, _to_datetime64(end), side="right" if inclusive else "left")
+        return int(first), int(max(first, stop))
+
+    def slice_range(self, start, end, inclusive=True):
+        """
+        Returns the rows between two timestamps.
+
+        Args:
+            start: The first timestamp of the range.
+            end: The last timestamp of the range.
+            inclusive (bool): Whether rows at exactly ``end`` are included.
+
+        Returns:
+            pandas.DataFrame: A row slice of the indexed frame.
+        """
+        first, stop = self.bounds(start, end, inclusive)
+        return self.frame.iloc[first:stop]
+
+    def slice_day(self, day):
+        """
+        Returns the rows of one calendar day.
+
+        Args:
+            day (datetime.date or datetime.datetime): The day to select.
+
+        Returns:
+            pandas.DataFrame: A row slice of the indexed frame.
+        """
+        if isinstance(day, datetime):
+            day = day.date()
+        start = datetime.combine(day, datetime.min.time())
+        return self.slice_range(start, start + timedelta(days=1), inclusive=False)
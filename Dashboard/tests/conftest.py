@@ -0,0 +1,79 @@
+"""
+Shared fixtures of the dashboard tests.
+
+Run from the Dashboard directory with ``python -m pytest tests``.  The
+sensor store is redirected to a temporary directory before any
+``smartagri`` module is imported, so the tests never touch ``.store/`` or
+the shipped CSV files.
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["SENSOR_STORE_DIR"] = tempfile.mkdtemp(prefix="sensor-store-")
+
+SENSORS = ["TC", "HUM", "PRES", "US", "SOIL1"]
+
+
+def make_readings(rows, seed=0, start="2023-01-06 12:31:00", missing=0.05):
+    """
+    Generates irregularly spaced sensor readings with a few missing values.
+
+    Args:
+        rows (int): The number of rows.
+        seed (int): The random seed.
+        start: The first timestamp.
+        missing (float): The share of readings left empty.
+
+    Returns:
+        pandas.DataFrame: The ``timestamp`` and sensor columns.
+    """
+    rng = np.random.default_rng(seed)
+    steps = rng.integers(60, 600, rows)
+    timestamps = pd.Timestamp(start) + pd.to_timedelta(np.cumsum(steps) - steps[0], unit="s")
+    day = 2 * np.pi * (np.cumsum(steps) % 86400) / 86400
+    frame = pd.DataFrame({
+        "timestamp": timestamps,
+        "TC": 12 - 5 * np.cos(day) + rng.normal(0, 0.5, rows),
+        "HUM": 70 + 10 * np.sin(day) + rng.normal(0, 3, rows),
+        "PRES": 97900 + rng.normal(0, 20, rows),
+        "US": rng.integers(25, 31, rows).astype(float),
+        "SOIL1": 1000 + rng.normal(0, 50, rows).cumsum() / 10,
+    })
+    for column in SENSORS:
+        frame.loc[rng.random(rows) < missing, column] = np.nan
+    return frame
+
+
+def write_csv(path, frame):
+    """
+    Writes a dataset CSV, making sure its mtime changes.
+
+    Args:
+        path (str): The CSV file.
+        frame (pandas.DataFrame): The rows.
+    """
+    previous = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+    frame.to_csv(path, index=False)
+    if os.stat(path).st_mtime_ns <= previous:
+        os.utime(path, ns=(previous + 1_000_000_000, previous + 1_000_000_000))
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """
+    A sensor dataset CSV with a name no other test uses.
+
+    Returns:
+        tuple: The absolute CSV path (usable wherever a dataset name is
+        expected) and its rows.
+    """
+    frame = make_readings(2000)
+    path = str(tmp_path / f"{tmp_path.name}.csv")
+    write_csv(path, frame)
+    return path, frame
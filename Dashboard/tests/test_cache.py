@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from smartagri import cache
+
+
+def frame(rows):
+    return pd.DataFrame({"TC": np.arange(rows, dtype=np.float64)})
+
+
+def test_hits_share_the_cached_frame():
+    frames = cache.DatasetCache(10 ** 6)
+    loads = []
+    first = frames.get("a.arrow", 1, None, lambda: loads.append(1) or frame(10))
+    second = frames.get("a.arrow", 1, None, lambda: loads.append(1) or frame(10))
+    assert len(loads) == 1
+    assert np.shares_memory(first["TC"].to_numpy(), second["TC"].to_numpy())
+
+
+def test_newer_version_replaces_the_older_one():
+    frames = cache.DatasetCache(10 ** 6)
+    frames.get("a.arrow", 1, None, lambda: frame(10))
+    frames.get("a.arrow", 1, ("TC",), lambda: frame(10))
+    frames.get("a.arrow", 2, None, lambda: frame(20))
+    assert frames.stats()["entries"] == 1
+    assert frames.stats()["bytes"] == cache.frame_nbytes(frame(20))
+
+
+def test_least_recently_used_frames_are_evicted():
+    size = cache.frame_nbytes(frame(100))
+    frames = cache.DatasetCache(2 * size)
+    for path in ["a", "b"]:
+        frames.get(path, 1, None, lambda: frame(100))
+    frames.get("a", 1, None, lambda: frame(100))
+    frames.get("c", 1, None, lambda: frame(100))
+    loads = []
+    frames.get("a", 1, None, lambda: loads.append("a") or frame(100))
+    frames.get("b", 1, None, lambda: loads.append("b") or frame(100))
+    assert loads == ["b"]
+
+    # A frame over the budget is still kept while it is the only one
+    small = cache.DatasetCache(1)
+    small.get("a", 1, None, lambda: frame(100))
+    assert small.stats()["entries"] == 1
@@ -0,0 +1,129 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_readings
+from smartagri import cleaning
+
+
+@pytest.fixture
+def raw_log(tmp_path):
+    """
+    A raw log with spikes, duplicates (some with other readings), pressure
+    in hPa and a two-hour pause.
+    """
+    frame = make_readings(400, seed=6)
+    frame.loc[frame.index >= 200, "timestamp"] += pd.Timedelta(hours=2)
+    frame.loc[[50, 150, 300], "TC"] = 500.0
+    repeated = frame.iloc[[20, 21, 199, 320]].assign(HUM=1.0)
+    log = pd.concat([frame, repeated]).sort_values("timestamp", kind="stable")
+    log["PRES"] = log["PRES"] / 100
+    path = str(tmp_path / "raw.csv")
+    log.to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("outliers", cleaning.OUTLIER_METHODS)
+def test_output_does_not_depend_on_chunk_size(raw_log, tmp_path, outliers):
+    outputs, reports = [], []
+    for chunk_rows in [1, 2, 3, 7, 150, 10 ** 6]:
+        dst = str(tmp_path / f"clean{chunk_rows}.csv")
+        reports.append(cleaning.clean_file(raw_log, dst, units={"PRES": "hPa"}, outliers=outliers, chunk_rows=chunk_rows))
+        outputs.append(pd.read_csv(dst))
+    for output, report in zip(outputs[1:], reports[1:]):
+        pd.testing.assert_frame_equal(output, outputs[0])
+        assert report == reports[0]
+
+    report = reports[0]
+    assert (report["rows_read"], report["duplicates"], report["out_of_order"]) == (404, 4, 0)
+    assert report["rows_written"] == len(outputs[0]) == 400
+    assert len(report["gaps"]) == 1
+    assert outputs[0]["PRES"].mean() == pytest.approx(97900, rel=1e-3)
+    if outliers != "none":
+        assert outputs[0]["TC"].max() < 100
+
+
+def test_repeated_timestamp_keeps_the_last_reading(raw_log, tmp_path):
+    dst = str(tmp_path / "clean.csv")
+    raw = pd.read_csv(raw_log)
+    repeated = raw.loc[raw["timestamp"].duplicated(), "timestamp"]
+    # Row 21 ends a chunk of 23 rows; its repeat starts the next chunk
+    for chunk_rows in [1, 22, 23, 10 ** 6]:
+        cleaning.clean_file(raw_log, dst, outliers="none", chunk_rows=chunk_rows)
+        output = pd.read_csv(dst)
+        assert output["timestamp"].is_unique
+        assert output.loc[output["timestamp"].isin(repeated), "HUM"].tolist() == [1.0] * len(repeated)
+
+
+@pytest.mark.parametrize("rows", [1, 2, 3, 4])
+@pytest.mark.parametrize("chunk_rows", [1, 2, 3, 100])
+def test_tiny_logs(tmp_path, rows, chunk_rows):
+    src, dst = str(tmp_path / "raw.csv"), str(tmp_path / "clean.csv")
+    frame = make_readings(rows, seed=7, missing=0)
+    frame.to_csv(src, index=False)
+    report = cleaning.clean_file(src, dst, chunk_rows=chunk_rows)
+    output = pd.read_csv(dst, parse_dates=["timestamp"])
+    assert report["rows_written"] == rows
+    pd.testing.assert_series_equal(output["timestamp"], frame["timestamp"], check_dtype=False)
+    assert sorted(os.listdir(tmp_path)) == ["clean.csv", "raw.csv"]
+
+
+def test_midnight_chunks_keep_the_timestamp_format(tmp_path):
+    src = str(tmp_path / "raw.csv")
+    frame = make_readings(6, seed=25, missing=0)
+    frame["timestamp"] = pd.date_range("2023-01-01", periods=6, freq="D") + pd.to_timedelta([0, 0, 0, 5, 0, 0], unit="min")
+    frame.to_csv(src, index=False)
+    texts = []
+    for chunk_rows in [1, 3, 10 ** 6]:
+        dst = str(tmp_path / f"clean{chunk_rows}.csv")
+        cleaning.clean_file(src, dst, outliers="none", chunk_rows=chunk_rows)
+        with open(dst) as f:
+            texts.append(f.read())
+    assert texts[0] == texts[1] == texts[2]
+    assert texts[0].splitlines()[1].startswith("2023-01-01 00:00:00,")
+
+
+def test_failed_cleaning_leaves_no_file(tmp_path):
+    src, dst = str(tmp_path / "raw.csv"), str(tmp_path / "clean.csv")
+    pd.DataFrame({"timestamp": ["2024-01-01 00:00"], "TC": [1.0]}).to_csv(src, index=False)
+    with pytest.raises(KeyError):
+        cleaning.clean_file(src, dst)
+    assert os.listdir(tmp_path) == ["raw.csv"]
+
+
+def test_hampel_flags_a_lone_spike():
+    values = np.array([[1.0], [1.1], [0.9], [1.0], [50.0], [1.05], [0.95], [1.0], [1.1]])
+    np.testing.assert_array_equal(cleaning.hampel_outliers(values)[:, 0], np.arange(9) == 4)
+
+    # Stepped readings with a MAD of 0 still flag a spike
+    stepped = np.array([[25.0]] * 4 + [[90.0]] + [[25.0]] * 4)
+    np.testing.assert_array_equal(cleaning.hampel_outliers(stepped)[:, 0], np.arange(9) == 4)
+
+
+def test_forward_fill_respects_limit_and_gaps():
+    minutes = [0, 5, 10, 15, 20, 120, 125]
+    frame = pd.DataFrame({
+        "timestamp": pd.Timestamp("2024-01-01") + pd.to_timedelta(minutes, unit="min"),
+        "TC": [1.0, np.nan, np.nan, np.nan, np.nan, np.nan, 2.0],
+    })
+    filled = cleaning.forward_fill(frame, ["TC"], limit=3, max_gap="30min")
+    np.testing.assert_array_equal(filled["TC"], [1.0, 1.0, 1.0, 1.0, np.nan, np.nan, 2.0])
+    assert cleaning.forward_fill(frame.iloc[:0], ["TC"]).empty
+    pd.testing.assert_frame_equal(cleaning.forward_fill(frame, ["TC"], limit=0, max_gap=None), frame)
+
+
+def test_units_are_normalized():
+    frame = pd.DataFrame({"TC": [32.0, 212.0], "PRES": [979.0, 1000.0], "HUM": [0.5, 1.0]})
+    cleaning.normalize_units(frame, {"TC": "°F", "PRES": "hPa", "HUM": "fraction"})
+    np.testing.assert_allclose(frame.to_numpy(), [[0.0, 97900.0, 50.0], [100.0, 100000.0, 100.0]])
+    with pytest.raises(ValueError):
+        cleaning.normalize_units(frame, {"PRES": "bar"})
+
+
+def test_iqr_masks_outside_the_fences():
+    frame = pd.DataFrame({"TC": np.r_[np.arange(100.0), 1000.0], "HUM": np.r_[np.arange(100.0), -1000.0]})
+    masked, count = cleaning.mask_outliers(frame, ["TC", "HUM"], cleaning.iqr_bounds(frame, ["TC", "HUM"]))
+    assert count == 2
+    assert masked.isna().sum().tolist() == [1, 1]
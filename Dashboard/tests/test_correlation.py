@@ -0,0 +1,79 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from smartagri import correlation
+
+
+def brute_force_kendall(x, y):
+    # tau-b from every pair, O(n^2)
+    concordant = discordant = x_ties = y_ties = 0
+    for i, j in itertools.combinations(range(len(x)), 2):
+        dx, dy = np.sign(x[i] - x[j]), np.sign(y[i] - y[j])
+        if dx == 0 and dy == 0:
+            continue
+        if dx == 0:
+            x_ties += 1
+        elif dy == 0:
+            y_ties += 1
+        elif dx == dy:
+            concordant += 1
+        else:
+            discordant += 1
+    denominator = np.sqrt((concordant + discordant + x_ties) * (concordant + discordant + y_ties))
+    return (concordant - discordant) / denominator if denominator else np.nan
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_kendall_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(2, 200))
+    # Few distinct values, so there are ties in x, in y and in both
+    x = rng.integers(0, 8, n).astype(float)
+    y = (x + rng.integers(-3, 4, n)).astype(float)
+    assert correlation.kendall_tau(x, y) == pytest.approx(brute_force_kendall(x, y), abs=1e-12)
+
+
+def test_kendall_of_constant_series_is_nan():
+    assert np.isnan(correlation.kendall_tau(np.ones(10), np.arange(10.0)))
+
+
+def test_rolling_matches_pandas():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=500).cumsum()
+    y = x + rng.normal(size=500)
+    x[rng.random(500) < 0.1] = np.nan
+    y[rng.random(500) < 0.1] = np.nan
+    expected = pd.Series(x).rolling(24, min_periods=12).corr(pd.Series(y)).to_numpy()
+    result = correlation.rolling(x, y, 24, 12)
+    # Only full windows are computed
+    assert np.isnan(result[:23]).all()
+    np.testing.assert_allclose(result[23:], expected[23:], atol=1e-8)
+
+
+def brute_force_lagged(x, y, max_lag):
+    # Pearson correlation of x[t] and y[t + lag] over complete pairs
+    values = []
+    for lag in range(-max_lag, max_lag + 1):
+        shifted = pd.Series(y).shift(-lag)
+        values.append(pd.Series(x).corr(shifted))
+    return np.array(values)
+
+
+def test_lagged_matches_brute_force():
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=300)
+    y = np.roll(x, 5) + rng.normal(scale=0.3, size=300)
+    x[rng.random(300) < 0.05] = np.nan
+    y[rng.random(300) < 0.05] = np.nan
+    lags, values = correlation.lagged(x, y, 20)
+    np.testing.assert_array_equal(lags, np.arange(-20, 21))
+    np.testing.assert_allclose(values, brute_force_lagged(x, y, 20), atol=1e-8)
+    assert lags[np.nanargmax(values)] == 5
+
+
+def test_partial_matrix_of_independent_columns():
+    corr = pd.DataFrame(np.eye(3), index=list("abc"), columns=list("abc"))
+    pd.testing.assert_frame_equal(correlation.partial_matrix(corr), corr)
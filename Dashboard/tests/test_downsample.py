@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from smartagri import downsample
+
+
+def reference_lttb(x, y, n_out):
+    # Straightforward LTTB, one point at a time
+    n = len(x)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = [0]
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < n_out - 1:
+            next_x, next_y = x[stop:edges[i + 2]].mean(), y[stop:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        a = selected[-1]
+        areas = [abs((x[a] - next_x) * (y[j] - y[a]) - (x[a] - x[j]) * (next_y - y[a])) for j in range(start, stop)]
+        selected.append(start + int(np.argmax(areas)))
+    return np.array(selected + [n - 1])
+
+
+@pytest.mark.parametrize("n, n_out", [(1000, 50), (1001, 3), (97, 10), (10, 10), (5, 20)])
+def test_lttb_matches_reference(n, n_out):
+    rng = np.random.default_rng(n)
+    x = np.sort(rng.random(n)) * 1000
+    y = rng.normal(size=n).cumsum()
+    indices = downsample.lttb_indices(x, y, n_out)
+    if n <= n_out:
+        np.testing.assert_array_equal(indices, np.arange(n))
+    else:
+        np.testing.assert_array_equal(indices, reference_lttb(x, y, n_out))
+
+
+def test_lttb_keeps_a_spike():
+    y = np.zeros(1000)
+    y[517] = 100.0
+    assert 517 in downsample.lttb_indices(np.arange(1000.0), y, 20)
+
+
+@pytest.mark.parametrize("n, n_out", [(1000, 50), (1001, 7), (97, 10), (5, 20)])
+def test_minmax_keeps_every_bucket_extreme(n, n_out):
+    y = np.random.default_rng(n).normal(size=n)
+    indices = downsample.minmax_indices(y, n_out)
+    assert len(indices) <= max(n_out, n if n <= n_out else 0)
+    assert np.all(np.diff(indices) > 0)
+    if n > n_out:
+        size = -(-n // (n_out // 2))
+        for start in range(0, n, size):
+            bucket = y[start:start + size]
+            assert start + bucket.argmin() in indices
+            assert start + bucket.argmax() in indices
+
+
+def test_downsample_drops_missing_values():
+    frame = pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=100, freq="min"),
+        "TC": np.where(np.arange(100) % 10 == 0, np.nan, np.arange(100.0)),
+    })
+    series = downsample.downsample(frame, "TC", max_points=20, mode="lttb")
+    assert len(series) == 20
+    assert not series.isna().any()
+    assert series.index[0] == frame["timestamp"].iloc[1]
+    assert len(downsample.downsample(frame, "TC", mode="none")) == 90
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from smartagri import forecasting, model_registry
+
+
+@pytest.fixture
+def lock_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "forecast.lock")
+    monkeypatch.setattr(forecasting, "LOCK_PATH", path)
+    return path
+
+
+def test_lock_is_taken_once(lock_path):
+    assert not forecasting.is_running()
+    assert forecasting.acquire_lock()
+    assert forecasting.is_running()
+    assert not forecasting.acquire_lock()
+    forecasting.release_lock()
+    assert not forecasting.is_running()
+
+
+@pytest.mark.parametrize("content", ["", "not a pid", "999999999"])
+def test_stale_lock_is_replaced(lock_path, content):
+    with open(lock_path, "w") as f:
+        f.write(content)
+    assert not forecasting.is_running()
+    assert forecasting.acquire_lock()
+    forecasting.release_lock()
+
+
+def test_hash_identifies_the_training_data():
+    sensor_data = pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=48, freq="h"), "y": np.arange(48.0)})
+    digest = model_registry.data_hash(sensor_data)
+    assert model_registry.data_hash(sensor_data.copy()) == digest
+    assert model_registry.data_hash(sensor_data.assign(y=sensor_data["y"] + 1)) != digest
+    assert model_registry.data_hash(sensor_data.assign(ds=sensor_data["ds"] + pd.Timedelta(hours=1))) != digest
+
+
+def test_model_settings_change_the_hash():
+    sensor_data = pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=48, freq="h"), "y": np.arange(48.0)})
+    digest = model_registry.data_hash(sensor_data, forecasting.MODEL_SETTINGS)
+    assert model_registry.data_hash(sensor_data, dict(forecasting.MODEL_SETTINGS)) == digest
+    assert digest != model_registry.data_hash(sensor_data)
+    other = dict(forecasting.MODEL_SETTINGS, changepoint_prior_scale=0.5)
+    assert model_registry.data_hash(sensor_data, other) != digest
+
+
+def test_training_frame_skips_missing_readings():
+    hourly = pd.DataFrame({"timestamp": pd.date_range("2024-01-01", periods=4, freq="h"),
+                           "TC": [1.0, np.nan, 3.0, np.nan]})
+    sensor_data = forecasting.prepare_sensor_data(hourly, "TC")
+    assert list(sensor_data.columns) == ["ds", "y"]
+    assert sensor_data["y"].tolist() == [1.0, 3.0]
+
+
+def test_forecast_csv_is_written_quietly_in_one_format(tmp_path, monkeypatch, capsys):
+    def train_all(hourly_data, start, end, out_dir, *args):
+        hours = len(forecasting.forecast_horizon(start, end))
+        paths = {sensor: os.path.join(out_dir, f"{sensor}.npy") for sensor in forecasting.SENSORS}
+        for path in paths.values():
+            np.save(path, np.arange(hours, dtype=np.float64))
+        return paths
+
+    monkeypatch.setattr(forecasting, "load_hourly_data", lambda: None)
+    monkeypatch.setattr(forecasting, "train_all", train_all)
+    path = str(tmp_path / "predicted.csv")
+    # One-hour chunks, so the midnight hours are written on their own
+    forecasting.generate_predictions(start="2024-01-01", end="2024-01-02 23:00", filename=path, chunk_hours=1)
+    predicted = pd.read_csv(path)
+    assert len(predicted) == 48
+    assert predicted["timestamp"].str.fullmatch(r"\d{4}-\d\d-\d\d \d\d:00:00").all()
+    assert predicted["TC_predicted"].tolist() == list(range(48))
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,53 @@
+import time
+
+import pandas as pd
+import pyarrow as pa
+from streamlit.testing.v1 import AppTest
+
+from conftest import make_readings
+from smartagri import ingest, live
+
+
+def live_page():
+    import streamlit as st
+
+    from smartagri import live, store
+    from smartagri.downsample import downsample
+
+    # The rows the page loaded when it was opened
+    if "opened" not in st.session_state:
+        data = store.load_frame(st.session_state.path, ["TC"])
+        watermark = data["timestamp"].iloc[-1] if len(data) else None
+        st.session_state.opened = (downsample(data, "TC").rename("Temperature"), watermark)
+    series, watermark = st.session_state.opened
+    live.follow(series, st.session_state.path, "TC", watermark, 0.1)
+
+
+def chart_rows(app):
+    # The rows of the page's one line chart
+    proto = app.get("arrow_vega_lite_chart")[0].proto
+    return pa.ipc.open_stream(proto.datasets[0].data.data).read_all().to_pandas()
+
+
+def test_next_poll_draws_the_appended_rows(dataset):
+    path, frame = dataset
+    app = AppTest.from_function(live_page)
+    app.session_state.path = path
+    app.run()
+    assert not app.exception
+    before = chart_rows(app)
+
+    new = make_readings(10, seed=26, start=frame["timestamp"].iloc[-1] + pd.Timedelta(minutes=1), missing=0)
+    ingest.append(path, new)
+    # Past the backed-off delay of the first poll, which found nothing new
+    time.sleep(0.2)
+    app.run()
+    after = chart_rows(app)
+    assert len(after) == len(before) + len(new)
+    assert after["Temperature"].iloc[-len(new):].tolist() == new["TC"].tolist()
+
+
+def test_backoff_doubles_until_rows_arrive():
+    assert live.next_delay(5.0, 5.0, changed=False) == 10.0
+    assert live.next_delay(40.0, 5.0, changed=False) == 5.0 * live.MAX_BACKOFF
+    assert live.next_delay(40.0, 5.0, changed=True) == 5.0
@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_readings, write_csv
+from smartagri import ingest, resampling, store
+
+
+def test_aggregate_matches_pandas():
+    frame = make_readings(500, seed=8)
+    # A pause of a few hours leaves empty buckets
+    frame.loc[frame.index >= 250, "timestamp"] += pd.Timedelta(hours=5)
+    series = resampling.aggregate(frame, "TC", "h", "mean")
+    expected = frame.set_index("timestamp")["TC"].resample("h").mean()
+    np.testing.assert_allclose(series["value"], expected, equal_nan=True)
+    np.testing.assert_array_equal(series["count"], frame.set_index("timestamp")["TC"].resample("h").count())
+    assert series["gap"].sum() >= 4
+    assert series.loc[series["gap"], "value"].isna().all()
+
+
+def test_sums_of_gaps_are_missing():
+    frame = make_readings(100, seed=9, missing=0)
+    frame.loc[frame.index >= 50, "timestamp"] += pd.Timedelta(hours=3)
+    series = resampling.aggregate(frame, "US", "h", "sum")
+    assert series["gap"].any()
+    assert series.loc[series["gap"], "value"].isna().all()
+    assert series.loc[~series["gap"], "value"].gt(0).all()
+
+
+@pytest.mark.parametrize("agg", ["mean", "sum", "last"])
+@pytest.mark.parametrize("fill", resampling.FILLS)
+def test_appended_rows_match_a_rebuild(dataset, agg, fill):
+    path, frame = dataset
+    resampling.resample(path, "TC", "h", agg, fill)
+    rows = frame
+    for seed, size in [(10, 7), (11, 1), (12, 300)]:
+        new = make_readings(size, seed=seed, start=rows["timestamp"].iloc[-1] + pd.Timedelta(seconds=90))
+        ingest.append(path, new)
+        rows = pd.concat([rows, new], ignore_index=True)
+        updated = resampling.resample(path, "TC", "h", agg, fill)
+
+    if fill == "ffill":
+        rows = rows.assign(TC=rows["TC"].ffill())
+    expected = resampling.aggregate(rows, "TC", "h", agg)
+    pd.testing.assert_frame_equal(updated, expected, check_freq=False)
+
+    # A new process reads the same series back
+    restarted = resampling.ResampledSeries(path, "TC", "h", agg, fill)
+    pd.testing.assert_frame_equal(restarted.query(), expected, check_freq=False)
+
+
+def test_rewritten_csv_rebuilds_the_series(dataset):
+    path, frame = dataset
+    resampling.resample(path, "TC", "3h")
+    rewritten = frame.assign(TC=frame["TC"] + 100)
+    write_csv(path, rewritten)
+    expected = resampling.aggregate(rewritten, "TC", "3h")
+    pd.testing.assert_frame_equal(resampling.resample(path, "TC", "3h"), expected, check_freq=False)
+
+
+def test_query_range(dataset):
+    path, frame = dataset
+    start, end = frame["timestamp"].iloc[100], frame["timestamp"].iloc[900]
+    series = resampling.resample(path, "HUM", "h", start=start, end=end)
+    assert series.index[0] >= start
+    assert series.index[-1] <= end
+    assert len(resampling.resample(path, "HUM", "h", start=end, end=start)) == 0
+
+    resampled = resampling.resample_frame(path, ["TC", "HUM"], "h")
+    assert list(resampled.columns) == ["timestamp", "TC", "HUM"]
+
+
+def test_gap_runs():
+    index = pd.date_range("2024-01-01", periods=8, freq="h", name="timestamp")
+    series = pd.DataFrame({"gap": [False, True, True, False, True, False, False, True]}, index=index)
+    runs = resampling.gaps(series, "h")
+    assert runs["buckets"].tolist() == [2, 1, 1]
+    assert runs["start"].tolist() == [index[1], index[4], index[7]]
+    assert runs["end"].tolist() == [index[3], index[5], index[7] + pd.Timedelta(hours=1)]
+    assert resampling.gaps(series.iloc[:1], "h").empty
+
+
+def test_removed_segment_rebuilds_the_series(dataset):
+    path, frame = dataset
+    kept = make_readings(30, seed=23, start=frame["timestamp"].iloc[-1] + pd.Timedelta(minutes=1))
+    removed = make_readings(30, seed=24, start=kept["timestamp"].iloc[-1] + pd.Timedelta(minutes=1))
+    ingest.append(path, kept)
+    ingest.append(path, removed)
+    resampling.resample(path, "TC", "h")
+
+    # Same CSV, fewer segments
+    os.remove(store.list_segments(path)[-1][1])
+    expected = resampling.aggregate(pd.concat([frame, kept], ignore_index=True), "TC", "h")
+    pd.testing.assert_frame_equal(resampling.resample(path, "TC", "h"), expected, check_freq=False)
+
+
+@pytest.mark.parametrize("freq", ["W", "MS", "YS"])
+def test_calendar_frequencies_are_rejected(freq):
+    with pytest.raises(ValueError):
+        resampling.check_freq(freq)
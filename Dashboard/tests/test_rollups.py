@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import SENSORS, make_readings, write_csv
+from smartagri import ingest, rollups
+
+
+@pytest.mark.parametrize("resolution", list(rollups.RESOLUTIONS))
+def test_merge_matches_aggregate_of_all_rows(resolution):
+    frame = make_readings(3000, seed=4)
+    # Split inside a bucket, so the last bucket of the head is merged
+    head, tail = frame.iloc[:1234], frame.iloc[1234:]
+    merged = rollups.merge(rollups.aggregate(head, resolution, SENSORS), rollups.aggregate(tail, resolution, SENSORS))
+    pd.testing.assert_frame_equal(merged, rollups.aggregate(frame, resolution, SENSORS), check_dtype=False)
+
+
+def test_weekly_buckets_start_on_monday():
+    starts = rollups.bucket_starts(pd.DatetimeIndex(["2024-05-08 13:00", "2024-05-12 23:59"]), "weekly")
+    assert list(starts) == [pd.Timestamp("2024-05-06")] * 2
+
+
+def test_query_matches_pandas(dataset):
+    path, frame = dataset
+    resolution, result = rollups.query(path, "TC", max_points=10 ** 6)
+    assert resolution == "5min"
+    buckets = frame.set_index("timestamp")["TC"].resample("5min")
+    expected = pd.DataFrame({"min": buckets.min(), "mean": buckets.mean(), "max": buckets.max()}).dropna()
+    np.testing.assert_allclose(result[["min", "mean", "max"]].dropna(), expected, rtol=1e-12)
+
+    # A small budget falls back to a coarser resolution
+    assert rollups.query(path, "TC", max_points=5)[0] == "weekly"
+
+
+def test_appended_rows_update_the_rollups(dataset):
+    path, frame = dataset
+    rollups.get_engine(path)
+    new = make_readings(100, seed=5, start=frame["timestamp"].iloc[-1] + pd.Timedelta(seconds=30))
+    ingest.append(path, new)
+    rollup = rollups.get_engine(path).rollups["hourly"]
+    expected = rollups.aggregate(pd.concat([frame, new], ignore_index=True), "hourly", SENSORS)
+    pd.testing.assert_frame_equal(rollup, expected, check_dtype=False, check_freq=False)
+
+
+def test_rewritten_csv_rebuilds_the_rollups(dataset):
+    path, frame = dataset
+    rollups.get_engine(path)
+    rewritten = frame.assign(TC=frame["TC"] + 100)
+    write_csv(path, rewritten)
+    expected = rollups.aggregate(rewritten, "hourly", SENSORS)
+    pd.testing.assert_frame_equal(rollups.get_engine(path).rollups["hourly"], expected, check_dtype=False)
+
+    # The persisted rollups are the rebuilt ones
+    restarted = rollups.RollupEngine(path)
+    pd.testing.assert_frame_equal(restarted.rollups["hourly"], expected, check_dtype=False)
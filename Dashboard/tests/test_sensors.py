@@ -0,0 +1,13 @@
+from smartagri import cleaning, sensors, store
+
+
+def test_every_sensor_is_registered():
+    assert list(sensors.REGISTRY) == store.SENSORS
+    assert sensors.title("PRES") == "Air Pressure (Pa)"
+    assert sensors.title("US") == "Ultrasound"
+
+
+def test_units_match_the_cleaned_data():
+    # The cleaning pipeline converts every reading to the unit of cleaned_data.csv
+    for column, units in cleaning.UNIT_CONVERSIONS.items():
+        assert units[sensors.get(column).unit] == (1.0, 0.0)
@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import SENSORS, make_readings, write_csv
+from smartagri import ingest, stations
+
+
+@pytest.fixture
+def station(dataset, tmp_path, monkeypatch):
+    """
+    A station registered with the test dataset as its source.
+    """
+    path, frame = dataset
+    registry = str(tmp_path / "stations.json")
+    with open(registry, "w") as f:
+        json.dump({tmp_path.name: {"name": "Test", "source": path}}, f)
+    monkeypatch.setattr(stations, "STATIONS_FILE", registry)
+    return tmp_path.name, path, frame
+
+
+def test_summary_matches_pandas(station):
+    station_id, _, frame = station
+    start, end = frame["timestamp"].iloc[300], frame["timestamp"].iloc[1700]
+    rows = frame[(frame["timestamp"] >= start) & (frame["timestamp"] <= end)]
+    summary = stations.summary(station_id, start, end)
+    np.testing.assert_allclose(summary["mean"], rows[SENSORS].mean(), rtol=1e-12)
+    np.testing.assert_array_equal(summary["count"], rows[SENSORS].count())
+    pd.testing.assert_frame_equal(stations.load_range(station_id, start, end), rows.reset_index(drop=True),
+                                  check_dtype=False)
+
+
+def test_appended_rows_reach_the_station(station):
+    station_id, path, frame = station
+    stations.summary(station_id)
+    new = make_readings(40, seed=13, start=frame["timestamp"].iloc[-1] + pd.Timedelta(minutes=2))
+    ingest.append(path, new)
+    expected = pd.concat([frame, new])[SENSORS].mean()
+    np.testing.assert_allclose(stations.summary(station_id)["mean"], expected, rtol=1e-12)
+
+
+def test_rewritten_source_rebuilds_the_partitions(station):
+    station_id, path, frame = station
+    stations.summary(station_id)
+
+    # Same time range, different readings
+    rewritten = frame.assign(TC=frame["TC"] + 100)
+    write_csv(path, rewritten)
+    np.testing.assert_allclose(stations.summary(station_id).loc["TC", "mean"], rewritten["TC"].mean(), rtol=1e-12)
+    assert len(stations.load_range(station_id)) == len(rewritten)
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import SENSORS, make_readings, write_csv
+from smartagri import ingest, rollups, stats
+
+
+def test_merge_matches_pandas():
+    frame = make_readings(3000, seed=1)
+    moments = stats.CoMoments(SENSORS)
+    bounds = [0, 1, 700, 701, 2500, len(frame)]
+    for first, stop in zip(bounds[:-1], bounds[1:]):
+        moments = moments.merge(stats.CoMoments.from_frame(frame.iloc[first:stop], SENSORS))
+
+    summary = moments.summary()
+    expected = frame[SENSORS].describe().T
+    np.testing.assert_array_equal(summary["count"], expected["count"])
+    np.testing.assert_allclose(summary["mean"], expected["mean"], rtol=1e-12)
+    np.testing.assert_allclose(summary["std"], expected["std"], rtol=1e-9)
+    np.testing.assert_array_equal(summary["min"], expected["min"])
+    np.testing.assert_array_equal(summary["max"], expected["max"])
+    np.testing.assert_allclose(moments.corr(), frame[SENSORS].corr(), atol=1e-10)
+
+
+def test_merge_with_empty_block():
+    frame = make_readings(100, seed=2)
+    moments = stats.CoMoments.from_frame(frame, SENSORS)
+    merged = stats.CoMoments(SENSORS).merge(moments).merge(stats.CoMoments.from_frame(frame.iloc[:0], SENSORS))
+    pd.testing.assert_frame_equal(merged.summary(), moments.summary())
+
+
+def test_range_stats_match_pandas(dataset):
+    path, frame = dataset
+    start, end = frame["timestamp"].iloc[137], frame["timestamp"].iloc[1500] + pd.Timedelta(seconds=1)
+    rows = frame[(frame["timestamp"] >= start) & (frame["timestamp"] <= end)]
+    summary = stats.summary(path, start, end)
+    np.testing.assert_allclose(summary["mean"], rows[SENSORS].mean(), rtol=1e-12)
+    np.testing.assert_allclose(summary["std"], rows[SENSORS].std(), rtol=1e-9)
+    np.testing.assert_allclose(stats.correlation(path), frame[SENSORS].corr(), atol=1e-10)
+
+
+def test_appended_rows_are_counted(dataset):
+    path, frame = dataset
+    stats.summary(path)
+    new = make_readings(50, seed=3, start=frame["timestamp"].iloc[-1] + pd.Timedelta(minutes=5))
+    ingest.append(path, new)
+    expected = pd.concat([frame, new])[SENSORS].mean()
+    np.testing.assert_allclose(stats.summary(path)["mean"], expected, rtol=1e-12)
+
+
+def test_rewritten_csv_is_summarized_again(dataset):
+    path, frame = dataset
+    before = stats.summary(path).loc["TC", "mean"]
+
+    # Same time range, different readings
+    rewritten = frame.assign(TC=frame["TC"] + 100)
+    write_csv(path, rewritten)
+    assert stats.summary(path).loc["TC", "mean"] == pytest.approx(before + 100)
+    np.testing.assert_allclose(stats.correlation(path), rewritten[SENSORS].corr(), atol=1e-10)
+
+
+def test_append_keeps_the_persisted_statistics_current(dataset, monkeypatch):
+    path, frame = dataset
+    stats.get_buckets(path)
+    rollups.get_engine(path)
+    new = make_readings(50, seed=22, start=frame["timestamp"].iloc[-1] + pd.Timedelta(minutes=5))
+    # The ingest process only aggregates the appended rows
+    with monkeypatch.context() as m:
+        m.setattr(stats.store, "load_frame", lambda *args, **kwargs: pytest.fail("full rebuild"))
+        ingest.append(path, new)
+
+    # Another process reads the statistics back without touching any rows
+    monkeypatch.setattr(stats, "_states", {})
+    monkeypatch.setattr(stats.store, "load_frame", lambda *args, **kwargs: pytest.fail("full rebuild"))
+    monkeypatch.setattr(stats.store, "load_tail", lambda *args, **kwargs: pytest.fail("rows read"))
+    rows = pd.concat([frame, new])
+    np.testing.assert_allclose(stats.summary(path)["mean"], rows[SENSORS].mean(), rtol=1e-12)
+    np.testing.assert_allclose(stats.correlation(path), rows[SENSORS].corr(), atol=1e-10)
@@ -0,0 +1,52 @@
+import os
+
+import pandas as pd
+
+from conftest import make_readings, write_csv
+from smartagri import ingest, store
+
+
+def test_frame_matches_the_csv(dataset):
+    path, frame = dataset
+    pd.testing.assert_frame_equal(store.load_frame(path), frame, check_dtype=False)
+    projected = store.load_frame(path, ["HUM", "TC"])
+    assert list(projected.columns) == ["timestamp", "HUM", "TC"]
+
+
+def test_rewritten_csv_is_converted_again(dataset):
+    path, frame = dataset
+    store.load_frame(path)
+    rewritten = make_readings(100, seed=20)
+    write_csv(path, rewritten)
+    pd.testing.assert_frame_equal(store.load_frame(path), rewritten, check_dtype=False)
+
+
+def test_compaction_keeps_rows_and_version(dataset):
+    path, frame = dataset
+    rows = frame
+    for seed in range(14, 19):
+        new = make_readings(20, seed=seed, start=rows["timestamp"].iloc[-1] + pd.Timedelta(minutes=1))
+        ingest.append(path, new)
+        rows = pd.concat([rows, new], ignore_index=True)
+    store.open_table(path)
+    version = store.data_version(path)
+    segment_dir = store.get_segment_dir(path)
+    mapped = [p for p in store._tables if p.startswith(segment_dir + os.sep)]
+    assert len(mapped) == len(store.list_segments(path)) > 1
+
+    assert not store.compact_segments(path, threshold=len(mapped))
+    assert store.compact_segments(path, threshold=1)
+    assert len(store.list_segments(path)) == 1
+    assert store.data_version(path) == version
+    # The mappings of the removed segments are dropped
+    assert [p for p in store._tables if p.startswith(segment_dir + os.sep)] == [store.list_segments(path)[-1][1]]
+
+    pd.testing.assert_frame_equal(store.load_frame(path), rows, check_dtype=False)
+    tail = store.load_tail(path, frame["timestamp"].iloc[-1])
+    pd.testing.assert_frame_equal(tail, rows.iloc[len(frame):].reset_index(drop=True), check_dtype=False)
+
+
+def test_rows_not_newer_than_the_csv_are_skipped(dataset):
+    path, frame = dataset
+    ingest.append(path, frame.iloc[-5:])
+    assert len(store.load_frame(path)) == len(frame)
@@ -0,0 +1,29 @@
+import datetime
+
+import pandas as pd
+
+from conftest import make_readings, write_csv
+from smartagri import store
+from smartagri.time_index import TimeIndex
+
+
+def test_slices_match_masks():
+    frame = make_readings(1000, seed=21)
+    index = TimeIndex(frame)
+    timestamps = frame["timestamp"]
+    start, end = timestamps.iloc[100], timestamps.iloc[600]
+    pd.testing.assert_frame_equal(index.slice_range(start, end), frame[(timestamps >= start) & (timestamps <= end)])
+    pd.testing.assert_frame_equal(index.slice_range(start, end, inclusive=False),
+                                  frame[(timestamps >= start) & (timestamps < end)])
+    assert index.slice_range(end, start).empty
+
+    day = datetime.date(2023, 1, 8)
+    pd.testing.assert_frame_equal(index.slice_day(day), frame[timestamps.dt.date == day])
+    assert (index.first, index.last) == (timestamps.iloc[0], timestamps.iloc[-1])
+    assert TimeIndex(frame.iloc[:0]).first is None
+
+
+def test_store_sorts_rows_by_time(dataset):
+    path, frame = dataset
+    write_csv(path, frame.sample(frac=1, random_state=0))
+    pd.testing.assert_frame_equal(store.load_frame(path), frame, check_dtype=False)